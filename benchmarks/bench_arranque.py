@@ -0,0 +1,114 @@
+"""Mide el arranque de la interfaz: lo que se importa antes de crear la ventana y la precarga.
+
+Cada medición corre en un intérprete nuevo, porque un módulo ya importado no vuelve a cargarse:
+    interprete     python -c pass, como referencia
+    importar main  importar main.py, lo que se ejecuta antes de crear la ventana
+    ventana        importar main, crear la ventana y dibujarla (solo si hay pantalla)
+    precarga       importar en segundo plano pandas, openpyxl y los procesadores (modules.precarga)
+
+Además verifica que importar main.py no cargue pandas, numpy, openpyxl ni pyarrow; si los
+carga, el código de salida es 1.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 5]
+    python benchmarks/bench_arranque.py --guardar benchmarks/arranque_base.json
+    python benchmarks/bench_arranque.py --comparar benchmarks/arranque_base.json [--tolerancia 0.25]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_etapas import comparar, entorno
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+PESADOS = ("pandas", "numpy", "openpyxl", "pyarrow")
+
+# Cada código imprime un JSON con los segundos medidos dentro del intérprete
+CODIGOS = {
+    "importar main": f"""
+import json, sys, time
+inicio = time.perf_counter()
+import main
+print(json.dumps({{'s': time.perf_counter() - inicio, 'pesados': [m for m in {PESADOS!r} if m in sys.modules]}}))
+""",
+    "ventana": """
+import json, time
+inicio = time.perf_counter()
+import main
+ventana = main.ttk.Window(themename="flatly")
+app = main.Aplicacion(ventana)
+ventana.update()
+s = time.perf_counter() - inicio
+app.precarga.esperar()
+ventana.destroy()
+print(json.dumps({'s': s}))
+""",
+    "precarga": """
+import json
+from modules.logger import RegistroMemoria
+from modules.precarga import Precarga
+precarga = Precarga(RegistroMemoria()).iniciar()
+precarga.esperar()
+print(json.dumps({'s': precarga.duracion_s, 'error': str(precarga.error) if precarga.error else None}))
+""",
+}
+
+def ejecutar(codigo):
+    """Corre codigo en un intérprete nuevo y devuelve (segundos de todo el proceso, JSON impreso)."""
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True)
+    total = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else "error")
+    return total, json.loads(proceso.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--guardar", help="guardar los resultados como línea base en este JSON")
+    parser.add_argument("--comparar", help="comparar con la línea base de este JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="aumento permitido respecto de la línea base (por defecto: 0.25)")
+    args = parser.parse_args()
+
+    medidas = {"interprete": {'s': min(ejecutar("print('{}')")[0] for _ in range(args.repeticiones))}}
+    pesados = []
+    for nombre, codigo in CODIGOS.items():
+        try:
+            corridas = [ejecutar(codigo)[1] for _ in range(args.repeticiones)]
+        except RuntimeError as e:
+            print(f"  {nombre:<14} no se pudo medir: {e}")
+            continue
+        medidas[nombre] = {'s': min(corrida['s'] for corrida in corridas)}
+        pesados = pesados or corridas[0].get('pesados', [])
+
+    print(f"Arranque (mínimo de {args.repeticiones} corridas)")
+    for nombre, valores in medidas.items():
+        print(f"  {nombre:<14} {valores['s']:8.3f} s")
+    if pesados:
+        print(f"\nImportar main.py carga módulos pesados antes de crear la ventana: {', '.join(pesados)}")
+
+    resultados = {"arranque": medidas}
+    if args.guardar:
+        Path(args.guardar).write_text(json.dumps(
+            {'entorno': entorno(), 'resultados': resultados}, ensure_ascii=False, indent=2
+        ), encoding="utf-8")
+        print(f"\nLínea base guardada en {args.guardar}")
+
+    regresiones = 0
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        print(f"\nComparación con {args.comparar} (tolerancia {args.tolerancia:.0%})")
+        if base.get('entorno') != entorno():
+            print("Aviso: la línea base se tomó en otro entorno; las diferencias pueden no ser comparables")
+        regresiones = comparar(resultados, base['resultados'], args.tolerancia)
+    if pesados or regresiones:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compara el escritor de Excel anterior (pandas + openpyxl con relleno por celda)
+con modules.excel_writer sobre una tabla comparativa sintética.
+
+Uso: python benchmarks/bench_escritura.py --filas 200000 [--memoria]
+
+Con --memoria se mide además el pico de memoria con tracemalloc, lo que hace
+mucho más lentas las escrituras; los tiempos de esa corrida no son comparables.
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl.styles import Font, PatternFill
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from modules.excel_writer import escribir_excel, xlsxwriter
+
+def tabla_comparativa(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    manual = rng.integers(0, 20, filas)
+    siigo = rng.integers(0, 20, filas)
+    return pd.DataFrame({
+        "REFERENCIA": [f"REF-{i:07d}" for i in range(filas)],
+        "DESCRIPCION": [f"Producto {i}" for i in range(filas)],
+        "ORIGEN": rng.choice(["SIIGO", "STIHL", "SIIGO, SUZUKI", "YAMAHA"], filas),
+        "INVENTARIO MANUAL": manual,
+        "SIIGO": siigo,
+        "DIFERENCIA": manual - siigo,
+        "UBICACION_MARCAS": rng.choice(["", "A1", "B2, C3"], filas),
+        "UBICACION_SIIGO": rng.choice(["", "A1"], filas),
+        "CODIGO_SIIGO": [f"{i:07d}" for i in range(filas)]
+    })
+
+def escritor_anterior(ruta, df):
+    verde = PatternFill(start_color="99FF99", end_color="99FF99", fill_type="solid")
+    rojo = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
+    fuente_negra = Font(color="000000")
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Comparativo', index=False)
+        ws = writer.sheets['Comparativo']
+        for row in ws.iter_rows(min_row=2, min_col=6, max_col=6):
+            for cell in row:
+                if cell.value > 0:
+                    cell.fill = verde
+                elif cell.value < 0:
+                    cell.fill = rojo
+                cell.font = fuente_negra
+
+def medir(nombre, funcion, memoria=False):
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    duracion = time.perf_counter() - inicio
+    linea = f"{nombre:<28} {duracion:8.2f} s"
+    if memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        linea += f"  {pico / 1024 / 1024:8.1f} MB pico"
+    print(linea)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--memoria", action="store_true", help="medir también el pico de memoria")
+    args = parser.parse_args()
+
+    df = tabla_comparativa(args.filas)
+    print(f"Escribiendo {args.filas} filas")
+    with tempfile.TemporaryDirectory() as carpeta:
+        carpeta = Path(carpeta)
+        medir("anterior (openpyxl)", lambda: escritor_anterior(carpeta / "anterior.xlsx", df), args.memoria)
+        medir("write-only (openpyxl)", lambda: escribir_excel(
+            carpeta / "openpyxl.xlsx", df, "Comparativo", columna_signo="DIFERENCIA", motor="openpyxl"),
+            args.memoria)
+        if xlsxwriter is not None:
+            medir("streaming (xlsxwriter)", lambda: escribir_excel(
+                carpeta / "xlsxwriter.xlsx", df, "Comparativo", columna_signo="DIFERENCIA", motor="xlsxwriter"),
+                args.memoria)
+
+if __name__ == "__main__":
+    main()
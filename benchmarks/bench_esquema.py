@@ -0,0 +1,73 @@
+"""Compara el consolidado con columnas object (como antes) y con el esquema de modules.esquema.
+
+Mide la memoria del consolidado, el costo de la limpieza de textos que antes repetía cada
+etapa y el tiempo del análisis comparativo sobre el esquema normalizado.
+
+Uso: python benchmarks/bench_esquema.py --filas 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from modules import esquema
+from modules.comparative_analyzer import ComparativeAnalyzer
+from modules.logger import RegistroMemoria
+
+def consolidado_anterior(filas, semilla=0):
+    """Consolidado sintético como lo armaba Consolidator: textos object con '' y 'nan'."""
+    rng = np.random.default_rng(semilla)
+    referencias = np.array([f"REF-{i:06d}" for i in range(max(filas // 4, 1))] + [""])
+    return pd.DataFrame({
+        "REFERENCIA": rng.choice(referencias, filas),
+        "DESCRIPCION": rng.choice(["Producto A", "Producto B", "", "nan"], filas),
+        "CANTIDAD": rng.integers(0, 20, filas),
+        "ORIGEN": rng.choice(["STIHL", "SUZUKI", "YAMAHA", "SIIGO"], filas),
+        "UBICACION": rng.choice(["", "A1", "B2", "C3 "], filas),
+        "CODIGO_SIIGO": rng.choice(["", "0001234", "0005678", "nan"], filas)
+    })
+
+def limpieza_anterior(df):
+    """La limpieza de textos que repetían Consolidator y ComparativeAnalyzer sobre el consolidado."""
+    df = df.copy()
+    for col in ['REFERENCIA', 'DESCRIPCION', 'UBICACION', 'CODIGO_SIIGO', 'ORIGEN']:
+        df[col] = df[col].replace('nan', '').fillna('').astype(str)
+    df["REFERENCIA"] = df["REFERENCIA"].fillna("").astype(str).str.strip().replace("nan", "")
+    df["CODIGO_SIIGO"] = df["CODIGO_SIIGO"].fillna("").astype(str).str.strip().replace("nan", "")
+    df_con_ref = df[df["REFERENCIA"] != ""].copy()
+    df_con_ref["UBICACION"].astype(str).str.strip().replace("nan", "")
+    codigos = df_con_ref["CODIGO_SIIGO"].astype(str).str.strip()
+    codigos.str.lower() != "nan"
+    return df_con_ref
+
+def medir(nombre, funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    print(f"{nombre:<36} {time.perf_counter() - inicio:8.2f} s")
+    return resultado
+
+def megabytes(df):
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=1000000)
+    args = parser.parse_args()
+
+    anterior = consolidado_anterior(args.filas)
+    nuevo = esquema.normalizar(anterior)
+    print(f"Consolidado de {args.filas} filas (texto: {esquema.TEXTO.storage})")
+    print(f"{'memoria con columnas object':<36} {megabytes(anterior):8.1f} MB")
+    print(f"{'memoria con el esquema':<36} {megabytes(nuevo):8.1f} MB")
+
+    analyzer = ComparativeAnalyzer(RegistroMemoria())
+    medir("limpieza repetida (antes)", lambda: limpieza_anterior(anterior))
+    medir("normalización única (ahora)", lambda: esquema.normalizar(anterior))
+    medir("análisis sobre el esquema", lambda: analyzer.analizar(nuevo))
+
+if __name__ == "__main__":
+    main()
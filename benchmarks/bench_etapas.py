@@ -0,0 +1,195 @@
+"""Mide por separado el tiempo y la memoria de cada etapa del proceso sobre datos sintéticos.
+
+Etapas: lectura (FileProcessor, archivo por archivo), consolidacion (unión de los DataFrames),
+analisis (ComparativeAnalyzer), importacion (PhysicalCountImporter) y escritura (los tres
+archivos de salida). El tiempo es el mínimo de --repeticiones corridas; la memoria es el pico
+de tracemalloc en una corrida aparte, porque tracemalloc hace más lento el código medido.
+
+Uso:
+    python benchmarks/bench_etapas.py --filas 1000 10000 100000
+    python benchmarks/bench_etapas.py --guardar benchmarks/lineas_base.json
+    python benchmarks/bench_etapas.py --comparar benchmarks/lineas_base.json [--tolerancia 0.25]
+
+La línea base depende de la máquina, así que no se guarda en el repositorio (está en
+.gitignore): se toma en el equipo donde se va a comparar, antes de los cambios a medir.
+Con --comparar el código de salida es 1 si alguna etapa supera la línea base en más de la
+tolerancia (y en más de 0.05 s o 1 MB), en tiempo o en memoria. Si la línea base se tomó en
+otro entorno (Python, pandas, plataforma o procesador) solo se muestra la comparación, con
+un aviso, y el código de salida es 0.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from modules import esquema
+from modules.comparative_analyzer import ComparativeAnalyzer
+from modules.consolidator import Consolidator
+from modules.file_processor import FileProcessor
+from modules.fuentes import RegistroFuentes
+from modules.logger import RegistroMemoria
+from modules.physical_count_importer import PhysicalCountImporter
+from generar_datos import generar
+
+ETAPAS = ["lectura", "consolidacion", "analisis", "importacion", "escritura"]
+
+# Diferencias menores que estas no se consideran regresiones, aunque superen la tolerancia:
+# en etapas muy cortas el ruido de la medición es mayor que la tolerancia
+MINIMOS = {'s': 0.05, 'mb': 1.0}
+
+class Etapas:
+    """Ejecuta las etapas una tras otra, guardando el resultado de cada una para la siguiente."""
+
+    def __init__(self, entradas, salidas, registro):
+        logger = RegistroMemoria()
+        self.registro = registro
+        self.archivos = registro.buscar_archivos(entradas)
+        self.salidas = Path(salidas)
+        self.file_processor = FileProcessor(logger, registro)
+        self.consolidator = Consolidator(logger, registro=registro)
+        self.analyzer = ComparativeAnalyzer(logger, registro)
+        self.importador = PhysicalCountImporter(logger)
+
+    def lectura(self):
+        self.dfs = [
+            self.file_processor.leer_archivo(self.archivos[fuente.nombre], fuente)
+            for fuente in self.registro.fuentes
+        ]
+
+    def consolidacion(self):
+        self.consolidado = esquema.concatenar(self.dfs)
+
+    def analisis(self):
+        self.tabla = self.analyzer.analizar(self.consolidado)
+
+    def importacion(self):
+        self.importacion_df = self.importador.generar_importacion(self.tabla)
+
+    def escritura(self):
+        self.consolidator.escribir_consolidado(self.consolidado, self.salidas)
+        self.analyzer.escribir_analisis(self.tabla, self.salidas)
+        self.importador.escribir_importacion(self.importacion_df, self.salidas)
+
+def medir(etapas, repeticiones, memoria):
+    """Devuelve {etapa: {'s': segundos, 'mb': pico}} y las filas de cada resultado."""
+    resultados = {etapa: {'s': float("inf")} for etapa in ETAPAS}
+    for _ in range(repeticiones):
+        for etapa in ETAPAS:
+            inicio = time.perf_counter()
+            getattr(etapas, etapa)()
+            resultados[etapa]['s'] = min(resultados[etapa]['s'], time.perf_counter() - inicio)
+
+    if memoria:
+        for etapa in ETAPAS:
+            tracemalloc.start()
+            getattr(etapas, etapa)()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            resultados[etapa]['mb'] = pico / 1024 / 1024
+
+    filas = {
+        'consolidado': len(etapas.consolidado),
+        'analisis': len(etapas.tabla),
+        'importacion': len(etapas.importacion_df)
+    }
+    return resultados, filas
+
+def comparar(resultados, base, tolerancia):
+    """Imprime la comparación con la línea base y devuelve la cantidad de regresiones."""
+    regresiones = 0
+    for filas, etapas in resultados.items():
+        if filas not in base:
+            print(f"{filas} filas: sin línea base")
+            continue
+        for etapa, valores in etapas.items():
+            anterior = base[filas].get(etapa)
+            if anterior is None:
+                continue
+            for medida, unidad in (('s', 's'), ('mb', 'MB')):
+                if medida not in valores or medida not in anterior:
+                    continue
+                razon = valores[medida] / anterior[medida] if anterior[medida] else 1.0
+                marca = ""
+                if razon > 1 + tolerancia and valores[medida] - anterior[medida] > MINIMOS[medida]:
+                    marca = "  REGRESIÓN"
+                    regresiones += 1
+                print(f"{filas:>8} {etapa:<14} {anterior[medida]:9.2f} -> {valores[medida]:9.2f} {unidad:<2}"
+                      f" x{razon:5.2f}{marca}")
+    return regresiones
+
+def entorno():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="filas del archivo de Siigo de cada corrida (por defecto: 1000 10000 100000)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir el pico de memoria")
+    parser.add_argument("--datos", help="carpeta donde generar y reutilizar las entradas (por defecto: temporal)")
+    parser.add_argument("--guardar", help="guardar los resultados como línea base en este JSON")
+    parser.add_argument("--comparar", help="comparar con la línea base de este JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="aumento permitido respecto de la línea base (por defecto: 0.25)")
+    args = parser.parse_args()
+
+    registro = RegistroFuentes.predeterminado()
+    resultados = {}
+    with tempfile.TemporaryDirectory() as temporal:
+        datos = Path(args.datos or temporal)
+        for filas in args.filas:
+            entradas = datos / str(filas) / "inputs"
+            if not entradas.exists():
+                generar(entradas, filas, registro=registro)
+            etapas = Etapas(entradas, Path(temporal) / f"outputs_{filas}", registro)
+            medidas, conteos = medir(etapas, args.repeticiones, not args.sin_memoria)
+            resultados[str(filas)] = medidas
+
+            print(f"\n{filas} filas de Siigo -> consolidado {conteos['consolidado']}, "
+                  f"análisis {conteos['analisis']}, importación {conteos['importacion']}")
+            for etapa, valores in medidas.items():
+                linea = f"  {etapa:<14} {valores['s']:8.3f} s"
+                if 'mb' in valores:
+                    linea += f"  {valores['mb']:8.1f} MB pico"
+                print(linea)
+
+    if args.guardar:
+        Path(args.guardar).write_text(json.dumps(
+            {'entorno': entorno(), 'resultados': resultados}, ensure_ascii=False, indent=2
+        ), encoding="utf-8")
+        print(f"\nLínea base guardada en {args.guardar}")
+
+    if args.comparar:
+        ruta_base = Path(args.comparar)
+        if not ruta_base.exists():
+            sys.exit(f"\nNo existe la línea base {ruta_base}: guárdela primero en este equipo con --guardar")
+        base = json.loads(ruta_base.read_text(encoding="utf-8"))
+        print(f"\nComparación con {args.comparar} (tolerancia {args.tolerancia:.0%})")
+        actual = entorno()
+        distintos = [
+            f"{clave}: {base.get('entorno', {}).get(clave)} -> {valor}"
+            for clave, valor in actual.items() if base.get('entorno', {}).get(clave) != valor
+        ]
+        if distintos:
+            print("AVISO: la línea base se tomó en otro entorno; los tiempos no son comparables "
+                  "y las regresiones no cambian el código de salida")
+            for distinto in distintos:
+                print(f"  {distinto}")
+        regresiones = comparar(resultados, base['resultados'], args.tolerancia)
+        if regresiones and not distintos:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compara el tiempo de carga de la valoración de Siigo en CSV, Parquet y Arrow IPC (y opcionalmente xlsx).
+
+Genera una valoración sintética con generar_datos.py en CSV y la convierte a Parquet y
+Arrow con las cantidades como números, como las dejaría una exportación de pandas o Arrow.
+Para cada formato mide FileProcessor.leer_archivo completo y, por separado, la lectura
+(detección de encabezados y conversión a DataFrame) y la normalización.
+
+Uso: python benchmarks/bench_formatos.py --filas 1000000 [--xlsx] [--repeticiones 3]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from generar_datos import generar_siigo
+from modules.file_processor import FileProcessor
+from modules.fuentes import RegistroFuentes
+from modules.instrumentacion import Instrumentacion
+from modules.logger import RegistroMemoria
+
+def a_tabla(procesador, ruta_csv, fuente):
+    """Lee el CSV generado como lo hace la aplicación y lo devuelve con las cantidades como números."""
+    _, df = procesador._leer_hoja(ruta_csv, fuente)
+    for nombre in df.columns:
+        if fuente.es_numerica(nombre):
+            df[nombre] = pd.to_numeric(df[nombre], errors='coerce')
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def medir(procesador, ruta, fuente, repeticiones):
+    """Mejor tiempo de leer_archivo y el tiempo de lectura y de normalización de esa repetición."""
+    mejor = None
+    for _ in range(repeticiones):
+        instrumentacion = Instrumentacion()
+        inicio = time.perf_counter()
+        with instrumentacion.activar():
+            df = procesador.leer_archivo(ruta, fuente)
+        total = time.perf_counter() - inicio
+        if mejor is None or total < mejor[0]:
+            normalizacion = sum(e['duracion_s'] for e in instrumentacion.etapas if e['etapa'] == 'normalizacion')
+            mejor = (total, total - normalizacion, normalizacion, len(df))
+    return mejor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1000000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--xlsx", action="store_true", help="medir también el xlsx (lento con muchas filas)")
+    parser.add_argument("--carpeta", help="carpeta para los archivos generados (por defecto, una temporal)")
+    args = parser.parse_args()
+
+    registro = RegistroFuentes.predeterminado()
+    fuente = registro.de_tipo('siigo')[0]
+    procesador = FileProcessor(RegistroMemoria(), registro)
+    rng = np.random.default_rng(0)
+    referencias = np.array([f"REF-{i:06d}" for i in range(max(args.filas // 2, 1))], dtype=object)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        carpeta = Path(args.carpeta or temporal)
+        carpeta.mkdir(parents=True, exist_ok=True)
+        base = Path(fuente.ejemplo).stem
+        inicio = time.perf_counter()
+        rutas = {"csv": carpeta / f"{base}.csv"}
+        generar_siigo(rutas["csv"], fuente, args.filas, referencias, rng)
+        tabla = a_tabla(procesador, rutas["csv"], fuente)
+        rutas["parquet"] = carpeta / f"{base}.parquet"
+        pq.write_table(tabla, rutas["parquet"])
+        rutas["arrow"] = carpeta / f"{base}.arrow"
+        feather.write_feather(tabla, rutas["arrow"], compression="uncompressed")
+        if args.xlsx:
+            rutas["xlsx"] = carpeta / f"{base}.xlsx"
+            generar_siigo(rutas["xlsx"], fuente, args.filas, referencias, np.random.default_rng(0))
+        print(f"Archivos de {args.filas} filas generados en {time.perf_counter() - inicio:.1f} s\n")
+
+        print(f"{'formato':<10} {'filas':>9} {'total':>9} {'lectura':>9} {'normalizacion':>14}")
+        for formato, ruta in rutas.items():
+            total, lectura, normalizacion, filas = medir(procesador, ruta, fuente, args.repeticiones)
+            print(f"{formato:<10} {filas:>9} {total:>8.2f}s {lectura:>8.2f}s {normalizacion:>13.2f}s")
+
+if __name__ == "__main__":
+    main()
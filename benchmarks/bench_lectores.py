@@ -0,0 +1,104 @@
+"""Compara los lectores de Excel de FileProcessor (calamine y openpyxl): resultados y tiempo.
+
+Primero verifica que cada lector disponible devuelva exactamente el mismo DataFrame que
+openpyxl para los mismos libros: los .xlsx de la carpeta de entradas y una valoración de
+Siigo sintética generada con generar_datos.py. Si alguno difiere, el código de salida es 1.
+Después mide FileProcessor.leer_archivo de esa valoración con cada lector.
+
+calamine es opcional (pip install 'python-calamine>=0.3'); sin él solo se mide openpyxl.
+
+Uso: python benchmarks/bench_lectores.py [--filas 100000] [--entradas inputs] [--repeticiones 3]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from generar_datos import generar_siigo
+from modules.file_processor import LECTORES, CalamineWorkbook, FileProcessor
+from modules.fuentes import RegistroFuentes
+from modules.logger import RegistroMemoria
+
+def lectores_disponibles():
+    return [lector for lector in LECTORES if lector != "calamine" or CalamineWorkbook is not None]
+
+def verificar(procesadores, archivos):
+    """Compara la lectura de cada archivo con la de openpyxl; devuelve la cantidad de diferencias."""
+    diferencias = 0
+    for archivo, fuente in archivos:
+        esperado = procesadores["openpyxl"].leer_archivo(archivo, fuente)
+        for lector, procesador in procesadores.items():
+            if lector == "openpyxl":
+                continue
+            try:
+                pd.testing.assert_frame_equal(procesador.leer_archivo(archivo, fuente), esperado)
+                estado = "igual"
+            except AssertionError as e:
+                diferencias += 1
+                estado = "DIFERENTE: " + str(e).strip().splitlines()[0]
+            print(f"  {archivo.name:<40} {lector:<10} {estado}")
+    return diferencias
+
+def medir(procesador, archivo, fuente, repeticiones):
+    """Mejor tiempo de leer_archivo y filas leídas."""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        df = procesador.leer_archivo(archivo, fuente)
+        total = time.perf_counter() - inicio
+        mejor = total if mejor is None else min(mejor, total)
+    return mejor, len(df)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=100000)
+    parser.add_argument("--entradas", default="inputs", help="carpeta con libros reales para verificar (por defecto: inputs)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    registro = RegistroFuentes.predeterminado()
+    fuente = registro.de_tipo('siigo')[0]
+    lectores = lectores_disponibles()
+    procesadores = {lector: FileProcessor(RegistroMemoria(), registro, lector) for lector in lectores}
+    if "calamine" not in lectores:
+        print("python-calamine no está instalado: solo se mide openpyxl (pip install 'python-calamine>=0.3')\n")
+
+    with tempfile.TemporaryDirectory() as temporal:
+        valoracion = Path(temporal) / Path(fuente.ejemplo).with_suffix(".xlsx").name
+        inicio = time.perf_counter()
+        referencias = np.array([f"REF-{i:06d}" for i in range(max(args.filas // 2, 1))], dtype=object)
+        generar_siigo(valoracion, fuente, args.filas, referencias, np.random.default_rng(0))
+        print(f"Valoración de {args.filas} filas generada en {time.perf_counter() - inicio:.1f} s\n")
+
+        archivos = [(valoracion, fuente)]
+        entradas = Path(args.entradas)
+        if entradas.is_dir():
+            for archivo in sorted(entradas.glob("*.xlsx")):
+                fuente_archivo = registro.identificar(archivo)
+                if fuente_archivo is not None and not archivo.name.startswith("~$"):
+                    archivos.append((archivo, fuente_archivo))
+
+        diferencias = 0
+        if len(lectores) > 1:
+            print("Verificación contra openpyxl")
+            diferencias = verificar(procesadores, archivos)
+            print()
+
+        print(f"{'lector':<10} {'filas':>9} {'tiempo':>9} {'vs openpyxl':>12}")
+        tiempos = {}
+        for lector in reversed(lectores):
+            tiempos[lector], filas = medir(procesadores[lector], valoracion, fuente, args.repeticiones)
+            print(f"{lector:<10} {filas:>9} {tiempos[lector]:>8.2f}s {tiempos['openpyxl'] / tiempos[lector]:>11.1f}x")
+
+    if diferencias:
+        print(f"\n{diferencias} lecturas difieren de openpyxl")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Genera archivos de entrada sintéticos (marcas y valoración de Siigo) para pruebas de rendimiento.
+
+Imitan los archivos reales: filas de título y en blanco sobre los encabezados, encabezados
+con los alias de fuentes.toml en mayúsculas o minúsculas, columnas que no se usan,
+ubicaciones "(...)" al final del nombre en Siigo, referencias y descripciones faltantes,
+cantidades no numéricas, códigos de Siigo repetidos y una fila de total al final.
+
+Uso: python benchmarks/generar_datos.py --filas 100000 --salida datos/inputs [--semilla 0] [--formato csv]
+
+--filas es la cantidad de filas del archivo de Siigo; cada archivo de marca recibe
+la misma cantidad repartida entre las marcas.
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from modules.excel_writer import xlsxwriter
+from modules.fuentes import RegistroFuentes
+
+BODEGAS = ["BODEGA PRINCIPAL", "E-COMMERCE", "A1", "B2", "C3", "MOSTRADOR"]
+
+def _escribir_hoja(ruta, filas):
+    """Escribe las filas tal cual, sin formato, en la primera hoja de un libro nuevo (o en un CSV)."""
+    if Path(ruta).suffix.lower() == ".csv":
+        # Como exporta Siigo en Windows: separador ';' y codificación cp1252
+        with open(ruta, "w", newline="", encoding="cp1252") as archivo:
+            csv.writer(archivo, delimiter=";").writerows(filas)
+    elif xlsxwriter is not None:
+        libro = xlsxwriter.Workbook(str(ruta), {'constant_memory': True, 'strings_to_numbers': False,
+                                                'strings_to_formulas': False, 'strings_to_urls': False})
+        hoja = libro.add_worksheet("Hoja1")
+        for i, fila in enumerate(filas):
+            hoja.write_row(i, 0, fila)
+        libro.close()
+    else:
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet("Hoja1")
+        for fila in filas:
+            hoja.append(fila)
+        libro.save(ruta)
+
+def _encabezados(fuente, rng):
+    """Elige para cada columna un alias aceptado por la fuente, con mayúsculas variadas."""
+    encabezados = {}
+    for columna, alias in fuente.columnas.items():
+        # Si la columna participa en la detección de la fila de encabezados, usar un alias de ese grupo
+        for grupo in fuente.encabezado:
+            if set(alias) & set(grupo):
+                alias = [nombre for nombre in alias if nombre in grupo]
+                break
+        candidatos = [nombre for nombre in alias if fuente.indice_columnas.get(nombre.upper()) == columna]
+        nombre = candidatos[rng.integers(len(candidatos))]
+        encabezados[columna] = nombre.title() if rng.random() < 0.5 else nombre
+    return encabezados
+
+def _titulo(nombre, rng):
+    filas = [[f"Reporte de inventario {nombre}"], [], ["Fecha de corte", "2024-01-31"]]
+    return filas[:int(rng.integers(1, len(filas) + 1))] + [[]]
+
+def _con_faltantes(valores, proporcion, rng):
+    valores = valores.astype(object)
+    valores[rng.random(len(valores)) < proporcion] = None
+    return valores
+
+def _cantidades(filas, rng):
+    # Valores de Python: los escritores de Excel no aceptan todos los escalares de numpy
+    cantidades = np.array(rng.integers(-2, 40, filas).tolist(), dtype=object)
+    decimales = rng.random(filas) < 0.05
+    cantidades[decimales] = np.round(rng.random(decimales.sum()) * 10, 2).tolist()
+    cantidades[rng.random(filas) < 0.01] = "N/A"
+    return _con_faltantes(cantidades, 0.01, rng)
+
+def generar_marca(ruta, fuente, filas, referencias, rng):
+    encabezados = _encabezados(fuente, rng)
+    refs = _con_faltantes(rng.choice(referencias, filas), 0.03, rng)
+    descripciones = _con_faltantes(
+        np.array([f"Producto {ref}" if ref is not None else "Producto sin referencia" for ref in refs], dtype=object),
+        0.05, rng
+    )
+    ubicaciones = _con_faltantes(rng.choice(BODEGAS, filas), 0.2, rng)
+    columnas = {
+        "REFERENCIA": refs,
+        "DESCRIPCION": descripciones,
+        "CANTIDAD": _cantidades(filas, rng),
+        "UBICACION": ubicaciones,
+    }
+    orden = [columna for columna in encabezados if columna in columnas]
+
+    def filas_hoja():
+        yield from _titulo(fuente.nombre, rng)
+        yield [encabezados[columna] for columna in orden] + ["Observaciones"]
+        for i in range(filas):
+            yield [columnas[columna][i] for columna in orden] + [None]
+
+    _escribir_hoja(ruta, filas_hoja())
+
+def generar_siigo(ruta, fuente, filas, referencias, rng):
+    encabezados = _encabezados(fuente, rng)
+    refs = _con_faltantes(rng.choice(referencias, filas), 0.02, rng)
+    # Un 5% de las filas repite el código de otra referencia
+    codigos = np.array([f"{i:07d}" for i in rng.integers(1, filas * 2, filas)], dtype=object)
+    repetidos = rng.random(filas) < 0.05
+    codigos[repetidos] = rng.choice(codigos, repetidos.sum())
+    nombres = np.array([f"Producto {ref}" if ref is not None else "Producto genérico" for ref in refs], dtype=object)
+    con_ubicacion = rng.random(filas) < 0.6
+    ubicaciones = rng.choice(BODEGAS, filas)
+    nombres[con_ubicacion] = nombres[con_ubicacion] + " (" + ubicaciones[con_ubicacion].astype(object) + ")"
+    cantidades = _cantidades(filas, rng)
+    costos = rng.integers(1000, 90000, filas).astype(float).tolist()
+    columnas = {
+        "CODIGO_PRODUCTO": codigos,
+        "NOMBRE_PRODUCTO": nombres,
+        "REFERENCIA_FABRICA": refs,
+        "SALDO_CANTIDADES": cantidades,
+    }
+    orden = [columna for columna in encabezados if columna in columnas]
+
+    def filas_hoja():
+        yield ["Empresa de ejemplo S.A.S."]
+        yield ["Valoración de inventarios"]
+        yield []
+        yield [encabezados[columna] for columna in orden] + ["Costo promedio"]
+        for i in range(filas):
+            yield [columnas[columna][i] for columna in orden] + [costos[i]]
+        total = sum(valor for valor in cantidades if isinstance(valor, (int, float)))
+        yield [{"NOMBRE_PRODUCTO": "TOTAL", "SALDO_CANTIDADES": float(total)}.get(columna) for columna in orden] + [None]
+
+    _escribir_hoja(ruta, filas_hoja())
+
+def generar(carpeta, filas, semilla=0, registro=None, formato="xlsx"):
+    """Escribe en carpeta un archivo por cada fuente del registro y devuelve sus rutas.
+
+    formato es 'xlsx' o 'csv'.
+    """
+    registro = registro or RegistroFuentes.predeterminado()
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    # Cerca de la mitad de las filas comparten referencia con otra fila
+    referencias = np.array([f"REF-{i:06d}" for i in range(max(filas // 2, 1))], dtype=object)
+
+    marcas = registro.de_tipo('marca')
+    rutas = []
+    for fuente in registro.fuentes:
+        ruta = (carpeta / fuente.ejemplo).with_suffix(f".{formato}")
+        if fuente.tipo == 'siigo':
+            generar_siigo(ruta, fuente, filas, referencias, rng)
+        else:
+            generar_marca(ruta, fuente, max(filas // len(marcas), 1), referencias, rng)
+        rutas.append(ruta)
+    return rutas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--salida", default="inputs_sinteticos")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--fuentes", help="registro de fuentes en TOML (por defecto: fuentes.toml)")
+    parser.add_argument("--formato", choices=["xlsx", "csv"], default="xlsx")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    rutas = generar(args.salida, args.filas, args.semilla, RegistroFuentes.cargar(args.fuentes), args.formato)
+    for ruta in rutas:
+        print(ruta)
+    print(f"Generado en {time.perf_counter() - inicio:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Ejecución sin interfaz gráfica del proceso de consolidación, análisis e importación.
+
+Ejemplos:
+    python cli.py
+    python cli.py --trabajo tiendas/norte/inputs tiendas/norte/outputs \\
+                  --trabajo tiendas/sur/inputs tiendas/sur/outputs --jobs 2 --json
+    python cli.py --historial historial.sqlite
+    python cli.py --historial historial.sqlite --diferencias-negativas 6
+    python cli.py --vigilar --trabajo inputs outputs
+    python cli.py --limpiar-cache --cache cache
+    python cli.py --trabajo tiendas/norte/inputs tiendas/norte/outputs \\
+                  --trabajo tiendas/sur/inputs tiendas/sur/outputs --jobs 2 --empresa empresa
+
+Códigos de salida: 0 si todos los trabajos terminaron bien, 1 si alguno falló,
+2 si los argumentos no son válidos.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from modules.logger import Logger
+from modules.cache import CacheEntradas, CacheMemoria
+from modules.comparative_analyzer import ComparativeAnalyzer
+from modules.consolidator import Consolidator
+from modules.empresa import AnalisisEmpresa, nombres_tiendas
+from modules.fuentes import RegistroFuentes
+from modules.historial import HistorialConteos
+from modules.incremental import AnalisisIncremental
+from modules.instrumentacion import etapas_principales
+from modules.physical_count_importer import PhysicalCountImporter
+from modules.pipeline import Pipeline
+from modules.vigilancia import VigilanteEntradas
+
+def crear_pipeline(logger, salida, procesos=1, cache=None, ruta_fuentes=None, incremental=False,
+                   bodegas=None, ruta_historial=None):
+    registro = RegistroFuentes.cargar(ruta_fuentes)
+    analyzer = ComparativeAnalyzer(logger, registro)
+    return Pipeline(
+        logger,
+        Consolidator(logger, procesos=procesos, cache=cache, registro=registro),
+        analyzer,
+        PhysicalCountImporter(logger, bodegas),
+        # El análisis anterior se guarda junto a las salidas de cada trabajo
+        incremental=AnalisisIncremental(logger, analyzer, Path(salida) / ".incremental") if incremental else None,
+        historial=HistorialConteos(logger, ruta_historial) if ruta_historial else None
+    )
+
+def resumir(resumen, resultado):
+    """Agrega a resumen las filas, los archivos y los tiempos de las etapas de una ejecución."""
+    resumen['estado'] = 'ok'
+    resumen['filas'] = {
+        'consolidado': len(resultado['consolidado']) if resultado['consolidado'] is not None else None,
+        'analisis': len(resultado['analisis']),
+        'sugerencias': len(resultado['sugerencias']),
+        'importacion': len(resultado['importacion'])
+    }
+    resumen['archivos'] = {nombre: str(ruta) for nombre, ruta in resultado['archivos'].items()}
+    resumen['etapas'] = {
+        registro['etapa']: round(registro['duracion_s'], 3)
+        for registro in etapas_principales(resultado['informe'])
+    }
+    if resultado['ejecucion_historial'] is not None:
+        resumen['ejecucion_historial'] = resultado['ejecucion_historial']
+    if resultado['referencias_cambiadas'] is not None:
+        resumen['referencias_cambiadas'] = resultado['referencias_cambiadas']
+    return resumen
+
+def ejecutar_trabajo(entrada, salida, procesos=1, directorio_cache=None, ruta_fuentes=None,
+                     incremental=False, filas_por_bloque=None, bodegas=None, perfil=False, ruta_historial=None,
+                     tienda=None):
+    """Ejecuta el pipeline para una carpeta de entrada y devuelve un resumen serializable.
+
+    Si se indica tienda, devuelve (resumen, ParcialTienda) para el análisis de la empresa,
+    con None en lugar del parcial si el trabajo falló.
+    """
+    inicio = time.perf_counter()
+    resumen = {'entrada': str(entrada), 'salida': str(salida)}
+    parcial = None
+    logger = Logger(archivo=Path(salida) / "registro.log")
+    try:
+        cache = CacheEntradas(directorio_cache) if directorio_cache else None
+        pipeline = crear_pipeline(logger, salida, procesos, cache, ruta_fuentes, incremental, bodegas, ruta_historial)
+        resultado = pipeline.ejecutar(
+            inputs_dir=entrada, output_dir=salida, filas_por_bloque=filas_por_bloque,
+            perfil=Path(salida) / "perfil_ejecucion.prof" if perfil else None
+        )
+        resumir(resumen, resultado)
+        if tienda is not None:
+            resumen['tienda'] = tienda
+            parcial = AnalisisEmpresa(logger, pipeline.analyzer).parcial(tienda, pipeline, resultado)
+    except Exception as e:
+        logger.agregar_log(f"Error: {str(e)}", 'error')
+        resumen['estado'] = 'error'
+        resumen['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        logger.cerrar()
+    resumen['duracion_s'] = round(time.perf_counter() - inicio, 3)
+    return resumen if tienda is None else (resumen, parcial)
+
+def analizar_empresa(parciales, salida, ruta_fuentes=None):
+    """Combina los parciales de las tiendas y escribe el análisis de la empresa; devuelve un resumen."""
+    inicio = time.perf_counter()
+    resumen = {'salida': str(salida), 'tiendas': [parcial.tienda for parcial in parciales]}
+    logger = Logger(archivo=Path(salida) / "registro.log")
+    try:
+        empresa = AnalisisEmpresa(logger, ComparativeAnalyzer(logger, RegistroFuentes.cargar(ruta_fuentes)))
+        tabla, por_tienda = empresa.combinar(parciales)
+        resumen['archivo'] = str(empresa.escribir(tabla, por_tienda, salida))
+        resumen['filas'] = len(tabla)
+        resumen['estado'] = 'ok'
+    except Exception as e:
+        logger.agregar_log(f"Error: {str(e)}", 'error')
+        resumen['estado'] = 'error'
+        resumen['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        logger.cerrar()
+    resumen['duracion_s'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+def vigilar_trabajo(entrada, salida, args):
+    """Vigila la carpeta de entrada y regenera las salidas con cada cambio hasta Ctrl+C."""
+    logger = Logger(archivo=Path(salida) / "registro.log")
+    # Los archivos leídos quedan en memoria entre ejecuciones; la caché en disco sirve al reiniciar
+    cache = CacheMemoria(None if args.sin_cache else CacheEntradas(args.cache))
+    pipeline = crear_pipeline(
+        logger, salida, args.procesos_lectura, cache, args.fuentes, args.incremental, args.bodega, args.historial
+    )
+    vigilante = VigilanteEntradas(
+        logger, pipeline, entrada, salida, espera=args.espera, filas_por_bloque=args.filas_por_bloque
+    )
+
+    def al_ejecutar(cambiados, resultado, duracion):
+        resumen = {'entrada': str(entrada), 'salida': str(salida), 'cambios': cambiados,
+                   'duracion_s': round(duracion, 3)}
+        if resultado is None:
+            resumen.update(estado='error', error=f"ver {Path(salida) / 'registro.log'}")
+        else:
+            resumir(resumen, resultado)
+        if args.json:
+            print(json.dumps(resumen, ensure_ascii=False), flush=True)
+        elif resultado is None:
+            print(f"ERROR  {entrada}: revise {Path(salida) / 'registro.log'}", file=sys.stderr, flush=True)
+        else:
+            cambios = f" [{', '.join(cambiados)}]" if cambiados else ""
+            print(f"OK     {entrada} -> {salida}{cambios} ({duracion:.1f} s)", flush=True)
+
+    if not args.json:
+        print(f"Vigilando {entrada} (Ctrl+C para terminar)...", flush=True)
+    try:
+        vigilante.vigilar(al_ejecutar)
+    except KeyboardInterrupt:
+        vigilante.detenerse()
+    finally:
+        logger.cerrar()
+    return 0
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Consolida, analiza y genera la importación de conteo físico sin interfaz gráfica.",
+        epilog=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--trabajo", nargs=2, action="append", metavar=("ENTRADA", "SALIDA"),
+        help="carpeta de entrada y carpeta de salida de un trabajo; se puede repetir "
+             "(por defecto: inputs outputs)"
+    )
+    parser.add_argument("--jobs", type=int, default=1, help="trabajos ejecutados en paralelo (por defecto: 1)")
+    parser.add_argument(
+        "--procesos-lectura", type=int, default=1,
+        help="procesos para leer los archivos de cada trabajo (por defecto: 1)"
+    )
+    parser.add_argument("--fuentes", help="registro de fuentes en TOML (por defecto: fuentes.toml)")
+    parser.add_argument("--cache", default="cache", help="carpeta de la caché de entradas (por defecto: cache)")
+    parser.add_argument("--sin-cache", action="store_true", help="no usar la caché de entradas")
+    parser.add_argument(
+        "--limpiar-cache", action="store_true",
+        help="eliminar todas las entradas de la caché (carpeta de --cache) y salir"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="recalcular solo las referencias que cambiaron desde la ejecución anterior de cada trabajo"
+    )
+    parser.add_argument(
+        "--filas-por-bloque", type=int, metavar="N",
+        help="leer y analizar las entradas en bloques de N filas para limitar la memoria "
+             "(para exportaciones de Siigo muy grandes; no usa caché ni lectura en paralelo)"
+    )
+    parser.add_argument(
+        "--bodega", action="append", metavar="CODIGO",
+        help="bodega de la importación de conteo físico; se puede repetir y las existencias "
+             "contadas van a la primera (por defecto: \"3-Almacén\", \"1-E-COMMERCE\" y \"\")"
+    )
+    parser.add_argument(
+        "--historial", metavar="RUTA",
+        help="base SQLite donde se guardan el consolidado y la tabla comparativa de cada ejecución"
+    )
+    parser.add_argument(
+        "--diferencias-negativas", type=int, metavar="N",
+        help="con --historial, listar las referencias con DIFERENCIA negativa en cada una de las "
+             "últimas N ejecuciones (por carpeta de entrada si se indica --trabajo) y salir"
+    )
+    parser.add_argument(
+        "--perfil", action="store_true",
+        help="guardar un perfil de cProfile de cada trabajo en SALIDA/perfil_ejecucion.prof "
+             "(se lee con python -m pstats)"
+    )
+    parser.add_argument(
+        "--vigilar", action="store_true",
+        help="quedarse abierto vigilando la carpeta de entrada (un solo --trabajo) y regenerar las "
+             "salidas cada vez que cambia un archivo; solo se vuelven a leer los archivos modificados"
+    )
+    parser.add_argument(
+        "--espera", type=float, default=1.0, metavar="SEGUNDOS",
+        help="con --vigilar, segundos sin cambios en la carpeta antes de ejecutar (por defecto: 1)"
+    )
+    parser.add_argument(
+        "--empresa", metavar="SALIDA",
+        help="combinar los análisis de todos los trabajos, uno por tienda, en "
+             "SALIDA/Analisis_Comparativo_Empresa.xlsx con la diferencia de cada tienda; "
+             "cada tienda se procesa en su propio proceso con --jobs"
+    )
+    parser.add_argument("--json", action="store_true", help="imprimir el resumen en formato JSON")
+    return parser
+
+def consultar_diferencias_negativas(args):
+    """Imprime las referencias con diferencia negativa persistente según el historial."""
+    historial = HistorialConteos(Logger(archivo=None), args.historial)
+    entradas = [Path(entrada).resolve() for entrada, _ in args.trabajo] if args.trabajo else [None]
+    for entrada in entradas:
+        tabla = historial.diferencias_persistentes(args.diferencias_negativas, entrada)
+        if args.json:
+            print(tabla.to_json(orient="records", force_ascii=False, indent=2))
+        else:
+            titulo = f" en {entrada}" if entrada is not None else ""
+            completas = len(historial.ejecuciones(entrada))
+            if completas < args.diferencias_negativas:
+                print(f"Solo hay {completas} ejecuciones completas{titulo}; se necesitan "
+                      f"{args.diferencias_negativas} para buscar diferencias persistentes")
+                continue
+            print(f"Referencias con diferencia negativa en las últimas {args.diferencias_negativas} "
+                  f"ejecuciones{titulo}: {len(tabla)}")
+            if not tabla.empty:
+                print(tabla.to_string(index=False))
+    return 0
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1 or args.procesos_lectura < 1:
+        parser.error("--jobs y --procesos-lectura deben ser mayores que cero")
+    if args.filas_por_bloque is not None and args.filas_por_bloque < 1:
+        parser.error("--filas-por-bloque debe ser mayor que cero")
+
+    if args.limpiar_cache:
+        CacheEntradas(args.cache).limpiar()
+        print(f"Caché de archivos de entrada eliminada: {args.cache}")
+        return 0
+
+    if args.diferencias_negativas is not None:
+        if not args.historial:
+            parser.error("--diferencias-negativas requiere --historial")
+        if args.diferencias_negativas < 1:
+            parser.error("--diferencias-negativas debe ser mayor que cero")
+        return consultar_diferencias_negativas(args)
+
+    trabajos = args.trabajo or [("inputs", "outputs")]
+    salidas = [str(Path(salida).resolve()) for _, salida in trabajos]
+    if len(set(salidas)) != len(salidas):
+        parser.error("cada trabajo debe tener una carpeta de salida distinta")
+
+    if args.vigilar:
+        if len(trabajos) != 1:
+            parser.error("--vigilar admite un solo --trabajo")
+        if args.espera < 0:
+            parser.error("--espera no puede ser negativa")
+        (entrada, salida), = trabajos
+        return vigilar_trabajo(entrada, salida, args)
+    if args.empresa and str(Path(args.empresa).resolve()) in salidas:
+        parser.error("--empresa debe ser una carpeta distinta de las salidas de los trabajos")
+
+    directorio_cache = None if args.sin_cache else args.cache
+    tiendas = nombres_tiendas(entrada for entrada, _ in trabajos) if args.empresa else [None] * len(trabajos)
+    if args.jobs == 1 or len(trabajos) == 1:
+        resultados = [
+            ejecutar_trabajo(
+                entrada, salida, args.procesos_lectura, directorio_cache, args.fuentes, args.incremental,
+                args.filas_por_bloque, args.bodega, args.perfil, args.historial, tienda
+            )
+            for (entrada, salida), tienda in zip(trabajos, tiendas)
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(trabajos))) as executor:
+            futuros = [
+                executor.submit(
+                    ejecutar_trabajo, entrada, salida, args.procesos_lectura, directorio_cache,
+                    args.fuentes, args.incremental, args.filas_por_bloque, args.bodega, args.perfil,
+                    args.historial, tienda
+                )
+                for (entrada, salida), tienda in zip(trabajos, tiendas)
+            ]
+            resultados = [futuro.result() for futuro in futuros]
+
+    empresa = None
+    if args.empresa:
+        resumenes = [resumen for resumen, _ in resultados]
+        parciales = [parcial for _, parcial in resultados if parcial is not None]
+        if parciales:
+            empresa = analizar_empresa(parciales, args.empresa, args.fuentes)
+        else:
+            empresa = {'salida': args.empresa, 'estado': 'error', 'error': "ningún trabajo terminó bien"}
+    else:
+        resumenes = resultados
+
+    fallidos = sum(1 for resumen in resumenes if resumen['estado'] != 'ok')
+    if empresa is not None and empresa['estado'] != 'ok':
+        fallidos += 1
+    if args.json:
+        salida_json = {'trabajos': resumenes, 'fallidos': fallidos}
+        if empresa is not None:
+            salida_json['empresa'] = empresa
+        print(json.dumps(salida_json, ensure_ascii=False, indent=2))
+    else:
+        for resumen in resumenes:
+            if resumen['estado'] == 'ok':
+                print(f"OK     {resumen['entrada']} -> {resumen['salida']} ({resumen['duracion_s']} s)")
+            else:
+                print(f"ERROR  {resumen['entrada']}: {resumen['error']}", file=sys.stderr)
+        if empresa is not None:
+            if empresa['estado'] == 'ok':
+                print(f"OK     empresa ({len(empresa['tiendas'])} tiendas) -> {empresa['archivo']} "
+                      f"({empresa['duracion_s']} s)")
+            else:
+                print(f"ERROR  empresa: {empresa['error']}", file=sys.stderr)
+    return 1 if fallidos else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
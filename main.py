@@ -1,12 +1,54 @@
+import os
+import queue
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import messagebox, ttk
 import ttkbootstrap as ttk
 from pathlib import Path
 from modules.logger import Logger
-from modules.file_processor import FileProcessor
-from modules.consolidator import Consolidator
-from modules.comparative_analyzer import ComparativeAnalyzer
-from modules.physical_count_importer import PhysicalCountImporter
+from modules.fuentes import RegistroFuentes
+from modules.instrumentacion import etapas_principales
+from modules.precarga import Precarga
+from modules.tabla_virtual import TablaVirtual
+
+# Los módulos de datos (pandas, openpyxl) se importan dentro de los métodos que los usan:
+# la ventana aparece sin esperarlos y Precarga los carga mientras tanto en segundo plano
+DIRECTORIO_CACHE = Path("cache")
+
+COLUMNAS_RESULTADOS = [
+    ("REFERENCIA", "Referencia", 110),
+    ("DESCRIPCION", "Descripción", 220),
+    ("ORIGEN", "Origen", 130),
+    ("INVENTARIO MANUAL", "Inv. manual", 80),
+    ("SIIGO", "Siigo", 80),
+    ("DIFERENCIA", "Diferencia", 80),
+    ("UBICACION_MARCAS", "Ubic. marcas", 100),
+    ("UBICACION_SIIGO", "Ubic. Siigo", 90),
+    ("CODIGO_SIIGO", "Código Siigo", 100)
+]
+COLUMNAS_DETALLE = [
+    ("REFERENCIA", "Referencia", 110),
+    ("DESCRIPCION", "Descripción", 260),
+    ("CANTIDAD", "Cantidad", 80),
+    ("ORIGEN", "Origen", 110),
+    ("UBICACION", "Ubicación", 110),
+    ("CODIGO_SIIGO", "Código Siigo", 110)
+]
+SIGNOS = {"Todas": None, "Positivas": "positiva", "Negativas": "negativa", "Sin diferencia": "cero"}
+
+def formatear_filas(df, columnas):
+    """Valores de las filas de df como texto, en el orden de columnas, para mostrarlos en una tabla."""
+    valores = []
+    for columna, _, _ in columnas:
+        serie = df[columna]
+        if serie.dtype.kind == "f":
+            textos = [f"{valor:,.2f}" for valor in serie.tolist()]
+        else:
+            textos = [str(valor) for valor in serie.tolist()]
+        valores.append(["" if vacio else texto for vacio, texto in zip(serie.isna().tolist(), textos)])
+    return list(zip(*valores))
 
 class Aplicacion:
     def __init__(self, ventana):
@@ -15,12 +57,16 @@ class Aplicacion:
         
         # Inicializar logger después de configurar la interfaz
         self.logger = Logger(self.log_frame)
-        
-        # Inicializar los procesadores
-        self.file_processor = FileProcessor(self.logger)
-        self.consolidator = Consolidator(self.logger)
-        self.analyzer = ComparativeAnalyzer(self.logger)
-        self.importador = PhysicalCountImporter(self.logger)  # Nueva instancia
+
+        # Cargar pandas y los procesadores mientras el usuario revisa las entradas
+        self.precarga = Precarga(self.logger).iniciar()
+        self._cache = None
+        self.ejecucion = None
+        # Los índices de búsqueda de los resultados se arman en un hilo aparte
+        self.indexador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indices")
+        self.explorador = None
+        self.posiciones = None
+        self._filtro_pendiente = None
         
         # Configurar progreso
         self.progress = ttk.Progressbar(
@@ -34,7 +80,7 @@ class Aplicacion:
     
     def configurar_interfaz(self):
         self.ventana.title("Sistema de Comparación de Inventarios")
-        self.ventana.geometry("800x600")
+        self.ventana.geometry("1000x800")
         
         main_frame = ttk.Frame(self.ventana)
         main_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -54,56 +100,282 @@ class Aplicacion:
             font=("Segoe UI", 10)
         ).pack(pady=(0, 2))
 
+        ejemplos = ", ".join(fuente.ejemplo for fuente in RegistroFuentes.predeterminado().fuentes)
         ttk.Label(
             top_frame,
-            text="Archivos requeridos en 'inputs/': STIHL.xlsx, SUZUKI.xlsx, YAMAHA.xlsx, Valoración de inventarios.xlsx",
+            text=f"Archivos requeridos en 'inputs/': {ejemplos}",
+            wraplength=740,
             font=("Segoe UI", 9)
         ).pack(pady=(0, 10))
 
-        ttk.Button(
+        self.boton_iniciar = ttk.Button(
             top_frame, 
             text="Iniciar Proceso", 
             command=self.iniciar_proceso,
             style="primary.TButton"
+        )
+        self.boton_iniciar.pack(pady=(0, 10))
+
+        self.boton_cancelar = ttk.Button(
+            top_frame,
+            text="Cancelar",
+            command=self.cancelar_proceso,
+            style="danger.TButton",
+            state="disabled"
+        )
+        self.boton_cancelar.pack(pady=(0, 10))
+
+        ttk.Button(
+            top_frame,
+            text="Limpiar caché",
+            command=self.limpiar_cache,
+            style="secondary.TButton"
         ).pack(pady=(0, 10))
+
+        self.configurar_resumen(main_frame)
+        self.configurar_resultados(main_frame)
         
         self.log_frame = ttk.Frame(main_frame)
         self.log_frame.pack(fill="both", expand=True)
     
+    def configurar_resumen(self, contenedor):
+        """Tabla con el tiempo, las filas y la memoria de cada etapa de la última ejecución."""
+        columnas = {
+            "etapa": ("Etapa", 260),
+            "tiempo": ("Tiempo (s)", 90),
+            "cpu": ("CPU (s)", 90),
+            "filas": ("Filas", 120),
+            "memoria": ("Memoria pico (MB)", 130)
+        }
+        self.resumen_frame = ttk.Labelframe(contenedor, text="Resumen de la última ejecución")
+        self.resumen = ttk.Treeview(self.resumen_frame, columns=list(columnas), show="headings", height=6)
+        for columna, (titulo, ancho) in columnas.items():
+            self.resumen.heading(columna, text=titulo)
+            self.resumen.column(columna, width=ancho, anchor="w" if columna == "etapa" else "e")
+        self.resumen.pack(fill="x", padx=5, pady=5)
+
+    def mostrar_resumen(self, informe):
+        self.resumen.delete(*self.resumen.get_children())
+        for etapa in etapas_principales(informe):
+            filas = etapa['filas_salida'] if etapa['filas_salida'] is not None else etapa['filas_entrada']
+            memoria = etapa['memoria_pico_mb']
+            self.resumen.insert("", "end", values=(
+                etapa['etapa'],
+                f"{etapa['duracion_s']:.2f}",
+                f"{etapa['cpu_s']:.2f}",
+                f"{filas:,}" if filas is not None else "",
+                f"{memoria:.0f}" if memoria is not None else ""
+            ))
+        self.resumen.insert("", "end", values=("Total", f"{informe['duracion_s']:.2f}", "", "", ""))
+        self.resumen_frame.pack(fill="x", pady=(0, 10), before=self.log_frame)
+
+    def configurar_resultados(self, contenedor):
+        """Tabla comparativa de la última ejecución con búsqueda, filtros y las filas del consolidado."""
+        self.resultados_frame = ttk.Labelframe(contenedor, text="Resultados de la última ejecución")
+
+        filtros = ttk.Frame(self.resultados_frame)
+        filtros.pack(fill="x", padx=5, pady=5)
+        ttk.Label(filtros, text="Buscar:").pack(side="left")
+        self.busqueda = tk.StringVar()
+        self.busqueda.trace_add("write", lambda *_: self.programar_filtro())
+        ttk.Entry(filtros, textvariable=self.busqueda, width=30).pack(side="left", padx=(5, 15))
+        ttk.Label(filtros, text="Diferencia:").pack(side="left")
+        self.filtro_signo = ttk.Combobox(filtros, values=list(SIGNOS), state="readonly", width=14)
+        self.filtro_signo.set("Todas")
+        self.filtro_signo.bind("<<ComboboxSelected>>", lambda _: self.aplicar_filtro())
+        self.filtro_signo.pack(side="left", padx=(5, 15))
+        ttk.Label(filtros, text="Origen:").pack(side="left")
+        self.filtro_origen = ttk.Combobox(filtros, values=["Todos"], state="readonly", width=14)
+        self.filtro_origen.set("Todos")
+        self.filtro_origen.bind("<<ComboboxSelected>>", lambda _: self.aplicar_filtro())
+        self.filtro_origen.pack(side="left", padx=(5, 15))
+        self.conteo = ttk.Label(filtros, text="")
+        self.conteo.pack(side="right")
+
+        self.tabla_resultados = TablaVirtual(
+            self.resultados_frame, COLUMNAS_RESULTADOS, alto=12, al_seleccionar=self.mostrar_detalle
+        )
+        self.tabla_resultados.pack(fill="x", padx=5)
+        ttk.Label(self.resultados_frame, text="Filas del consolidado de la fila elegida:").pack(anchor="w", padx=5)
+        self.tabla_detalle = TablaVirtual(self.resultados_frame, COLUMNAS_DETALLE, alto=4)
+        self.tabla_detalle.pack(fill="x", padx=5, pady=(0, 5))
+
+    def cargar_resultados(self, resultado):
+        """Arma en segundo plano los índices de búsqueda del resultado y luego muestra la tabla."""
+        from modules.explorador import ExploradorResultados
+
+        inicio = time.perf_counter()
+        futuro = self.indexador.submit(ExploradorResultados, resultado['analisis'], resultado['consolidado'])
+        self.al_terminar_futuro(futuro, lambda: self._mostrar_resultados(futuro, inicio))
+
+    def al_terminar_futuro(self, futuro, funcion):
+        """Llama a funcion cuando termine futuro, sin bloquear la ventana mientras tanto."""
+        if futuro.done():
+            funcion()
+        else:
+            self.ventana.after(100, self.al_terminar_futuro, futuro, funcion)
+
+    def _mostrar_resultados(self, futuro, inicio):
+        try:
+            self.explorador = futuro.result()
+        except Exception as e:
+            self.logger.agregar_log(f"No se pudieron indexar los resultados: {str(e)}", 'advertencia')
+            return
+        self.logger.agregar_log(f"Índices de búsqueda listos en {time.perf_counter() - inicio:.1f} s", 'debug')
+        self.filtro_origen.config(values=["Todos"] + self.explorador.origenes)
+        if self.filtro_origen.get() not in self.explorador.origenes:
+            self.filtro_origen.set("Todos")
+        self.resultados_frame.pack(fill="x", pady=(0, 10), before=self.log_frame)
+        self.aplicar_filtro()
+
+    def programar_filtro(self):
+        """Filtra poco después de la última tecla, para no buscar con cada letra al escribir rápido."""
+        if self._filtro_pendiente is not None:
+            self.ventana.after_cancel(self._filtro_pendiente)
+        self._filtro_pendiente = self.ventana.after(150, self.aplicar_filtro)
+
+    def aplicar_filtro(self):
+        self._filtro_pendiente = None
+        if self.explorador is None:
+            return
+        inicio = time.perf_counter()
+        origen = self.filtro_origen.get()
+        self.posiciones = self.explorador.filtrar(
+            self.busqueda.get(), SIGNOS[self.filtro_signo.get()], None if origen == "Todos" else origen
+        )
+        self.tabla_resultados.mostrar(len(self.posiciones), self._filas_resultados)
+        self.tabla_detalle.mostrar(0, lambda inicio, fin: [])
+        self.conteo.config(text=(
+            f"{len(self.posiciones):,} de {len(self.explorador.analisis):,} filas "
+            f"({(time.perf_counter() - inicio) * 1000:.0f} ms)"
+        ))
+
+    def _filas_resultados(self, inicio, fin):
+        return formatear_filas(self.explorador.filas(self.posiciones[inicio:fin]), COLUMNAS_RESULTADOS)
+
+    def mostrar_detalle(self, posicion):
+        detalle = self.explorador.detalle(self.posiciones[posicion])
+        if detalle is None:
+            return
+        self.tabla_detalle.mostrar(
+            len(detalle), lambda inicio, fin: formatear_filas(detalle.iloc[inicio:fin], COLUMNAS_DETALLE)
+        )
+
     def actualizar_progreso(self, valor, mensaje):
         self.progress["value"] = valor
-        self.ventana.update_idletasks()
         self.logger.agregar_log(mensaje)
     
+    @property
+    def cache(self):
+        if self._cache is None:
+            from modules.cache import CacheEntradas
+            self._cache = CacheEntradas(DIRECTORIO_CACHE)
+        return self._cache
+
+    def al_terminar_precarga(self, funcion):
+        """Llama a funcion cuando termine la precarga, sin bloquear la ventana mientras tanto."""
+        if self.precarga.terminada():
+            funcion()
+        else:
+            self.ventana.after(100, self.al_terminar_precarga, funcion)
+
+    def limpiar_cache(self):
+        if self.ejecucion is not None and self.ejecucion.en_curso():
+            return
+        self.al_terminar_precarga(self._limpiar_cache)
+
+    def _limpiar_cache(self):
+        self.cache.limpiar()
+        self.logger.agregar_log("Caché de archivos de entrada eliminada", 'exito')
+
+    def crear_pipeline(self, registro):
+        from modules.comparative_analyzer import ComparativeAnalyzer
+        from modules.consolidator import Consolidator
+        from modules.historial import HistorialConteos
+        from modules.incremental import AnalisisIncremental
+        from modules.physical_count_importer import PhysicalCountImporter
+        from modules.pipeline import Pipeline
+
+        # Los procesadores del hilo de trabajo registran en la cola, no en el widget
+        analyzer = ComparativeAnalyzer(registro)
+        return Pipeline(
+            registro,
+            # Leer los archivos de entrada en paralelo (uno por proceso, hasta 4)
+            Consolidator(registro, procesos=min(4, os.cpu_count() or 1), cache=self.cache),
+            analyzer,
+            PhysicalCountImporter(registro),
+            # Recalcular solo las referencias que cambiaron desde la ejecución anterior
+            AnalisisIncremental(registro, analyzer, self.cache.directorio / "incremental"),
+            # Guardar cada ejecución para comparar periodos sin abrir los Excel anteriores
+            HistorialConteos(registro, "outputs/historial.sqlite")
+        )
+
     def iniciar_proceso(self):
-        try:
-            self.progress.pack(pady=5)
-            self.actualizar_progreso(10, "Iniciando proceso de consolidación...")
-            
-            consolidado = self.consolidator.crear_consolidado()
-            self.actualizar_progreso(30, "Procesando archivos de inventario...")
-            
-            self.actualizar_progreso(60, f"Consolidado creado: {consolidado}")
-            
-            resultado = self.analyzer.procesar_consolidado(consolidado)
-            self.actualizar_progreso(80, "Generando análisis comparativo...")
-
-            importacion = self.importador.generar_importacion_conteo(resultado)
-            self.actualizar_progreso(100, "Proceso completado con éxito")
+        if self.ejecucion is not None and self.ejecucion.en_curso():
+            return
+
+        self.progress["value"] = 0
+        self.progress.pack(pady=5)
+        self.boton_iniciar.config(state="disabled")
+        if not self.precarga.terminada():
+            self.logger.agregar_log("Terminando de cargar los módulos de datos...")
+        self.al_terminar_precarga(self._lanzar_ejecucion)
+
+    def _lanzar_ejecucion(self):
+        from modules.pipeline import EjecucionSegundoPlano
+
+        self.boton_cancelar.config(state="normal")
+        self.ejecucion = EjecucionSegundoPlano(self.crear_pipeline)
+        self.ejecucion.iniciar()
+        self.ventana.after(100, self.revisar_ejecucion)
+
+    def cancelar_proceso(self):
+        if self.ejecucion is not None and self.ejecucion.en_curso():
+            self.boton_cancelar.config(state="disabled")
+            self.logger.agregar_log("Cancelando proceso...", "advertencia")
+            self.ejecucion.cancelar()
 
+    def revisar_ejecucion(self):
+        """Atiende los eventos del hilo de trabajo; se reprograma con after() hasta que termina."""
+        while True:
+            try:
+                evento = self.ejecucion.cola.get_nowait()
+            except queue.Empty:
+                break
+
+            if evento[0] == 'log':
+                self.logger.agregar_log(evento[1], evento[2])
+            elif evento[0] == 'progreso':
+                self.actualizar_progreso(evento[1], evento[2])
+            else:
+                self.finalizar_proceso(evento)
+                return
+
+        self.ventana.after(100, self.revisar_ejecucion)
+
+    def finalizar_proceso(self, evento):
+        self.progress["value"] = 0
+        self.progress.pack_forget()
+        self.boton_iniciar.config(state="normal")
+        self.boton_cancelar.config(state="disabled")
+
+        if evento[0] == 'fin':
+            self.mostrar_resumen(evento[1]['informe'])
+            self.cargar_resultados(evento[1])
+            archivos = evento[1]['archivos']
             messagebox.showinfo(
                 "Éxito", 
                 f"Proceso completado:\n"
-                f"1. Consolidado: {Path(consolidado).name}\n"
-                f"2. Análisis: {Path(resultado).name}\n"
-                f"3. Importación: {Path(importacion).name}\n\n"
-                f"Los archivos se encuentran en la carpeta 'outputs'"
+                f"1. Consolidado: {Path(archivos['consolidado']).name}\n"
+                f"2. Análisis: {Path(archivos['analisis']).name}\n"
+                f"3. Importación: {Path(archivos['importacion']).name}\n\n"
+                f"Los archivos se encuentran en la carpeta 'outputs'; el detalle de tiempos "
+                f"por etapa está en {Path(archivos['informe']).name}"
             )
-            
-            self.progress["value"] = 0
-            self.progress.pack_forget()
-                
-        except Exception as e:
+        elif evento[0] == 'cancelado':
+            self.logger.agregar_log("Proceso cancelado", "advertencia")
+        else:
+            e = evento[1]
             self.logger.agregar_log(f"Error: {str(e)}", "error")
             messagebox.showerror(
                 "Error", 
@@ -111,10 +383,9 @@ class Aplicacion:
                 "Verifique que los archivos requeridos estén en la carpeta 'inputs' "
                 "y que tengan el formato correcto."
             )
-            self.progress["value"] = 0
-            self.progress.pack_forget()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     ventana = ttk.Window(themename="flatly")
     app = Aplicacion(ventana)
     ventana.mainloop()
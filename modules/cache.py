@@ -0,0 +1,135 @@
+import hashlib
+import os
+import shutil
+import pandas as pd
+from pathlib import Path
+from .file_processor import FileProcessor
+
+def clave_archivo(archivo, origen):
+    """Hash del contenido del archivo, del origen y de las versiones del lector y de pandas."""
+    digest = hashlib.sha256()
+    with open(archivo, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(bloque)
+    digest.update(f"|{origen}|{FileProcessor.VERSION}|{pd.__version__}".encode("utf-8"))
+    return digest.hexdigest()
+
+class CacheEntradas:
+    """Caché en disco de los DataFrames normalizados de cada archivo de entrada.
+
+    La clave combina el hash del contenido del archivo, la versión del lector
+    (FileProcessor.VERSION) y la de pandas, así que cualquier cambio invalida la entrada.
+    Cuando el tamaño total supera limite_bytes se eliminan las entradas usadas hace más tiempo.
+    """
+
+    EXTENSION = ".pkl"
+
+    def __init__(self, directorio="cache", limite_bytes=512 * 1024 * 1024):
+        self.directorio = Path(directorio)
+        self.limite_bytes = limite_bytes
+
+    def clave(self, archivo, origen):
+        """Calcula la clave de un archivo leído como el origen indicado."""
+        return clave_archivo(archivo, origen)
+
+    def _ruta(self, clave):
+        return self.directorio / f"{clave}{self.EXTENSION}"
+
+    def obtener(self, clave):
+        """Devuelve el DataFrame guardado o None si no está en la caché."""
+        ruta = self._ruta(clave)
+        try:
+            df = pd.read_pickle(ruta)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada truncada o dañada (p. ej. por un proceso interrumpido): se descarta y se vuelve a leer
+            ruta.unlink(missing_ok=True)
+            return None
+        # Marcar como usado recientemente para el desalojo LRU
+        try:
+            os.utime(ruta)
+        except FileNotFoundError:
+            pass
+        return df
+
+    def guardar(self, clave, df):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self._ruta(clave)
+        temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+        df.to_pickle(temporal)
+        os.replace(temporal, ruta)
+        self._desalojar()
+
+    def _desalojar(self):
+        """Elimina las entradas menos usadas hasta respetar limite_bytes."""
+        entradas = []
+        for ruta in self.directorio.glob(f"*{self.EXTENSION}"):
+            try:
+                estado = ruta.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((estado.st_mtime, estado.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.limite_bytes:
+                break
+            try:
+                ruta.unlink()
+            except FileNotFoundError:
+                pass
+            total -= tamano
+
+    def limpiar(self):
+        """Elimina todas las entradas de la caché."""
+        if self.directorio.exists():
+            shutil.rmtree(self.directorio)
+
+
+class CacheMemoria:
+    """Caché en memoria de los DataFrames normalizados, para un proceso que ejecuta varias veces.
+
+    Usa las mismas claves que CacheEntradas y conserva solo la última versión de cada origen,
+    así la memoria no crece con cada cambio de un archivo. Si se indica siguiente (por ejemplo,
+    una CacheEntradas), se consulta cuando una clave no está en memoria y también se guarda en ella.
+    """
+
+    def __init__(self, siguiente=None):
+        self.siguiente = siguiente
+        self._datos = {}
+        # Origen de cada clave calculada, para reemplazar la versión anterior al guardar
+        self._origenes = {}
+
+    def clave(self, archivo, origen):
+        clave = clave_archivo(archivo, origen)
+        self._origenes[clave] = origen
+        return clave
+
+    def obtener(self, clave):
+        """Devuelve el DataFrame guardado o None si no está en la caché."""
+        df = self._datos.get(clave)
+        if df is None and self.siguiente is not None:
+            df = self.siguiente.obtener(clave)
+            if df is not None:
+                self._conservar(clave, df)
+        return df
+
+    def guardar(self, clave, df):
+        self._conservar(clave, df)
+        if self.siguiente is not None:
+            self.siguiente.guardar(clave, df)
+
+    def _conservar(self, clave, df):
+        origen = self._origenes.get(clave)
+        for anterior in [c for c in self._datos if c != clave and self._origenes.get(c) == origen]:
+            del self._datos[anterior]
+            del self._origenes[anterior]
+        self._datos[clave] = df
+
+    def limpiar(self):
+        """Elimina las entradas en memoria (y las de siguiente, si hay)."""
+        self._datos.clear()
+        self._origenes.clear()
+        if self.siguiente is not None:
+            self.siguiente.limpiar()
@@ -0,0 +1,153 @@
+"""Sugerencias de coincidencia entre referencias de las marcas y de Siigo que no coinciden exactamente.
+
+Las referencias se comparan por una clave normalizada: mayúsculas, sin ceros a la izquierda en
+cada número y después sin separadores. Así "11-23-456" y "1123456", "A-0012" y "A12" o "11-023"
+y "1123" tienen la misma clave. Las que tampoco coinciden por clave se comparan por los
+trigramas de la clave con el coeficiente de Dice, pero solo si sus cifras son las mismas y en
+el mismo orden: en códigos de repuesto cortos un dígito distinto es otra pieza aunque casi
+todos los trigramas coincidan ("REF-000100" y "REF-001000").
+
+Las referencias se agrupan por sus cifras, así cada búsqueda solo lee su grupo. Los grupos de
+más de MAX_CANDIDATOS referencias (p. ej. las que no tienen números) usan un índice invertido
+de trigramas sin los trigramas más comunes, que aparecen en casi todo el grupo y no
+distinguen candidatos.
+"""
+import re
+from collections import defaultdict
+
+import pandas as pd
+
+COLUMNAS = [
+    "REFERENCIA_MARCA",
+    "DESCRIPCION_MARCA",
+    "ORIGEN",
+    "INVENTARIO MANUAL",
+    "REFERENCIA_SIIGO",
+    "DESCRIPCION_SIIGO",
+    "CODIGO_SIIGO",
+    "SIIGO",
+    "CONFIANZA",
+    "METODO"
+]
+
+METODO_CLAVE = "clave normalizada"
+METODO_GRAMAS = "trigramas"
+
+# Tamaño de grupo (y de lista de un trigrama) a partir del cual se deja de leer completo
+MAX_CANDIDATOS = 200
+
+def normalizar_claves(referencias):
+    """Clave de comparación de cada referencia: mayúsculas, sin ceros a la izquierda ni separadores."""
+    claves = pd.Series(referencias, dtype=object).astype(str).str.upper()
+    # Los ceros se quitan antes que los separadores para que cuenten por número ("11-023" -> "1123")
+    claves = claves.str.replace(r"(?<![0-9])0+(?=[0-9])", "", regex=True)
+    return claves.str.replace(r"[\W_]+", "", regex=True)
+
+def cifras(clave):
+    """Los dígitos de la clave, en orden."""
+    return re.sub(r"[^0-9]+", "", clave)
+
+def gramas(clave, n=3):
+    """Conjunto de n-gramas de la clave, con marcas de inicio y fin para las claves cortas."""
+    clave = f"^{clave}$"
+    if len(clave) <= n:
+        return {clave}
+    return {clave[i:i + n] for i in range(len(clave) - n + 1)}
+
+class IndiceReferencias:
+    """Índice de claves normalizadas, agrupadas por cifras, de un conjunto de referencias."""
+
+    def __init__(self, referencias, n=3, max_candidatos=MAX_CANDIDATOS):
+        self.referencias = list(referencias)
+        self.claves = normalizar_claves(self.referencias).tolist()
+        self.n = n
+        self.max_candidatos = max_candidatos
+        self._por_clave = defaultdict(list)
+        self._por_cifras = defaultdict(list)
+        for i, clave in enumerate(self.claves):
+            self._por_clave[clave].append(i)
+            self._por_cifras[cifras(clave)].append(i)
+        self._por_grama = {
+            numeros: self._indice_gramas(posiciones)
+            for numeros, posiciones in self._por_cifras.items() if len(posiciones) > max_candidatos
+        }
+
+    def _indice_gramas(self, posiciones):
+        """Posiciones de las referencias del grupo que contienen cada trigrama, sin los trigramas comunes."""
+        por_grama = defaultdict(list)
+        for i in posiciones:
+            for grama in gramas(self.claves[i], self.n):
+                por_grama[grama].append(i)
+        return {grama: lista for grama, lista in por_grama.items() if len(lista) <= self.max_candidatos}
+
+    def buscar(self, referencia, limite=3, minimo=0.75):
+        """Devuelve hasta limite pares (posición, confianza, método), de mayor a menor confianza.
+
+        Las coincidencias por clave normalizada tienen confianza 1; las demás, con las mismas
+        cifras, el coeficiente de Dice de los trigramas, que debe ser al menos minimo.
+        """
+        return self.buscar_clave(normalizar_claves([referencia]).iloc[0], limite, minimo)
+
+    def buscar_clave(self, clave, limite=3, minimo=0.75):
+        """Como buscar, con la clave ya normalizada (normalizar_claves)."""
+        exactas = self._por_clave.get(clave, [])
+        resultados = [(i, 1.0, METODO_CLAVE) for i in exactas]
+        if len(resultados) >= limite or not clave:
+            return resultados[:limite]
+
+        consulta = gramas(clave, self.n)
+        numeros = cifras(clave)
+        if numeros in self._por_grama:
+            indice = self._por_grama[numeros]
+            candidatos = set()
+            for grama in consulta:
+                candidatos.update(indice.get(grama, ()))
+        else:
+            candidatos = self._por_cifras.get(numeros, ())
+
+        puntajes = []
+        for i in candidatos:
+            if self.claves[i] == clave:
+                continue
+            candidato = gramas(self.claves[i], self.n)
+            dice = 2 * len(consulta & candidato) / (len(consulta) + len(candidato))
+            if dice >= minimo:
+                puntajes.append((i, round(dice, 3)))
+        puntajes.sort(key=lambda resultado: (-resultado[1], self.referencias[resultado[0]]))
+        return resultados + [(i, confianza, METODO_GRAMAS) for i, confianza in puntajes[:limite - len(resultados)]]
+
+def sugerir_pares(marcas, siigo, limite=3, minimo=0.75):
+    """Propone para cada fila de marcas hasta limite filas de siigo con referencia parecida.
+
+    marcas y siigo son filas de la tabla comparativa (solo de marcas y solo de Siigo).
+    Devuelve un DataFrame con COLUMNAS ordenado de mayor a menor confianza.
+    """
+    if marcas.empty or siigo.empty:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    indice = IndiceReferencias(siigo["REFERENCIA"])
+    filas_marca, filas_siigo, confianzas, metodos = [], [], [], []
+    for posicion, clave in enumerate(normalizar_claves(marcas["REFERENCIA"])):
+        for i, confianza, metodo in indice.buscar_clave(clave, limite, minimo):
+            filas_marca.append(posicion)
+            filas_siigo.append(i)
+            confianzas.append(confianza)
+            metodos.append(metodo)
+
+    marcas = marcas.iloc[filas_marca]
+    siigo = siigo.iloc[filas_siigo]
+    sugerencias = pd.DataFrame({
+        "REFERENCIA_MARCA": marcas["REFERENCIA"].to_numpy(),
+        "DESCRIPCION_MARCA": marcas["DESCRIPCION"].to_numpy(),
+        "ORIGEN": marcas["ORIGEN"].to_numpy(),
+        "INVENTARIO MANUAL": marcas["INVENTARIO MANUAL"].to_numpy(),
+        "REFERENCIA_SIIGO": siigo["REFERENCIA"].to_numpy(),
+        "DESCRIPCION_SIIGO": siigo["DESCRIPCION"].to_numpy(),
+        "CODIGO_SIIGO": siigo["CODIGO_SIIGO"].to_numpy(),
+        "SIIGO": siigo["SIIGO"].to_numpy(),
+        "CONFIANZA": confianzas,
+        "METODO": metodos
+    }, columns=COLUMNAS)
+    return sugerencias.sort_values(
+        ["CONFIANZA", "REFERENCIA_MARCA", "REFERENCIA_SIIGO"], ascending=[False, True, True], kind="stable"
+    ).reset_index(drop=True)
@@ -1,138 +1,322 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from openpyxl.styles import PatternFill, Font
-from openpyxl import load_workbook
+from . import esquema
+from .coincidencias import sugerir_pares
+from .excel_writer import escribir_excel
+from .file_processor import motor_excel
+from .fuentes import RegistroFuentes
+from .instrumentacion import medir
+from .utils import ProcesoCancelado
+
+class AgregadoParcial:
+    """Resumen por REFERENCIA de un bloque de filas que se puede combinar con el de otros bloques.
+
+    totales tiene por índice la referencia y las columnas DESCRIPCION (primera no vacía, o NaN),
+    INVENTARIO MANUAL y SIIGO. valores guarda, por cada columna que se une como lista, los pares
+    (REFERENCIA, VALOR) distintos. Su tamaño depende de las referencias y no de las filas leídas.
+    """
+
+    def __init__(self, totales, valores):
+        self.totales = totales
+        self.valores = valores
+
+    def combinar(self, otro):
+        """Agrega a este resumen el de un bloque posterior; las descripciones de este tienen prioridad."""
+        unido = self.unir([self, otro])
+        self.totales, self.valores = unido.totales, unido.valores
+        return self
+
+    @classmethod
+    def unir(cls, agregados):
+        """Combina varios resúmenes en uno nuevo; las descripciones de los primeros tienen prioridad."""
+        agregados = list(agregados)
+        totales = pd.concat([agregado.totales for agregado in agregados])
+        totales = totales.groupby(level=0, sort=False).agg({
+            "DESCRIPCION": "first", "INVENTARIO MANUAL": "sum", "SIIGO": "sum"
+        })
+        valores = {
+            columna: pd.concat([agregado.valores[columna] for agregado in agregados], ignore_index=True).drop_duplicates()
+            for columna in agregados[0].valores
+        }
+        return cls(totales, valores)
+
 
 class ComparativeAnalyzer:
-    def __init__(self, logger):
+    COLUMNAS_FINALES = [
+        "REFERENCIA", 
+        "DESCRIPCION",
+        "ORIGEN",
+        "INVENTARIO MANUAL",
+        "SIIGO",
+        "DIFERENCIA",
+        "UBICACION_MARCAS",
+        "UBICACION_SIIGO",
+        "CODIGO_SIIGO"
+    ]
+
+    # Decimales de los totales por referencia. Sumar por bloques cambia el orden de las sumas y
+    # con él los últimos bits del resultado (78.24 frente a 78.24000000000001); al redondear,
+    # la tabla es la misma se lea el archivo completo o por bloques de cualquier tamaño
+    DECIMALES_TOTALES = 6
+
+    def __init__(self, logger, registro=None):
         self.logger = logger
-        self.rojo = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-        self.verde = PatternFill(start_color="99FF99", end_color="99FF99", fill_type="solid")
-        self.fuente_negra = Font(color="000000")
-        
-    def procesar_consolidado(self, ruta_consolidado):
+        # Los orígenes de marca y de Siigo se toman del registro de fuentes
+        self.registro = registro or RegistroFuentes.predeterminado()
+        # AgregadoParcial de las filas con referencia del último analizar o analizar_por_bloques,
+        # para combinarlo con el de otras tiendas (None si no hubo filas con referencia)
+        self.ultimo_agregado = None
+
+    def _unir_valores_unicos(self, grupos, valores, total_grupos):
+        """Une por grupo los valores únicos ordenados, separados por coma."""
+        codigos_valor, unicos = pd.factorize(valores, sort=True)
+        pares = pd.DataFrame({"GRUPO": grupos, "VALOR": codigos_valor}).drop_duplicates()
+        pares = pares.sort_values(["GRUPO", "VALOR"])
+        # Anteponer el separador a todo valor que no sea el primero de su grupo y concatenar
+        textos = pd.Series(unicos.take(pares["VALOR"].to_numpy()), dtype=object)
+        primero = ~pares["GRUPO"].duplicated().to_numpy()
+        textos = textos.where(primero, ", " + textos)
+        unidos = textos.groupby(pares["GRUPO"].to_numpy(), sort=False).sum()
+        return unidos.reindex(range(total_grupos), fill_value="").to_numpy()
+
+    def agregado_parcial(self, df_con_ref):
+        """Resume las filas con referencia en un AgregadoParcial que se puede combinar con otros.
+
+        df_con_ref debe seguir el esquema del consolidado (modules.esquema): los textos ya vienen
+        limpios y los valores ausentes son nulos.
+        """
+        # Cada referencia se reemplaza por su posición en el listado de referencias del bloque
+        grupos, referencias = pd.factorize(df_con_ref["REFERENCIA"])
+        total = len(referencias)
+        origen = df_con_ref["ORIGEN"]
+        es_marca = origen.isin(self.registro.origenes_marca).to_numpy()
+        es_siigo = origen.isin(self.registro.origenes_siigo).to_numpy()
+
+        # Primera descripción no nula de cada referencia, en el orden original
+        descripcion = df_con_ref["DESCRIPCION"]
+        con_descripcion = descripcion.notna().to_numpy()
+        descripciones = (
+            descripcion[con_descripcion]
+            .groupby(grupos[con_descripcion], sort=False).first()
+            .reindex(range(total))
+        )
+
+        # Cantidades de las marcas y de Siigo por referencia
+        cantidad = df_con_ref["CANTIDAD"]
+        totales = pd.DataFrame({
+            "DESCRIPCION": descripciones.to_numpy(),
+            "INVENTARIO MANUAL": cantidad.where(es_marca, 0).groupby(grupos).sum().reindex(range(total)).to_numpy(),
+            "SIIGO": cantidad.where(es_siigo, 0).groupby(grupos).sum().reindex(range(total)).to_numpy()
+        }, index=referencias)
+
+        def pares(filas, valores):
+            """Pares (REFERENCIA, VALOR) distintos de las filas indicadas."""
+            codigos_valor, unicos = pd.factorize(valores[filas])
+            distintos = pd.DataFrame({"GRUPO": grupos[filas], "VALOR": codigos_valor}).drop_duplicates()
+            return pd.DataFrame({
+                "REFERENCIA": referencias.take(distintos["GRUPO"].to_numpy()),
+                "VALOR": np.asarray(unicos.take(distintos["VALOR"].to_numpy()), dtype=object)
+            })
+
+        ubicacion = df_con_ref["UBICACION"]
+        con_ubicacion = ubicacion.notna().to_numpy()
+        codigos = df_con_ref["CODIGO_SIIGO"]
+        return AgregadoParcial(totales, {
+            "ORIGEN": pares(origen.notna().to_numpy(), origen),
+            "UBICACION_MARCAS": pares(con_ubicacion & es_marca, ubicacion),
+            "UBICACION_SIIGO": pares(con_ubicacion & es_siigo, ubicacion),
+            "CODIGO_SIIGO": pares(codigos.notna().to_numpy(), codigos)
+        })
+
+    def finalizar_agregado(self, agregado):
+        """Convierte un AgregadoParcial en la tabla comparativa, una fila por REFERENCIA ordenada."""
+        totales = agregado.totales
+        if totales.empty:
+            return pd.DataFrame(columns=self.COLUMNAS_FINALES)
+
+        grupos, referencias = pd.factorize(totales.index, sort=True)
+        totales = totales.iloc[np.argsort(grupos)]
+        total = len(referencias)
+        inventario_manual = np.round(totales["INVENTARIO MANUAL"].to_numpy(dtype=float), self.DECIMALES_TOTALES)
+        siigo = np.round(totales["SIIGO"].to_numpy(dtype=float), self.DECIMALES_TOTALES)
+
+        def unir(columna):
+            pares = agregado.valores[columna]
+            return self._unir_valores_unicos(
+                referencias.get_indexer(pares["REFERENCIA"]), pares["VALOR"].to_numpy(), total
+            )
+
+        tabla_final = pd.DataFrame({
+            "REFERENCIA": referencias,
+            "DESCRIPCION": totales["DESCRIPCION"].fillna("").to_numpy(),
+            "ORIGEN": unir("ORIGEN"),
+            "INVENTARIO MANUAL": inventario_manual,
+            "SIIGO": siigo,
+            "DIFERENCIA": inventario_manual - siigo,
+            "UBICACION_MARCAS": unir("UBICACION_MARCAS"),
+            "UBICACION_SIIGO": unir("UBICACION_SIIGO"),
+            "CODIGO_SIIGO": unir("CODIGO_SIIGO")
+        })
+        return tabla_final[self.COLUMNAS_FINALES]
+
+    def agregar_por_referencia(self, df_con_ref):
+        """Agrega las filas con referencia en una fila por REFERENCIA usando operaciones por columnas."""
+        if df_con_ref.empty:
+            return pd.DataFrame(columns=self.COLUMNAS_FINALES)
+        return self.finalizar_agregado(self.agregado_parcial(df_con_ref))
+
+    def separar_referencias(self, consolidado):
+        """Separa las filas del consolidado con y sin referencia."""
+        con_ref = consolidado["REFERENCIA"].notna().to_numpy()
+        return consolidado[con_ref], consolidado[~con_ref]
+
+    def filas_sin_referencia(self, df_sin_ref):
+        """Convierte cada fila sin referencia en una fila de la tabla comparativa."""
+        def texto(col):
+            return df_sin_ref[col].astype(object).fillna("")
+
+        sin_ref_processed = pd.DataFrame({
+            "REFERENCIA": "",
+            "DESCRIPCION": texto("DESCRIPCION"),
+            "ORIGEN": texto("ORIGEN"),
+            "INVENTARIO MANUAL": 0.0,
+            "SIIGO": df_sin_ref["CANTIDAD"],
+            "DIFERENCIA": df_sin_ref["CANTIDAD"],
+            "UBICACION_MARCAS": texto("UBICACION"),
+            "UBICACION_SIIGO": "",
+            "CODIGO_SIIGO": texto("CODIGO_SIIGO")
+        }, index=df_sin_ref.index)
+        return sin_ref_processed[self.COLUMNAS_FINALES]
+
+    def unir_tabla(self, tabla_con_ref, df_sin_ref):
+        """Agrega al final de la tabla por referencia las filas sin referencia."""
+        if df_sin_ref.empty:
+            return tabla_con_ref
+        if tabla_con_ref.empty:
+            return self.filas_sin_referencia(df_sin_ref).reset_index(drop=True)
+        return pd.concat([tabla_con_ref, self.filas_sin_referencia(df_sin_ref)], ignore_index=True)
+
+    def analizar(self, consolidado):
+        """Construye la tabla comparativa a partir del consolidado en memoria."""
+        try:
+            self.logger.agregar_log("Generando análisis comparativo...")
+            with medir("separacion de referencias", filas_entrada=len(consolidado)) as medicion:
+                df_con_ref, df_sin_ref = self.separar_referencias(consolidado)
+                medicion.detalles['sin_referencia'] = len(df_sin_ref)
+            with medir("agregacion por referencia", filas_entrada=len(df_con_ref)) as medicion:
+                self.ultimo_agregado = self.agregado_parcial(df_con_ref) if not df_con_ref.empty else None
+                if self.ultimo_agregado is None:
+                    tabla_con_ref = pd.DataFrame(columns=self.COLUMNAS_FINALES)
+                else:
+                    tabla_con_ref = self.finalizar_agregado(self.ultimo_agregado)
+                medicion.filas_salida = len(tabla_con_ref)
+            with medir("filas sin referencia", filas_entrada=len(df_sin_ref)) as medicion:
+                tabla_final = self.unir_tabla(tabla_con_ref, df_sin_ref)
+                medicion.filas_salida = len(tabla_final)
+            return tabla_final
+
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante el procesamiento: {str(e)}", 'error')
+            raise
+
+    def analizar_por_bloques(self, bloques):
+        """Construye la tabla comparativa a partir de bloques sucesivos del consolidado.
+
+        Cada bloque se resume en un AgregadoParcial y se descarta, de modo que en memoria solo
+        quedan el resumen por referencia y las filas sin referencia. El resultado es el mismo
+        que el de analizar sobre la concatenación de los bloques.
+        """
+        try:
+            self.logger.agregar_log("Generando análisis comparativo por bloques...")
+            agregado = None
+            sin_ref = []
+            for bloque in bloques:
+                df_con_ref, df_sin_ref = self.separar_referencias(bloque)
+                if not df_con_ref.empty:
+                    with medir("agregacion parcial", filas_entrada=len(df_con_ref)):
+                        parcial = self.agregado_parcial(df_con_ref)
+                        agregado = parcial if agregado is None else agregado.combinar(parcial)
+                if not df_sin_ref.empty:
+                    sin_ref.append(self.filas_sin_referencia(df_sin_ref))
+
+            self.ultimo_agregado = agregado
+            if agregado is None:
+                tabla_final = pd.DataFrame(columns=self.COLUMNAS_FINALES)
+            else:
+                with medir("agregacion por referencia") as medicion:
+                    tabla_final = self.finalizar_agregado(agregado)
+                    medicion.filas_salida = len(tabla_final)
+            if sin_ref:
+                tabla_final = pd.concat([tabla_final] + sin_ref, ignore_index=True)
+            return tabla_final
+
+        except ProcesoCancelado:
+            raise
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante el procesamiento: {str(e)}", 'error')
+            raise
+
+    def sugerir_coincidencias(self, tabla_final, limite=3, minimo=0.75):
+        """Propone pares de referencias que solo están en las marcas y referencias que solo están en Siigo.
+
+        Sirve para conciliar referencias escritas de otra forma en cada sistema ("11-23-456" y
+        "1123456"). Cada referencia de marca recibe hasta limite sugerencias con confianza de
+        al menos minimo (ver modules.coincidencias).
+        """
+        try:
+            con_ref = tabla_final[tabla_final["REFERENCIA"] != ""]
+            origenes = con_ref["ORIGEN"].str.split(", ").explode()
+            con_marca = origenes.isin(self.registro.origenes_marca).groupby(level=0).any()
+            con_siigo = origenes.isin(self.registro.origenes_siigo).groupby(level=0).any()
+            sugerencias = sugerir_pares(
+                con_ref[con_marca & ~con_siigo], con_ref[con_siigo & ~con_marca], limite, minimo
+            )
+            self.logger.agregar_log(f"Sugerencias de coincidencia de referencias: {len(sugerencias)}")
+            return sugerencias
+
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante el procesamiento: {str(e)}", 'error')
+            raise
+
+    def escribir_analisis(self, tabla_final, output_dir="outputs", sugerencias=None):
+        """Guarda la tabla comparativa en Excel y devuelve la ruta del archivo.
+
+        Si se indican sugerencias (sugerir_coincidencias), van en la hoja 'Sugerencias'.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(exist_ok=True)
+
+        analisis_file = output_dir / "Analisis_Comparativo.xlsx"
+        # Diferencias positivas en verde y negativas en rojo, como formato condicional
+        escribir_excel(
+            analisis_file, tabla_final, 'Comparativo', columna_signo='DIFERENCIA',
+            hojas_adicionales=[('Sugerencias', sugerencias)] if sugerencias is not None else ()
+        )
+        return analisis_file
+
+    def procesar_consolidado(self, ruta_consolidado, output_dir="outputs"):
         try:
             self.logger.agregar_log(f"\nProcesando archivo consolidado: {ruta_consolidado}...")
 
             df = pd.read_excel(
                 ruta_consolidado,
                 sheet_name="Consolidado",
+                engine=motor_excel(),
                 dtype={'CODIGO_SIIGO': str}  # Forzar lectura como string
             )
+            df = esquema.normalizar(df.rename(columns=str.strip))
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante el procesamiento: {str(e)}", 'error')
+            raise
 
-            df.columns = df.columns.str.strip()
-            df["REFERENCIA"] = df["REFERENCIA"].fillna("").astype(str).str.strip().replace("nan", "")
-            
-            # Modificación clave: Eliminar la transformación que agregaba ceros
-            df["CODIGO_SIIGO"] = df["CODIGO_SIIGO"].fillna("").astype(str).str.strip().replace("nan", "")
-
-            df_con_ref = df[df["REFERENCIA"] != ""].copy()
-            df_sin_ref = df[df["REFERENCIA"] == ""].copy()
-
-            columnas_finales = [
-                "REFERENCIA", 
-                "DESCRIPCION",
-                "ORIGEN",
-                "INVENTARIO MANUAL",
-                "SIIGO",
-                "DIFERENCIA",
-                "UBICACION_MARCAS",
-                "UBICACION_SIIGO",
-                "CODIGO_SIIGO"
-            ]
-
-            if not df_con_ref.empty:
-                agrupado = df_con_ref.groupby("REFERENCIA")
-                registros = []
-                for ref, grupo in agrupado:
-                    grupo = grupo.copy()
-                    
-                    descripcion = grupo['DESCRIPCION'][grupo['DESCRIPCION'].notna() & (grupo['DESCRIPCION'].astype(str).str.strip() != "")].astype(str)
-                    descripcion = descripcion.iloc[0] if not descripcion.empty else ""
-                    
-                    origenes = sorted(grupo['ORIGEN'].dropna().unique())
-                    origen_str = ", ".join(origenes)
-                    
-                    inventario_manual = grupo[grupo["ORIGEN"].isin(["STIHL", "SUZUKI", "YAMAHA"])]["CANTIDAD"].sum()
-                    siigo = grupo[grupo["ORIGEN"] == "SIIGO"]["CANTIDAD"].sum()
-                    diferencia = inventario_manual - siigo
-
-                    ubicacion_marcas = ", ".join(
-                        sorted(set(
-                            grupo[grupo["ORIGEN"].isin(["STIHL", "SUZUKI", "YAMAHA"])]["UBICACION"]
-                            .dropna().astype(str).str.strip().replace("nan", "")
-                        ))
-                    )
-
-                    ubicacion_siigo = ", ".join(
-                        sorted(set(
-                            grupo[grupo["ORIGEN"] == "SIIGO"]["UBICACION"]
-                            .dropna().astype(str).str.strip().replace("nan", "")
-                        ))
-                    )
-
-                    codigos_validos = []
-                    for codigo in grupo["CODIGO_SIIGO"]:
-                        codigo_str = str(codigo).strip()
-                        if codigo_str and codigo_str.lower() != "nan":
-                            codigos_validos.append(codigo_str)
-                    codigos_siigo = ", ".join(sorted(set(codigos_validos)))
-
-                    registros.append({
-                        "REFERENCIA": ref,
-                        "DESCRIPCION": descripcion,
-                        "ORIGEN": origen_str,
-                        "INVENTARIO MANUAL": inventario_manual,
-                        "SIIGO": siigo,
-                        "DIFERENCIA": diferencia,
-                        "UBICACION_MARCAS": ubicacion_marcas,
-                        "UBICACION_SIIGO": ubicacion_siigo,
-                        "CODIGO_SIIGO": codigos_siigo
-                    })
-
-                tabla_final = pd.DataFrame(registros)
-            else:
-                tabla_final = pd.DataFrame(columns=columnas_finales)
-
-            if not df_sin_ref.empty:
-                sin_ref_processed = df_sin_ref.copy()
-
-                sin_ref_processed['INVENTARIO MANUAL'] = 0
-                sin_ref_processed['SIIGO'] = sin_ref_processed['CANTIDAD']
-                sin_ref_processed['DIFERENCIA'] = sin_ref_processed['CANTIDAD']
-                sin_ref_processed['UBICACION_MARCAS'] = sin_ref_processed['UBICACION'].apply(
-                    lambda x: str(x).strip() if str(x).strip().lower() not in ["", "nan"] else ""
-                )
-                sin_ref_processed['UBICACION_SIIGO'] = ""
-                sin_ref_processed['CODIGO_SIIGO'] = sin_ref_processed['CODIGO_SIIGO'].fillna('').astype(str)
-
-                sin_ref_processed = sin_ref_processed[[
-                    "REFERENCIA", "DESCRIPCION", "ORIGEN", "INVENTARIO MANUAL",
-                    "SIIGO", "DIFERENCIA", "UBICACION_MARCAS", "UBICACION_SIIGO", "CODIGO_SIIGO"
-                ]]
-                
-                tabla_final = pd.concat([tabla_final, sin_ref_processed], ignore_index=True)
-
-            analisis_file = Path("outputs") / "Analisis_Comparativo.xlsx"
-            with pd.ExcelWriter(analisis_file, engine='openpyxl') as writer:
-                tabla_final.to_excel(writer, sheet_name='Comparativo', index=False)
-                
-                ws = writer.sheets['Comparativo']
-                
-                for row in ws.iter_rows(min_row=2, min_col=6, max_col=6):
-                    for cell in row:
-                        if cell.value > 0:
-                            cell.fill = self.verde
-                        elif cell.value < 0:
-                            cell.fill = self.rojo
-                        cell.font = self.fuente_negra
-
-                for sheet in writer.sheets.values():
-                    sheet.sheet_state = 'visible'
-
-            self.logger.agregar_log(f"Análisis comparativo creado: {analisis_file}", 'exito')
-            return analisis_file
-
+        tabla_final = self.analizar(df)
+        sugerencias = self.sugerir_coincidencias(tabla_final)
+        try:
+            analisis_file = self.escribir_analisis(tabla_final, output_dir, sugerencias)
         except Exception as e:
             self.logger.agregar_log(f"Error durante el procesamiento: {str(e)}", 'error')
             raise
+
+        self.logger.agregar_log(f"Análisis comparativo creado: {analisis_file}", 'exito')
+        return analisis_file
@@ -1,74 +1,172 @@
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from . import esquema
+from .excel_writer import LibroExcel, escribir_excel
 from .file_processor import FileProcessor
+from .fuentes import RegistroFuentes
+from .instrumentacion import Instrumentacion, medir, registrar
+from .logger import RegistroMemoria
+from .utils import ProcesoCancelado
+
+def _leer_archivo_en_proceso(archivo, fuente):
+    """Lee un archivo en un proceso aparte y devuelve (df, mensajes, etapas, error) para el proceso principal.
+
+    etapas son las mediciones de la lectura, para agregarlas a la instrumentación del proceso principal.
+    """
+    registro = RegistroMemoria()
+    instrumentacion = Instrumentacion()
+    try:
+        with instrumentacion.activar():
+            df = FileProcessor(registro).leer_archivo(archivo, fuente)
+        return df, registro.mensajes, instrumentacion.etapas, None
+    except Exception as e:
+        return None, registro.mensajes, instrumentacion.etapas, e
 
 class Consolidator:
-    def __init__(self, logger):
+    def __init__(self, logger, procesos=1, cache=None, registro=None):
         self.logger = logger
-        self.file_processor = FileProcessor(logger)
+        # Fuentes a leer; se leen y se concatenan en el orden del registro
+        self.registro = registro or RegistroFuentes.predeterminado()
+        self.file_processor = FileProcessor(logger, self.registro)
+        # Con más de un proceso los archivos se leen en paralelo
+        self.procesos = procesos
+        # CacheEntradas opcional para no volver a leer archivos sin cambios
+        self.cache = cache
+
+    def _leer_archivos(self, archivos_requeridos, progreso=None):
+        """Lee los archivos requeridos y devuelve los DataFrames en el orden del registro.
+
+        progreso, si se indica, se llama con (fracción leída, mensaje) tras cada archivo.
+        """
+        leidos = {}
+        claves = {}
+
+        def archivo_leido(nombre):
+            if progreso is not None:
+                progreso(len(leidos) / len(self.registro.fuentes), f"Archivo {archivos_requeridos[nombre].name} leído")
+
+        if self.cache is not None:
+            for fuente in self.registro.fuentes:
+                nombre = fuente.nombre
+                archivo = archivos_requeridos[nombre]
+                # Con otro lector de Excel la entrada se guarda aparte
+                claves[nombre] = self.cache.clave(archivo, f"{nombre}:{fuente.huella()}:{self.file_processor.lector}")
+                with medir(f"cache {archivo.name}") as medicion:
+                    df = self.cache.obtener(claves[nombre])
+                    medicion.filas_salida = len(df) if df is not None else None
+                if df is not None:
+                    self.logger.agregar_log(f"Archivo {archivo.name} sin cambios, cargado desde caché", 'exito')
+                    leidos[nombre] = df
+                    archivo_leido(nombre)
+
+        pendientes = [fuente.nombre for fuente in self.registro.fuentes if fuente.nombre not in leidos]
+        if self.procesos <= 1 or len(pendientes) <= 1:
+            for nombre in pendientes:
+                leidos[nombre] = self.file_processor.leer_archivo(archivos_requeridos[nombre], self.registro.fuente(nombre))
+                archivo_leido(nombre)
+        else:
+            self.logger.agregar_log(f"Leyendo archivos en paralelo con {self.procesos} procesos...")
+            with ProcessPoolExecutor(max_workers=min(self.procesos, len(pendientes))) as executor:
+                futuros = [
+                    executor.submit(_leer_archivo_en_proceso, archivos_requeridos[nombre], self.registro.fuente(nombre))
+                    for nombre in pendientes
+                ]
+                # Recoger en el orden de envío para que el log sea determinista
+                for nombre, futuro in zip(pendientes, futuros):
+                    df, mensajes, etapas, error = futuro.result()
+                    for mensaje, tipo in mensajes:
+                        self.logger.agregar_log(mensaje, tipo)
+                    registrar(etapas)
+                    if error is not None:
+                        raise error
+                    leidos[nombre] = df
+                    archivo_leido(nombre)
+
+        if self.cache is not None:
+            for nombre in pendientes:
+                self.cache.guardar(claves[nombre], leidos[nombre])
+
+        return [leidos[fuente.nombre] for fuente in self.registro.fuentes]
 
-    def crear_consolidado(self):
+    def consolidar(self, inputs_dir="inputs", progreso=None):
+        """Lee los archivos de la carpeta de entrada y devuelve el consolidado como DataFrame."""
         try:
             self.logger.agregar_log("Iniciando proceso de consolidación...")
 
-            inputs_dir = Path("inputs")
+            inputs_dir = Path(inputs_dir)
             if not inputs_dir.exists():
                 raise FileNotFoundError("No se encontró la carpeta 'inputs'")
 
-            archivos_requeridos = {
-                'STIHL': None,
-                'SUZUKI': None,
-                'YAMAHA': None,
-                'VALORACION': None
-            }
+            self.logger.agregar_log("Buscando archivos en la carpeta inputs...")
+            archivos_requeridos = self.registro.buscar_archivos(inputs_dir)
+
+            dfs = self._leer_archivos(archivos_requeridos, progreso)
+
+            # Los DataFrames ya vienen normalizados con el esquema del consolidado
+            with medir("concatenacion", filas_entrada=sum(len(df) for df in dfs)) as medicion:
+                consolidado = esquema.concatenar(dfs)
+                medicion.filas_salida = len(consolidado)
+            return consolidado
+
+        except ProcesoCancelado:
+            raise
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante la consolidación: {str(e)}", 'error')
+            raise
+
+    def consolidar_por_bloques(self, inputs_dir="inputs", filas_por_bloque=50000, progreso=None):
+        """Genera el consolidado en bloques de hasta filas_por_bloque filas, en el orden del registro.
+
+        Los archivos se leen uno tras otro sin caché ni procesos paralelos, para que en memoria
+        haya un solo bloque a la vez. progreso, si se indica, se llama con (fracción leída, mensaje)
+        tras cada archivo.
+        """
+        try:
+            self.logger.agregar_log("Iniciando proceso de consolidación por bloques...")
+
+            inputs_dir = Path(inputs_dir)
+            if not inputs_dir.exists():
+                raise FileNotFoundError("No se encontró la carpeta 'inputs'")
 
             self.logger.agregar_log("Buscando archivos en la carpeta inputs...")
-            for archivo in inputs_dir.glob("*.xlsx"):
-                nombre = archivo.stem.upper()
-                if 'STIHL' in nombre:
-                    archivos_requeridos['STIHL'] = archivo
-                elif 'SUZUKI' in nombre:
-                    archivos_requeridos['SUZUKI'] = archivo
-                elif 'YAMAHA' in nombre:
-                    archivos_requeridos['YAMAHA'] = archivo
-                elif 'VALORACION' in nombre or 'VALORACIÓN' in nombre:
-                    archivos_requeridos['VALORACION'] = archivo
-
-            for marca, archivo in archivos_requeridos.items():
-                if archivo is None:
-                    raise FileNotFoundError(f"No se encontró el archivo para {marca}")
-
-            dfs = []
-            for marca in ['STIHL', 'SUZUKI', 'YAMAHA']:
-                df_marca = self.file_processor.leer_archivo_marca(archivos_requeridos[marca], marca)
-                dfs.append(df_marca)
-
-            df_siigo = self.file_processor.leer_archivo_siigo(archivos_requeridos['VALORACION'])
-            dfs.append(df_siigo)
-
-            # Consolidar datos y limpiar valores 'nan'
-            consolidado = pd.concat(dfs, ignore_index=True)
-            
-            # Limpiar valores 'nan' en las columnas de texto
-            text_columns = ['REFERENCIA', 'DESCRIPCION', 'UBICACION', 'CODIGO_SIIGO', 'ORIGEN']
-            for col in text_columns:
-                if col in consolidado.columns:
-                    # Para todas las columnas de texto, incluyendo CODIGO_SIIGO
-                    consolidado[col] = consolidado[col].replace('nan', '').fillna('').astype(str)
-
-            # Crear carpeta 'outputs' si no existe
-            output_dir = Path("outputs")
-            output_dir.mkdir(exist_ok=True)
-
-            # Guardar consolidado
-            consolidado_file = output_dir / "Consolidado_Inventarios.xlsx"
-            with pd.ExcelWriter(consolidado_file, engine='openpyxl') as writer:
-                consolidado.to_excel(writer, sheet_name='Consolidado', index=False)
-                writer.sheets['Consolidado'].sheet_state = 'visible'
-
-            self.logger.agregar_log(f"Archivo consolidado creado: {consolidado_file}", 'exito')
-            return consolidado_file
+            archivos_requeridos = self.registro.buscar_archivos(inputs_dir)
+
+            for i, fuente in enumerate(self.registro.fuentes, start=1):
+                archivo = archivos_requeridos[fuente.nombre]
+                for bloque in self.file_processor.leer_archivo_por_bloques(archivo, fuente, filas_por_bloque):
+                    yield bloque.reset_index(drop=True)
+                if progreso is not None:
+                    progreso(i / len(self.registro.fuentes), f"Archivo {archivo.name} leído")
 
+        except ProcesoCancelado:
+            raise
         except Exception as e:
             self.logger.agregar_log(f"Error durante la consolidación: {str(e)}", 'error')
             raise
+
+    def _ruta_consolidado(self, output_dir):
+        # Crear carpeta 'outputs' si no existe
+        output_dir = Path(output_dir)
+        output_dir.mkdir(exist_ok=True)
+        return output_dir / "Consolidado_Inventarios.xlsx"
+
+    def escribir_consolidado(self, consolidado, output_dir="outputs"):
+        """Guarda el consolidado en Excel y devuelve la ruta del archivo."""
+        consolidado_file = self._ruta_consolidado(output_dir)
+        escribir_excel(consolidado_file, consolidado, 'Consolidado')
+        return consolidado_file
+
+    def abrir_consolidado(self, output_dir="outputs"):
+        """Abre el Excel del consolidado para escribirlo por bloques con LibroExcel.agregar."""
+        return LibroExcel(self._ruta_consolidado(output_dir), FileProcessor.COLUMNAS, 'Consolidado')
+
+    def crear_consolidado(self, inputs_dir="inputs", output_dir="outputs"):
+        consolidado = self.consolidar(inputs_dir)
+        try:
+            consolidado_file = self.escribir_consolidado(consolidado, output_dir)
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante la consolidación: {str(e)}", 'error')
+            raise
+
+        self.logger.agregar_log(f"Archivo consolidado creado: {consolidado_file}", 'exito')
+        return consolidado_file
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from .comparative_analyzer import AgregadoParcial
+from .excel_writer import escribir_excel
+from .instrumentacion import medir
+
+def nombres_tiendas(entradas):
+    """Nombra cada tienda por su carpeta de entrada, o por la carpeta que la contiene si se llama inputs.
+
+    Los nombres repetidos se distinguen con un sufijo numérico.
+    """
+    nombres = []
+    for entrada in entradas:
+        carpeta = Path(entrada).resolve()
+        nombre = carpeta.parent.name if carpeta.name.lower() == "inputs" and carpeta.parent.name else carpeta.name
+        base, numero = nombre, 2
+        while nombre in nombres:
+            nombre = f"{base} {numero}"
+            numero += 1
+        nombres.append(nombre)
+    return nombres
+
+
+class ParcialTienda:
+    """Lo que aporta una tienda al análisis de la empresa.
+
+    agregado es el AgregadoParcial de sus filas con referencia (None si no tiene) y tabla su
+    tabla comparativa. Se envía desde el proceso de cada tienda, así que no incluye el consolidado.
+    """
+
+    def __init__(self, tienda, agregado, tabla):
+        self.tienda = tienda
+        self.agregado = agregado
+        self.tabla = tabla
+
+
+class AnalisisEmpresa:
+    """Combina las tablas comparativas de varias tiendas en una sola para toda la empresa.
+
+    Las referencias se combinan a partir de los AgregadoParcial de cada tienda, con el mismo
+    resultado que analizar las entradas de todas las tiendas juntas, y la tabla conserva la
+    DIFERENCIA de cada tienda en una columna propia.
+    """
+
+    ARCHIVO = "Analisis_Comparativo_Empresa.xlsx"
+
+    def __init__(self, logger, analyzer):
+        self.logger = logger
+        self.analyzer = analyzer
+
+    def parcial(self, tienda, pipeline, resultado):
+        """Arma el ParcialTienda de una ejecución del pipeline."""
+        agregado = pipeline.analyzer.ultimo_agregado
+        if pipeline.incremental is not None and resultado['consolidado'] is not None:
+            # El análisis incremental solo agrega las referencias que cambiaron
+            df_con_ref, _ = pipeline.analyzer.separar_referencias(resultado['consolidado'])
+            agregado = pipeline.analyzer.agregado_parcial(df_con_ref) if not df_con_ref.empty else None
+        return ParcialTienda(tienda, agregado, resultado['analisis'])
+
+    def combinar(self, parciales):
+        """Devuelve (tabla comparativa de la empresa, tablas de las tiendas una debajo de otra).
+
+        La tabla de la empresa agrega a las columnas de la tabla comparativa TIENDAS, con las
+        tiendas donde aparece cada referencia, y una columna "DIFERENCIA <tienda>" por tienda,
+        vacía donde la tienda no tiene la referencia. Las filas sin referencia de cada tienda
+        van al final.
+        """
+        try:
+            self.logger.agregar_log(f"Combinando el análisis de {len(parciales)} tiendas...")
+            columnas = self.analyzer.COLUMNAS_FINALES
+            with medir("analisis de empresa") as medicion:
+                agregados = [parcial.agregado for parcial in parciales if parcial.agregado is not None]
+                if agregados:
+                    tabla = self.analyzer.finalizar_agregado(AgregadoParcial.unir(agregados))
+                else:
+                    tabla = pd.DataFrame(columns=columnas)
+
+                referencias = pd.Index(tabla["REFERENCIA"])
+                tiendas = np.full(len(tabla), "", dtype=object)
+                for parcial in parciales:
+                    if parcial.agregado is None:
+                        diferencia = np.full(len(tabla), np.nan)
+                    else:
+                        totales = parcial.agregado.totales
+                        diferencia = (totales["INVENTARIO MANUAL"] - totales["SIIGO"]).reindex(referencias).to_numpy()
+                    presente = ~np.isnan(diferencia)
+                    tiendas[presente] = tiendas[presente] + ", " + parcial.tienda
+                    tabla[f"DIFERENCIA {parcial.tienda}"] = diferencia
+                tabla.insert(len(columnas), "TIENDAS", pd.Series(tiendas, dtype=object).str[2:].to_numpy())
+
+                sin_ref = []
+                for parcial in parciales:
+                    filas = parcial.tabla[parcial.tabla["REFERENCIA"] == ""]
+                    if not filas.empty:
+                        sin_ref.append(filas.assign(**{
+                            "TIENDAS": parcial.tienda, f"DIFERENCIA {parcial.tienda}": filas["DIFERENCIA"]
+                        }))
+                if sin_ref:
+                    tabla = pd.concat([tabla] + sin_ref, ignore_index=True)[tabla.columns]
+
+                por_tienda = pd.concat(
+                    [parcial.tabla.assign(TIENDA=parcial.tienda)[["TIENDA"] + columnas] for parcial in parciales],
+                    ignore_index=True
+                )
+                medicion.filas_salida = len(tabla)
+            self.logger.agregar_log(f"Análisis de la empresa: {len(tabla)} filas", 'exito')
+            return tabla, por_tienda
+
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante el procesamiento: {str(e)}", 'error')
+            raise
+
+    def escribir(self, tabla, por_tienda, output_dir="outputs"):
+        """Guarda el análisis de la empresa en Excel y devuelve la ruta del archivo."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return escribir_excel(
+            output_dir / self.ARCHIVO, tabla, 'Comparativo', columna_signo='DIFERENCIA',
+            hojas_adicionales=[('Por tienda', por_tienda)]
+        )
@@ -0,0 +1,77 @@
+"""Esquema del consolidado: columnas, tipos y normalización que se aplica una sola vez al leer.
+
+Las columnas de texto quedan limpias (sin espacios al inicio ni al final) y los valores
+ausentes son nulos reales: un texto vacío o 'nan' se trata como ausente. ORIGEN y UBICACION
+son categorías y CANTIDAD es float64, con 0 para los valores no numéricos.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow  # noqa: F401
+    # Textos respaldados por Arrow: menos memoria y operaciones de texto más rápidas
+    TEXTO = pd.StringDtype("pyarrow")
+except ImportError:  # pyarrow es opcional; sin él se usan los textos de pandas
+    TEXTO = pd.StringDtype("python")
+
+COLUMNAS = ['REFERENCIA', 'DESCRIPCION', 'CANTIDAD', 'ORIGEN', 'UBICACION', 'CODIGO_SIIGO']
+COLUMNAS_TEXTO = ['REFERENCIA', 'DESCRIPCION', 'CODIGO_SIIGO']
+COLUMNAS_CATEGORIA = ['ORIGEN', 'UBICACION']
+
+def _limpiar(serie):
+    """Limpia cada valor distinto una sola vez y devuelve una serie object con NaN como ausente."""
+    codigos, unicos = pd.factorize(serie)
+    limpios = pd.Series(np.asarray(unicos, dtype=object)).astype(str).str.strip()
+    limpios = limpios.mask((limpios == "") | (limpios.str.lower() == "nan"))
+    # El código -1 (nulo) toma el NaN agregado al final
+    valores = np.append(limpios.to_numpy(dtype=object), np.nan)
+    return pd.Series(valores[codigos], index=serie.index, dtype=object)
+
+def texto(serie):
+    """Convierte a texto limpio, con nulos en lugar de vacíos o 'nan'."""
+    if serie.dtype == TEXTO and TEXTO.storage == "pyarrow":
+        # Ya es texto de Arrow (CSV, Parquet): se limpia en Arrow sin pasar por objetos de Python
+        limpios = serie.str.strip()
+        return limpios.mask(((limpios == "") | (limpios.str.lower() == "nan")).fillna(False))
+    return _limpiar(serie).astype(TEXTO)
+
+def categoria(serie):
+    """Como texto, pero como categoría: cada valor distinto se guarda una sola vez."""
+    return _limpiar(serie).astype("category")
+
+def cantidad(serie):
+    if serie.dtype == TEXTO and TEXTO.storage == "pyarrow":
+        try:
+            # Conversión en Arrow; si algún valor no es un número se usa to_numeric
+            return serie.astype("float64[pyarrow]").fillna(0).astype("float64")
+        except ValueError:  # pyarrow.ArrowInvalid es un ValueError
+            pass
+    return pd.to_numeric(serie, errors='coerce').fillna(0).astype("float64")
+
+def normalizar(df):
+    """Devuelve df con las columnas del consolidado en su orden y con sus tipos."""
+    columnas = {}
+    for col in COLUMNAS:
+        serie = df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if col in COLUMNAS_TEXTO:
+            columnas[col] = texto(serie)
+        elif col in COLUMNAS_CATEGORIA:
+            columnas[col] = categoria(serie)
+        else:
+            columnas[col] = cantidad(serie)
+    return pd.DataFrame(columnas, index=df.index)
+
+def concatenar(dfs):
+    """Concatena DataFrames ya normalizados sin perder las categorías.
+
+    pd.concat convierte a object las categorías con valores distintos en cada DataFrame;
+    aquí se unen las categorías de todos antes de concatenar.
+    """
+    dfs = list(dfs)
+    if not dfs:
+        return normalizar(pd.DataFrame(columns=COLUMNAS))
+    resultado = pd.concat([df.drop(columns=COLUMNAS_CATEGORIA) for df in dfs], ignore_index=True)
+    for col in COLUMNAS_CATEGORIA:
+        resultado[col] = union_categoricals([df[col] for df in dfs])
+    return resultado[COLUMNAS]
@@ -0,0 +1,152 @@
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from pathlib import Path
+from .instrumentacion import medir
+
+try:
+    import xlsxwriter
+except ImportError:  # xlsxwriter es opcional; sin él se usa openpyxl en modo write-only
+    xlsxwriter = None
+
+# Colores de la columna de diferencias
+VERDE = "99FF99"
+ROJO = "FF9999"
+
+# Filas que se convierten a objetos de Python a la vez
+TAMANO_BLOQUE = 10000
+
+def motor_disponible():
+    return "xlsxwriter" if xlsxwriter is not None else "openpyxl"
+
+def _filas(df):
+    """Recorre las filas de df como tuplas de valores de Python, con None en lugar de NaN."""
+    for inicio in range(0, len(df), TAMANO_BLOQUE):
+        bloque = df.iloc[inicio:inicio + TAMANO_BLOQUE].astype(object)
+        bloque = bloque.where(bloque.notna(), None)
+        yield from bloque.itertuples(index=False, name=None)
+
+class LibroExcel:
+    """Hoja de Excel que se escribe por bloques de filas, sin armar el libro completo en memoria.
+
+    Los bloques deben tener las columnas indicadas al crear el libro (o la hoja, con nueva_hoja).
+    Si se indica columna_signo, sus valores positivos se pintan de verde y los negativos de rojo
+    mediante formato condicional al terminar la hoja. motor puede ser 'xlsxwriter' u 'openpyxl';
+    por defecto se usa xlsxwriter cuando está instalado.
+    """
+
+    def __init__(self, ruta, columnas, hoja, columna_signo=None, motor=None):
+        self.ruta = ruta
+        self.motor = motor or motor_disponible()
+        if self.motor == "xlsxwriter":
+            if xlsxwriter is None:
+                raise ImportError("xlsxwriter no está instalado")
+            self._libro = xlsxwriter.Workbook(str(self.ruta), {
+                'constant_memory': True,
+                'strings_to_numbers': False,
+                'strings_to_formulas': False,
+                'strings_to_urls': False,
+                'nan_inf_to_errors': True
+            })
+        elif self.motor == "openpyxl":
+            self._libro = Workbook(write_only=True)
+        else:
+            raise ValueError(f"Motor de escritura desconocido: {self.motor}")
+        self._abrir_hoja(hoja, columnas, columna_signo)
+
+    def _abrir_hoja(self, hoja, columnas, columna_signo):
+        self.columnas = list(columnas)
+        self.columna_signo = columna_signo
+        # Filas de datos escritas en la hoja actual
+        self.filas = 0
+        if self.motor == "xlsxwriter":
+            self._abrir_xlsxwriter(hoja)
+        else:
+            self._abrir_openpyxl(hoja)
+
+    def nueva_hoja(self, hoja, columnas, columna_signo=None):
+        """Termina la hoja actual y continúa en una hoja nueva con las columnas indicadas."""
+        self._formato_signo()
+        self._abrir_hoja(hoja, columnas, columna_signo)
+
+    def _abrir_xlsxwriter(self, hoja):
+        self._hoja = self._libro.add_worksheet(hoja)
+        encabezado = self._libro.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self._hoja.write_row(0, 0, [str(col) for col in self.columnas], encabezado)
+
+    def _abrir_openpyxl(self, hoja):
+        self._hoja = self._libro.create_sheet(hoja)
+        negrita = Font(bold=True)
+        encabezado = []
+        for col in self.columnas:
+            celda = WriteOnlyCell(self._hoja, value=str(col))
+            celda.font = negrita
+            encabezado.append(celda)
+        self._hoja.append(encabezado)
+
+    def agregar(self, df):
+        """Agrega las filas de df a continuación de las ya escritas."""
+        if self.motor == "xlsxwriter":
+            for i, fila in enumerate(_filas(df), start=self.filas + 1):
+                self._hoja.write_row(i, 0, fila)
+        else:
+            for fila in _filas(df):
+                self._hoja.append(fila)
+        self.filas += len(df)
+
+    def _formato_signo(self):
+        if self.columna_signo is None or not self.filas:
+            return
+        col = self.columnas.index(self.columna_signo)
+        if self.motor == "xlsxwriter":
+            for criterio, color in (('>', VERDE), ('<', ROJO)):
+                formato = self._libro.add_format({'bg_color': f"#{color}", 'font_color': '#000000'})
+                self._hoja.conditional_format(1, col, self.filas, col, {
+                    'type': 'cell', 'criteria': criterio, 'value': 0, 'format': formato
+                })
+        else:
+            letra = get_column_letter(col + 1)
+            rango = f"{letra}2:{letra}{self.filas + 1}"
+            for operador, color in (('greaterThan', VERDE), ('lessThan', ROJO)):
+                relleno = PatternFill(start_color=color, end_color=color, fill_type="solid")
+                self._hoja.conditional_formatting.add(
+                    rango, CellIsRule(operator=operador, formula=['0'], fill=relleno, font=Font(color="000000"))
+                )
+
+    def cerrar(self):
+        """Aplica el formato condicional y guarda el archivo."""
+        if self.motor == "xlsxwriter":
+            try:
+                self._formato_signo()
+            finally:
+                self._libro.close()
+        else:
+            self._formato_signo()
+            self._libro.save(self.ruta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+def escribir_excel(ruta, df, hoja, columna_signo=None, motor=None, hojas_adicionales=()):
+    """Escribe df en la hoja indicada fila por fila, sin armar el libro completo en memoria.
+
+    Si se indica columna_signo, sus valores positivos se pintan de verde y los negativos
+    de rojo mediante formato condicional. hojas_adicionales son pares (hoja, df) que se
+    escriben después, en ese orden. motor puede ser 'xlsxwriter' u 'openpyxl'; por defecto
+    se usa xlsxwriter cuando está instalado.
+    """
+    with medir(f"escritura {Path(ruta).name}", filas_entrada=len(df)) as medicion:
+        with LibroExcel(ruta, df.columns, hoja, columna_signo, motor) as libro:
+            libro.agregar(df)
+            filas = libro.filas
+            for nombre, adicional in hojas_adicionales:
+                libro.nueva_hoja(nombre, adicional.columns)
+                libro.agregar(adicional)
+        medicion.filas_salida = filas
+        medicion.detalles['motor'] = libro.motor
+    return ruta
@@ -0,0 +1,129 @@
+import re
+import numpy as np
+import pandas as pd
+
+SIGNOS = ('positiva', 'negativa', 'cero')
+
+class IndiceOrdenado:
+    """Índice de claves de texto a posiciones de filas, para búsquedas exactas o por prefijo.
+
+    Las claves distintas quedan ordenadas y las posiciones agrupadas por clave en ese orden,
+    así que las filas de todas las claves que empiezan por un prefijo forman un solo tramo
+    contiguo: cada búsqueda son dos búsquedas binarias y una rebanada. Con mayusculas, las
+    claves se comparan sin distinguir mayúsculas; las vacías o faltantes no se indexan.
+    """
+
+    def __init__(self, claves, posiciones=None, mayusculas=True):
+        claves = pd.Series(claves, dtype=object).reset_index(drop=True)
+        posiciones = np.arange(len(claves)) if posiciones is None else np.asarray(posiciones)
+        self.mayusculas = mayusculas
+        # Las claves se repiten mucho (orígenes, palabras), así que se normalizan y ordenan las distintas
+        codigos, unicos = pd.factorize(claves)
+        unicos = pd.Series(unicos, dtype=object)
+        if mayusculas:
+            unicos = unicos.str.upper()
+        recodigos, unicos = pd.factorize(unicos.replace("", np.nan), sort=True)
+        codigos = np.where(codigos >= 0, recodigos[codigos], -1)
+        validas = codigos >= 0
+        codigos, posiciones = codigos[validas], posiciones[validas]
+        orden = np.argsort(codigos, kind='stable')
+        self.claves = np.asarray(unicos, dtype=object)
+        self.posiciones = posiciones[orden]
+        self.limites = np.concatenate([[0], np.cumsum(np.bincount(codigos, minlength=len(self.claves)))])
+
+    def _clave(self, clave):
+        return str(clave).upper() if self.mayusculas else str(clave)
+
+    def _tramo(self, desde, hasta):
+        return self.posiciones[self.limites[desde]:self.limites[hasta]]
+
+    def buscar(self, clave):
+        """Posiciones de las filas cuya clave es exactamente clave."""
+        clave = self._clave(clave)
+        return self._tramo(np.searchsorted(self.claves, clave, 'left'), np.searchsorted(self.claves, clave, 'right'))
+
+    def prefijo(self, prefijo):
+        """Posiciones de las filas cuya clave empieza por prefijo."""
+        prefijo = self._clave(prefijo)
+        return self._tramo(
+            np.searchsorted(self.claves, prefijo, 'left'),
+            np.searchsorted(self.claves, prefijo + "\U0010ffff", 'left')
+        )
+
+
+def _tokens(serie):
+    """Separa cada texto en palabras; devuelve (palabras, posición de su fila)."""
+    palabras = serie.astype(object).fillna("").str.upper().str.split(r"[^\w]+", regex=True).explode()
+    palabras = palabras[palabras.notna() & (palabras != "")]
+    return palabras.to_numpy(dtype=object), palabras.index.to_numpy()
+
+
+class ExploradorResultados:
+    """Filtros y búsquedas en memoria sobre la tabla comparativa y el consolidado de una ejecución.
+
+    Se arma una vez por ejecución con índices por REFERENCIA, CODIGO_SIIGO y palabras de la
+    DESCRIPCION, de modo que filtrar, buscar y ver las filas del consolidado que componen
+    una referencia no recorre las tablas completas.
+    """
+
+    def __init__(self, analisis, consolidado=None):
+        self.analisis = analisis.reset_index(drop=True)
+        self.consolidado = consolidado.reset_index(drop=True) if consolidado is not None else None
+
+        diferencia = self.analisis["DIFERENCIA"].to_numpy(dtype=float)
+        self.signos = {'positiva': diferencia > 0, 'negativa': diferencia < 0, 'cero': diferencia == 0}
+        origenes = self.analisis["ORIGEN"].astype(object).fillna("").str.split(", ").explode()
+        origenes = origenes[origenes != ""]
+        self.origenes = sorted(origenes.unique())
+        self._por_origen = IndiceOrdenado(origenes.to_numpy(dtype=object), origenes.index.to_numpy())
+
+        self._referencias = IndiceOrdenado(self.analisis["REFERENCIA"])
+        codigos = self.analisis["CODIGO_SIIGO"].astype(object).fillna("").str.split(", ").explode()
+        self._codigos = IndiceOrdenado(codigos.to_numpy(dtype=object), codigos.index.to_numpy())
+        self._palabras = IndiceOrdenado(*_tokens(self.analisis["DESCRIPCION"]))
+
+        # Las filas sin referencia van al final de la tabla, en el orden del consolidado
+        self._primera_sin_referencia = int((self.analisis["REFERENCIA"] != "").sum())
+        if self.consolidado is not None:
+            self._consolidado_por_referencia = IndiceOrdenado(self.consolidado["REFERENCIA"], mayusculas=False)
+            self._consolidado_sin_referencia = np.flatnonzero(self.consolidado["REFERENCIA"].isna().to_numpy())
+
+    def buscar(self, texto):
+        """Posiciones de las filas cuya REFERENCIA o CODIGO_SIIGO empieza por texto, o cuya
+        DESCRIPCION tiene palabras que empiezan por cada palabra de texto."""
+        texto = texto.strip()
+        if not texto:
+            return np.arange(len(self.analisis))
+        encontradas = [self._referencias.prefijo(texto), self._codigos.prefijo(texto)]
+        palabras = [palabra for palabra in re.split(r"[^\w]+", texto.upper()) if palabra]
+        if palabras:
+            coincidencias = self._palabras.prefijo(palabras[0])
+            for palabra in palabras[1:]:
+                coincidencias = np.intersect1d(coincidencias, self._palabras.prefijo(palabra))
+            encontradas.append(coincidencias)
+        return np.unique(np.concatenate(encontradas))
+
+    def filtrar(self, texto="", signo=None, origen=None):
+        """Posiciones ordenadas de las filas que cumplen la búsqueda, el signo de DIFERENCIA
+        (uno de SIGNOS) y el ORIGEN indicados; None no filtra."""
+        filas = self.buscar(texto)
+        if signo is not None:
+            filas = filas[self.signos[signo][filas]]
+        if origen is not None:
+            filas = np.intersect1d(filas, self._por_origen.buscar(origen))
+        return filas
+
+    def filas(self, posiciones):
+        """Filas de la tabla comparativa en las posiciones indicadas."""
+        return self.analisis.iloc[posiciones]
+
+    def detalle(self, posicion):
+        """Filas del consolidado que componen la fila de la tabla comparativa en posicion."""
+        if self.consolidado is None:
+            return None
+        referencia = self.analisis["REFERENCIA"].iat[posicion]
+        if referencia != "":
+            filas = np.sort(self._consolidado_por_referencia.buscar(referencia))
+        else:
+            filas = self._consolidado_sin_referencia[posicion - self._primera_sin_referencia:][:1]
+        return self.consolidado.iloc[filas]
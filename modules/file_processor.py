@@ -1,67 +1,502 @@
+import csv
+import os
+import re
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+from . import esquema
+from .fuentes import RegistroFuentes
+from .instrumentacion import medir
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional; sin él los CSV se leen con pandas y no se aceptan Parquet ni Arrow
+    pa = None
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # python-calamine es opcional (0.3 o posterior); sin él los Excel se leen con openpyxl
+    CalamineWorkbook = None
+
+LECTORES = ("calamine", "openpyxl")
+
+# Variable de entorno para elegir el lector de Excel; calamine solo se usa si se pide
+VARIABLE_LECTOR = "PROFIBRA_LECTOR_EXCEL"
+
+# pd.read_excel acepta engine="calamine" desde pandas 2.2
+PANDAS_CALAMINE = (2, 2)
+
+def lector_disponible():
+    """Lector de Excel por defecto: openpyxl, o calamine si PROFIBRA_LECTOR_EXCEL=calamine y está instalado."""
+    lector = os.environ.get(VARIABLE_LECTOR, "").strip().lower()
+    return "calamine" if lector == "calamine" and CalamineWorkbook is not None else "openpyxl"
+
+def motor_excel():
+    """engine para pd.read_excel: el lector por defecto, salvo calamine con pandas anterior a 2.2."""
+    version = tuple(int(parte) for parte in re.findall(r"\d+", pd.__version__)[:2])
+    return "openpyxl" if version < PANDAS_CALAMINE else lector_disponible()
+
+def _filas_calamine(hoja):
+    """Filas de una hoja de calamine a partir de A1, como las entrega openpyxl.
+
+    calamine empieza en la primera celda usada, así que se anteponen las filas y columnas
+    vacías anteriores para que la fila de encabezados tenga el mismo número con ambos lectores.
+    """
+    fila_inicial, columna_inicial = hoja.start or (0, 0)
+    for _ in range(fila_inicial):
+        yield ()
+    relleno = [""] * columna_inicial
+    for fila in hoja.iter_rows():
+        yield relleno + fila if relleno else fila
 
 class FileProcessor:
-    def __init__(self, logger):
+    # Versión del formato de los DataFrames devueltos; cambiarla invalida la caché de entradas
+    VERSION = 4
+
+    # Cantidad máxima de filas que se revisan buscando los encabezados
+    MAX_FILAS_ENCABEZADO = 100
+
+    # Columnas de los DataFrames normalizados, en el orden del consolidado
+    COLUMNAS = esquema.COLUMNAS
+
+    # Formatos de entrada distintos de Excel, por extensión
+    FORMATOS_TABLA = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
+
+    # Separadores que se prueban en los CSV y bytes del comienzo que se usan para detectarlos
+    SEPARADORES_CSV = (',', ';', '\t', '|')
+    MUESTRA_CSV = 256 * 1024
+
+    def __init__(self, logger, registro=None, lector=None):
         self.logger = logger
+        # RegistroFuentes para leer por nombre de fuente; por defecto el de fuentes.toml
+        self.registro = registro
+        # Lector de las hojas de Excel: 'calamine' u 'openpyxl'; por defecto el de lector_disponible()
+        self.lector = lector or lector_disponible()
+        if self.lector not in LECTORES:
+            raise ValueError(f"Lector de Excel desconocido: {self.lector}")
+        if self.lector == "calamine" and CalamineWorkbook is None:
+            raise ImportError("python-calamine no está instalado")
+
+    def _convertir_fila(self, fila):
+        """Convierte los valores de una fila igual que pd.read_excel (motor openpyxl).
+
+        Las celdas vacías llegan como None de openpyxl y como "" de calamine.
+        """
+        convertida = []
+        for valor in fila:
+            if valor is None:
+                valor = ""
+            elif isinstance(valor, float) and valor.is_integer():
+                valor = int(valor)
+            elif isinstance(valor, str) and valor in ERROR_CODES:
+                valor = np.nan
+            convertida.append(valor)
+        while convertida and convertida[-1] == "":
+            convertida.pop()
+        return convertida
 
-    def _buscar_fila_encabezados(self, df_raw, columnas_clave):
-        """Busca la fila que contiene los encabezados requeridos."""
-        for i, fila in df_raw.iterrows():
-            valores = [str(cell).upper().strip() for cell in fila.values]
+    def _buscar_fila_encabezados(self, filas, columnas_clave):
+        """Busca la fila que contiene los encabezados requeridos entre las primeras filas."""
+        revisadas = []
+        for i, fila in enumerate(filas):
+            fila = self._convertir_fila(fila)
+            valores = {str(cell).upper().strip() for cell in fila}
             if all(any(col in valores for col in cols) for cols in columnas_clave):
-                return i
-        return None
-
-    def _mapear_columnas(self, df, mapeo_columnas):
-        """Renombra columnas según el mapeo proporcionado."""
-        columnas_renombradas = {}
-        for col in df.columns:
-            col_upper = str(col).upper().strip()
-            for key, values in mapeo_columnas.items():
-                if any(v == col_upper for v in values):
-                    columnas_renombradas[col] = key
+                return i, fila, revisadas
+            revisadas.append(fila)
+            if len(revisadas) >= self.MAX_FILAS_ENCABEZADO:
+                break
+        return None, None, revisadas
+
+    def _armar_bloque(self, encabezados, filas, dtype):
+        """Convierte las filas de un bloque (con los encabezados) en un DataFrame, igual que read_excel."""
+        with medir("inferencia de tipos", filas_entrada=len(filas)) as medicion:
+            datos = [encabezados] + filas
+            ancho = max(len(fila) for fila in datos)
+            datos = [fila + [""] * (ancho - len(fila)) for fila in datos]
+            df = TextParser(datos, header=0, dtype=dtype or None, skip_blank_lines=False).read()
+            medicion.filas_salida = len(df)
+        return df
+
+    @contextmanager
+    def _abrir_hoja(self, archivo):
+        """Abre la primera hoja con el lector elegido y entrega sus filas como secuencias de valores."""
+        if self.lector == "calamine":
+            # calamine lee la hoja en código compilado sin crear un objeto por celda
+            libro = CalamineWorkbook.from_path(str(archivo))
+            try:
+                yield _filas_calamine(libro.get_sheet_by_index(0))
+            finally:
+                libro.close()
+        else:
+            libro = load_workbook(archivo, read_only=True, data_only=True, keep_links=False)
+            try:
+                hoja = libro.worksheets[0]
+                hoja.reset_dimensions()
+                yield hoja.iter_rows(values_only=True)
+            finally:
+                libro.close()
+
+    def _iterar_hoja(self, archivo, fuente, filas_por_bloque=None):
+        """Recorre la primera hoja en una sola pasada, detectando la fila de encabezados de la fuente.
+
+        Genera (fila_encabezados, df) por cada bloque de hasta filas_por_bloque filas de datos;
+        sin filas_por_bloque genera un único bloque con toda la hoja. Si no se encuentran los
+        encabezados genera solo (None, df) con las primeras filas revisadas, sin encabezado.
+        """
+        with self._abrir_hoja(archivo) as filas:
+            with medir("deteccion de encabezados") as medicion:
+                fila_encabezados, encabezados, revisadas = self._buscar_fila_encabezados(filas, fuente.encabezado)
+                medicion.detalles['fila'] = fila_encabezados + 1 if fila_encabezados is not None else None
+                medicion.detalles['lector'] = self.lector
+            if fila_encabezados is None:
+                yield None, pd.DataFrame(revisadas)
+                return
+
+            # Todo lo que no es numérico en el registro se lee como texto: se conservan los ceros a
+            # la izquierda de los códigos y una referencia numérica da el mismo texto ("1001") en
+            # todos los bloques, tenga o no celdas vacías el bloque
+            dtype = {valor: str for valor in encabezados if not fuente.es_numerica(valor)}
+
+            # Continuar con el mismo iterador: las filas ya leídas no se vuelven a parsear.
+            # Las filas vacías se retienen hasta ver una fila con datos, así se descartan las del final
+            bloque = []
+            vacias = []
+            generado = False
+            for fila in filas:
+                fila = self._convertir_fila(fila)
+                if not fila:
+                    vacias.append(fila)
+                    continue
+                bloque.extend(vacias)
+                vacias = []
+                bloque.append(fila)
+                if filas_por_bloque and len(bloque) >= filas_por_bloque:
+                    yield fila_encabezados, self._armar_bloque(encabezados, bloque, dtype)
+                    bloque = []
+                    generado = True
+            if bloque or not generado:
+                yield fila_encabezados, self._armar_bloque(encabezados, bloque, dtype)
+
+    def _iterar(self, archivo, fuente, filas_por_bloque=None):
+        """Recorre un archivo de Excel, CSV, Parquet o Arrow según su extensión, como _iterar_hoja."""
+        formato = self.FORMATOS_TABLA.get(Path(archivo).suffix.lower())
+        if formato is None:
+            return self._iterar_hoja(archivo, fuente, filas_por_bloque)
+        return self._iterar_tabla(archivo, fuente, formato, filas_por_bloque)
+
+    def _leer_hoja(self, archivo, fuente):
+        """Lee el archivo completo; devuelve (fila_encabezados, df) como _iterar_hoja."""
+        (resultado,) = self._iterar(archivo, fuente)
+        return resultado
+
+    def _detectar_csv(self, archivo, fuente):
+        """Detecta codificación, separador y fila de encabezados de un CSV.
+
+        Devuelve (codificacion, separador, fila_encabezados, encabezados, revisadas); sin
+        encabezados, fila_encabezados es None y revisadas son las primeras filas.
+        """
+        with open(archivo, "rb") as f:
+            muestra = f.read(self.MUESTRA_CSV)
+        for codificacion in ("utf-8-sig", "cp1252", "latin-1"):
+            try:
+                texto = muestra.decode(codificacion)
+                break
+            except UnicodeDecodeError as e:
+                # La muestra puede cortar al final un carácter de varios bytes
+                if codificacion == "utf-8-sig" and e.start >= len(muestra) - 3 and len(muestra) == self.MUESTRA_CSV:
+                    texto = muestra[:e.start].decode(codificacion)
                     break
+        lineas = texto.splitlines()
+        if len(muestra) == self.MUESTRA_CSV:
+            lineas = lineas[:-1]
+
+        primeras = None
+        for separador in self.SEPARADORES_CSV:
+            filas = csv.reader(lineas, delimiter=separador)
+            fila_encabezados, encabezados, revisadas = self._buscar_fila_encabezados(filas, fuente.encabezado)
+            if fila_encabezados is not None:
+                return codificacion, separador, fila_encabezados, encabezados, revisadas
+            primeras = primeras or revisadas
+        return codificacion, None, None, None, primeras
+
+    def _como_texto(self, columna):
+        """Convierte una columna de Arrow a texto como se verían sus valores en Excel (12.0 -> '12')."""
+        if pa.types.is_floating(columna.type):
+            try:
+                columna = pc.cast(columna, pa.int64())
+            except pa.ArrowInvalid:
+                pass
+        return pc.cast(columna, pa.string())
+
+    def _tabla_a_pandas(self, tabla, fuente):
+        """Convierte una tabla de Arrow a DataFrame; los textos quedan respaldados por Arrow sin copiarlos."""
+        columnas = []
+        for nombre, columna in zip(tabla.column_names, tabla.columns):
+            tipo = columna.type
+            if tipo == pa.null():
+                columna = columna.cast(pa.string())
+            elif not (pa.types.is_string(tipo) or pa.types.is_large_string(tipo)):
+                # Como en Excel, solo las columnas numéricas del registro quedan como números
+                if not fuente.es_numerica(nombre):
+                    columna = self._como_texto(columna)
+            columnas.append(columna)
+        tabla = pa.Table.from_arrays(columnas, names=tabla.column_names)
+
+        def tipos(tipo):
+            if esquema.TEXTO.storage == "pyarrow" and (pa.types.is_string(tipo) or pa.types.is_large_string(tipo)):
+                return esquema.TEXTO
+            return None
+        return tabla.to_pandas(types_mapper=tipos)
+
+    def _en_bloques(self, lotes, esquema_tabla, filas_por_bloque):
+        """Reagrupa lotes de Arrow en tablas de filas_por_bloque filas; sin tamaño, una sola tabla."""
+        if not filas_por_bloque:
+            yield pa.Table.from_batches(list(lotes), schema=esquema_tabla)
+            return
+        pendientes = []
+        filas = 0
+        generado = False
+        for lote in lotes:
+            pendientes.append(lote)
+            filas += lote.num_rows
+            while filas >= filas_por_bloque:
+                tabla = pa.Table.from_batches(pendientes, schema=esquema_tabla)
+                yield tabla.slice(0, filas_por_bloque)
+                generado = True
+                resto = tabla.slice(filas_por_bloque)
+                pendientes, filas = resto.to_batches(), resto.num_rows
+        if filas or not generado:
+            yield pa.Table.from_batches(pendientes, schema=esquema_tabla)
+
+    def _columnas_de_fuente(self, nombres, fuente):
+        """Columnas del archivo que corresponden a alguna columna de la fuente; las demás no se leen."""
+        return [nombre for nombre in nombres if str(nombre).upper().strip() in fuente.indice_columnas]
+
+    def _iterar_tabla(self, archivo, fuente, formato, filas_por_bloque=None):
+        """Recorre un CSV, Parquet o Arrow IPC como _iterar_hoja, con la misma detección de encabezados.
+
+        Los CSV se leen con el lector multihilo de Arrow (o con pandas si pyarrow no está
+        instalado); los Parquet y Arrow se abren como mapas de memoria y se leen solo las
+        columnas de la fuente.
+        """
+        if formato == 'csv':
+            yield from self._iterar_csv(archivo, fuente, filas_por_bloque)
+            return
+        if pa is None:
+            raise ValueError(f"Se requiere pyarrow para leer archivos {Path(archivo).suffix}")
+
+        if formato == 'parquet':
+            archivo_parquet = pq.ParquetFile(archivo, memory_map=True)
+            nombres = archivo_parquet.schema_arrow.names
+        else:
+            mapa = pa.memory_map(str(archivo))
+            try:
+                lector = pa.ipc.open_file(mapa)
+            except pa.ArrowInvalid:
+                mapa.seek(0)
+                lector = pa.ipc.open_stream(mapa)
+            nombres = lector.schema.names
+
+        with medir("deteccion de encabezados"):
+            fila_encabezados, _, _ = self._buscar_fila_encabezados([nombres], fuente.encabezado)
+        if fila_encabezados is None:
+            yield None, pd.DataFrame([nombres])
+            return
+
+        columnas = self._columnas_de_fuente(nombres, fuente)
+        if formato == 'parquet':
+            lotes = archivo_parquet.iter_batches(batch_size=filas_por_bloque or 65536, columns=columnas)
+            esquema_tabla = pa.schema([archivo_parquet.schema_arrow.field(nombre) for nombre in columnas])
+        elif isinstance(lector, pa.ipc.RecordBatchFileReader):
+            indices = [nombres.index(nombre) for nombre in columnas]
+            lotes = (lector.get_batch(i).select(indices) for i in range(lector.num_record_batches))
+            esquema_tabla = pa.schema([lector.schema.field(i) for i in indices])
+        else:
+            indices = [nombres.index(nombre) for nombre in columnas]
+            lotes = (lote.select(indices) for lote in lector)
+            esquema_tabla = pa.schema([lector.schema.field(i) for i in indices])
+
+        for tabla in self._en_bloques(lotes, esquema_tabla, filas_por_bloque):
+            with medir("conversion de Arrow", filas_entrada=tabla.num_rows):
+                df = self._tabla_a_pandas(tabla, fuente)
+            yield fila_encabezados, df
+
+    def _iterar_csv(self, archivo, fuente, filas_por_bloque=None):
+        with medir("deteccion de encabezados") as medicion:
+            codificacion, separador, fila_encabezados, encabezados, revisadas = self._detectar_csv(archivo, fuente)
+            medicion.detalles['fila'] = fila_encabezados + 1 if fila_encabezados is not None else None
+        if fila_encabezados is None:
+            yield None, pd.DataFrame(revisadas)
+            return
+
+        columnas = self._columnas_de_fuente(encabezados, fuente)
+        if pa is None:
+            for df in self._leer_csv_pandas(archivo, codificacion, separador, fila_encabezados, columnas, filas_por_bloque):
+                yield fila_encabezados, df
+            return
+
+        irregulares = []
+
+        def irregular(fila):
+            # Arrow solo puede omitir las filas con otra cantidad de columnas que el encabezado, pero
+            # en Excel son filas válidas (celdas vacías al final o una celda extra); pandas sí las lee
+            irregulares.append(fila.number)
+            return 'error'
+
+        opciones = dict(
+            read_options=pa_csv.ReadOptions(
+                skip_rows=fila_encabezados, use_threads=True,
+                encoding="utf8" if codificacion == "utf-8-sig" else codificacion
+            ),
+            parse_options=pa_csv.ParseOptions(delimiter=separador, invalid_row_handler=irregular),
+            # Todo se lee como texto: las cantidades se convierten al normalizar
+            convert_options=pa_csv.ConvertOptions(
+                column_types={nombre: pa.string() for nombre in columnas}, include_columns=columnas,
+                strings_can_be_null=True, quoted_strings_can_be_null=True
+            )
+        )
+        leidas = 0
+        try:
+            if filas_por_bloque:
+                lector = pa_csv.open_csv(archivo, **opciones)
+                tablas = self._en_bloques(lector, lector.schema, filas_por_bloque)
             else:
-                columnas_renombradas[col] = col
-        return df.rename(columns=columnas_renombradas)
+                tablas = [pa_csv.read_csv(archivo, **opciones)]
+            for tabla in tablas:
+                with medir("conversion de Arrow", filas_entrada=tabla.num_rows):
+                    df = self._tabla_a_pandas(tabla, fuente)
+                leidas += len(df)
+                yield fila_encabezados, df
+        except pa.ArrowInvalid:
+            if not irregulares:
+                raise
+            linea = f" (línea {irregulares[0]})" if irregulares[0] is not None else ""
+            self.logger.agregar_log(
+                f"{Path(archivo).name} tiene filas con otra cantidad de columnas que el encabezado{linea}; "
+                f"se continúa la lectura con pandas"
+            )
+            # Se saltan las filas que ya se entregaron
+            for df in self._leer_csv_pandas(
+                archivo, codificacion, separador, fila_encabezados, columnas, filas_por_bloque, desde=leidas
+            ):
+                yield fila_encabezados, df
+
+    def _leer_csv_pandas(self, archivo, codificacion, separador, fila_encabezados, columnas,
+                         filas_por_bloque=None, desde=0):
+        """Lee el CSV con pandas, sin las primeras desde filas de datos; en bloques si se indica el tamaño.
+
+        Las filas con menos columnas que el encabezado se completan con nulos y las columnas de más
+        se ignoran, como en una hoja de Excel.
+        """
+        lector = pd.read_csv(
+            archivo, sep=separador, skiprows=fila_encabezados, header=0, encoding=codificacion,
+            usecols=columnas, dtype=str, keep_default_na=False, na_values=[""], on_bad_lines='skip',
+            chunksize=filas_por_bloque
+        )
+        if not filas_por_bloque:
+            yield lector.iloc[desde:].reset_index(drop=True)
+            return
+        generado = False
+        with lector:
+            for df in lector:
+                if desde >= len(df):
+                    desde -= len(df)
+                    continue
+                generado = True
+                yield df.iloc[desde:].reset_index(drop=True)
+                desde = 0
+        if not generado:
+            yield pd.DataFrame(columns=columnas)
+
+    def _mapear_columnas(self, df, indice_columnas):
+        """Renombra columnas según el índice alias -> columna normalizada."""
+        return df.rename(columns={
+            col: indice_columnas.get(str(col).upper().strip(), col) for col in df.columns
+        })
+
+    def _encabezados_no_encontrados(self, df, fuente):
+        """Devuelve el error para una hoja sin encabezados; en Siigo registra antes las primeras filas."""
+        if fuente.tipo == 'siigo':
+            muestra = df.head(5).applymap(lambda x: str(x).upper().strip())
+            self.logger.agregar_log(f"Primeras filas del archivo:\n{muestra}")
+            return ValueError("No se encontró una fila con todos los encabezados requeridos")
+        return ValueError("No se encontró fila con los encabezados requeridos")
+
+    def _normalizar_marca(self, df, fuente):
+        """Normaliza las filas leídas de un archivo de inventario de marca."""
+        df.columns = df.columns.str.upper().str.strip()
+        df = self._mapear_columnas(df, fuente.indice_columnas)
+
+        for col in fuente.requeridas:
+            if col not in df.columns:
+                raise ValueError(f"Falta columna requerida: {col}")
+
+        # Limpieza de datos; UBICACION y CODIGO_SIIGO quedan nulos si el archivo no los trae
+        df = df.dropna(how='all')
+        df['ORIGEN'] = fuente.origen
+        return esquema.normalizar(df)
+
+    def _normalizar_valoracion(self, df, fuente):
+        """Normaliza las filas leídas del archivo de valoración de Siigo."""
+        df.columns = df.columns.str.upper().str.strip()
+        df = self._mapear_columnas(df, fuente.indice_columnas)
 
-    def _procesar_archivo_generico(self, archivo, mapeo_columnas, columnas_requeridas, origen):
+        for col in fuente.requeridas:
+            if col not in df.columns:
+                self.logger.agregar_log(f"Columnas disponibles: {list(df.columns)}")
+                raise ValueError(f"No se pudo identificar la columna '{col}'")
+
+        if 'NOMBRE_PRODUCTO' not in df.columns:
+            df['NOMBRE_PRODUCTO'] = ''
+
+        df = df.dropna(how='all')
+        nombre = esquema.texto(df['NOMBRE_PRODUCTO'])
+
+        # La ubicación va entre paréntesis al final del nombre del producto; con replace en lugar
+        # de extract la expresión se evalúa en Arrow sin recorrer los nombres uno por uno
+        con_ubicacion = (nombre.str.endswith(')') & nombre.str.contains('(', regex=False)).fillna(False)
+        ubicacion = nombre.str.replace(r'^[^(]*\(', '', regex=True).str.slice(stop=-1)
+        df['UBICACION'] = ubicacion.where(con_ubicacion)
+        df['DESCRIPCION'] = nombre.str.replace(r'\(.*?\)$', '', regex=True)
+
+        df['ORIGEN'] = fuente.origen
+
+        return esquema.normalizar(df.rename(columns={
+            'REFERENCIA_FABRICA': 'REFERENCIA',
+            'SALDO_CANTIDADES': 'CANTIDAD',
+            'CODIGO_PRODUCTO': 'CODIGO_SIIGO'
+        }))
+
+    def _normalizar(self, df, fuente):
+        if fuente.tipo == 'siigo':
+            return self._normalizar_valoracion(df, fuente)
+        return self._normalizar_marca(df, fuente)
+
+    def _medir_normalizacion(self, df, fuente):
+        with medir("normalizacion", filas_entrada=len(df)) as medicion:
+            df = self._normalizar(df, fuente)
+            medicion.filas_salida = len(df)
+        return df
+
+    def _procesar_archivo_generico(self, archivo, fuente):
         """Procesamiento genérico para archivos de inventario."""
         try:
             self.logger.agregar_log(f"Procesando archivo {archivo.name}...")
 
-            df_raw = pd.read_excel(archivo, header=None)
-            columnas_clave = [[col for col in cols] for cols in mapeo_columnas.values()]
-            fila_encabezados = self._buscar_fila_encabezados(df_raw, columnas_clave)
+            fila_encabezados, df = self._leer_hoja(archivo, fuente)
 
             if fila_encabezados is None:
-                raise ValueError("No se encontró fila con los encabezados requeridos")
-
-            df = pd.read_excel(archivo, header=fila_encabezados)
-            df.columns = df.columns.str.upper().str.strip()
-            df = self._mapear_columnas(df, mapeo_columnas)
-
-            for col in columnas_requeridas:
-                if col not in df.columns:
-                    raise ValueError(f"Falta columna requerida: {col}")
-
-            # Limpieza de datos
-            df = df.dropna(how='all')
-            if 'REFERENCIA' in df.columns:
-                df['REFERENCIA'] = df['REFERENCIA'].astype(str).str.strip()
-            if 'DESCRIPCION' in df.columns:
-                df['DESCRIPCION'] = df['DESCRIPCION'].astype(str).str.strip()
-            if 'CANTIDAD' in df.columns:
-                df['CANTIDAD'] = pd.to_numeric(df['CANTIDAD'], errors='coerce').fillna(0)
-
-            # Agregar columnas adicionales si no existen
-            if 'UBICACION' not in df.columns:
-                df['UBICACION'] = ''
-            if 'CODIGO_SIIGO' not in df.columns:
-                df['CODIGO_SIIGO'] = ''
-
-            df['ORIGEN'] = origen
+                raise self._encabezados_no_encontrados(df, fuente)
+
+            df = self._medir_normalizacion(df, fuente)
             self.logger.agregar_log(f"Archivo {archivo.name} procesado correctamente", 'exito')
             return df
 
@@ -69,91 +504,63 @@ class FileProcessor:
             self.logger.agregar_log(f"Error procesando {archivo.name}: {str(e)}", 'error')
             raise
 
-    def leer_archivo_marca(self, archivo, marca):
-        """Procesa archivos de marcas específicas (STIHL, SUZUKI, YAMAHA)."""
-        mapeo_columnas = {
-            'REFERENCIA': ['REFERENCIA', 'CODIGO', 'SKU', 'MODELO', 'PART NUMBER'],
-            'DESCRIPCION': ['NOMBRE', 'DESCRIPCION', 'DESCRIPCIÓN', 'DESCRIP', 'PRODUCTO'],
-            'CANTIDAD': ['CANTIDAD', 'QTY', 'QUANTITY', 'STOCK'],
-            'UBICACION': ['UBICACION', 'UBICACIÓN', 'LOCALIZACION', 'ALMACEN']
-        }
-        columnas_requeridas = ['REFERENCIA', 'DESCRIPCION', 'CANTIDAD']
-
-        df = self._procesar_archivo_generico(archivo, mapeo_columnas, columnas_requeridas, marca)
-        return df[['REFERENCIA', 'DESCRIPCION', 'CANTIDAD', 'ORIGEN', 'UBICACION', 'CODIGO_SIIGO']]
-
-    def leer_archivo_siigo(self, archivo):
+    def _leer_valoracion(self, archivo, fuente):
         try:
             self.logger.agregar_log(f"Procesando archivo de valoración: {archivo.name}...")
 
-            df_raw = pd.read_excel(archivo, header=None, dtype={0: str})
-            
-            fila_encabezados = None
-            for i, fila in df_raw.iterrows():
-                valores = [str(cell).upper().strip() for cell in fila.values]
-                tiene_codigo = any(col in valores for col in ['CÓDIGO PRODUCTO', 'CODIGO PRODUCTO', 'CODIGO'])
-                tiene_referencia = any(col in valores for col in ['REFERENCIA FÁBRICA', 'REFERENCIA FABRICA', 'REFERENCIA'])
-                tiene_saldo = any(col in valores for col in ['SALDO CANTIDADES', 'SALDO', 'CANTIDAD'])
-
-                if tiene_codigo and tiene_referencia and tiene_saldo:
-                    fila_encabezados = i
-                    self.logger.agregar_log(f"Encabezados encontrados en la fila {fila_encabezados + 1}")
-                    break
+            fila_encabezados, df = self._leer_hoja(archivo, fuente)
 
             if fila_encabezados is None:
-                muestra = df_raw.head(5).applymap(lambda x: str(x).upper().strip())
-                self.logger.agregar_log(f"Primeras filas del archivo:\n{muestra}")
-                raise ValueError("No se encontró una fila con todos los encabezados requeridos")
-
-            df = pd.read_excel(archivo, header=fila_encabezados, dtype={'Código producto': str})
-            df.columns = df.columns.str.upper().str.strip()
-
-            mapeo_columnas = {
-                'CODIGO_PRODUCTO': ['CÓDIGO PRODUCTO', 'CODIGO PRODUCTO', 'CODIGO', 'CODIGO SIIGO'],
-                'NOMBRE_PRODUCTO': ['NOMBRE PRODUCTO', 'DESCRIPCION', 'PRODUCTO', 'NOMBRE'],
-                'REFERENCIA_FABRICA': ['REFERENCIA FÁBRICA', 'REFERENCIA FABRICA', 'REFERENCIA', 'SKU', 'MODELO'],
-                'SALDO_CANTIDADES': ['SALDO CANTIDADES', 'SALDO', 'CANTIDAD', 'STOCK', 'EXISTENCIAS']
-            }
-
-            columnas_renombradas = {}
-            for col in df.columns:
-                col_upper = str(col).upper().strip()
-                for key, values in mapeo_columnas.items():
-                    if any(v == col_upper for v in values):
-                        columnas_renombradas[col] = key
-                        break
-                else:
-                    columnas_renombradas[col] = col
-
-            df = df.rename(columns=columnas_renombradas)
-
-            columnas_requeridas = ['CODIGO_PRODUCTO', 'REFERENCIA_FABRICA', 'SALDO_CANTIDADES']
-            for col in columnas_requeridas:
-                if col not in df.columns:
-                    self.logger.agregar_log(f"Columnas disponibles: {list(df.columns)}")
-                    raise ValueError(f"No se pudo identificar la columna '{col}'")
-
-            if 'NOMBRE_PRODUCTO' not in df.columns:
-                df['NOMBRE_PRODUCTO'] = ''
-
-            df = df.dropna(how='all')
-            df['REFERENCIA_FABRICA'] = df['REFERENCIA_FABRICA'].astype(str).str.strip()
-            df['NOMBRE_PRODUCTO'] = df['NOMBRE_PRODUCTO'].astype(str).str.strip()
-            df['SALDO_CANTIDADES'] = pd.to_numeric(df['SALDO_CANTIDADES'], errors='coerce').fillna(0)
-
-            df['UBICACION'] = df['NOMBRE_PRODUCTO'].str.extract(r'\((.*?)\)$').fillna('')
-            df['DESCRIPCION'] = df['NOMBRE_PRODUCTO'].str.replace(r'\(.*?\)$', '', regex=True).str.strip()
-
-            df['ORIGEN'] = 'SIIGO'
+                raise self._encabezados_no_encontrados(df, fuente)
 
-            self.logger.agregar_log(f"Archivo de valoración procesado correctamente. Filas leídas: {len(df)}", 'exito')
+            self.logger.agregar_log(f"Encabezados encontrados en la fila {fila_encabezados + 1}")
+            df = self._medir_normalizacion(df, fuente)
 
-            return df[['REFERENCIA_FABRICA', 'DESCRIPCION', 'SALDO_CANTIDADES', 'ORIGEN', 'UBICACION', 'CODIGO_PRODUCTO']].rename(columns={
-                'REFERENCIA_FABRICA': 'REFERENCIA',
-                'SALDO_CANTIDADES': 'CANTIDAD',
-                'CODIGO_PRODUCTO': 'CODIGO_SIIGO'
-            })
+            self.logger.agregar_log(f"Archivo de valoración procesado correctamente. Filas leídas: {len(df)}", 'exito')
+            return df
 
         except Exception as e:
             self.logger.agregar_log(f"Error procesando archivo de valoración: {str(e)}", 'error')
             raise
+
+    def leer_archivo_por_bloques(self, archivo, fuente, filas_por_bloque):
+        """Lee un archivo por bloques de filas y genera cada bloque ya normalizado.
+
+        Solo se mantiene en memoria un bloque a la vez. Los tipos de las columnas se infieren
+        en cada bloque por separado.
+        """
+        try:
+            self.logger.agregar_log(f"Procesando archivo {archivo.name} por bloques de {filas_por_bloque} filas...")
+            filas = 0
+            for fila_encabezados, df in self._iterar(archivo, fuente, filas_por_bloque):
+                if fila_encabezados is None:
+                    raise self._encabezados_no_encontrados(df, fuente)
+                df = self._medir_normalizacion(df, fuente)
+                filas += len(df)
+                yield df
+            self.logger.agregar_log(f"Archivo {archivo.name} procesado correctamente. Filas leídas: {filas}", 'exito')
+
+        except Exception as e:
+            self.logger.agregar_log(f"Error procesando {archivo.name}: {str(e)}", 'error')
+            raise
+
+    def leer_archivo(self, archivo, fuente):
+        """Lee un archivo según el tipo de su fuente y devuelve el DataFrame normalizado."""
+        with medir(f"lectura {archivo.name}", fuente=fuente.nombre) as medicion:
+            if fuente.tipo == 'siigo':
+                df = self._leer_valoracion(archivo, fuente)
+            else:
+                df = self._procesar_archivo_generico(archivo, fuente)
+            medicion.filas_salida = len(df)
+        return df
+
+    def _registro(self):
+        return self.registro or RegistroFuentes.predeterminado()
+
+    def leer_archivo_marca(self, archivo, marca):
+        """Procesa el archivo de una marca declarada en el registro de fuentes."""
+        return self.leer_archivo(archivo, self._registro().fuente(marca))
+
+    def leer_archivo_siigo(self, archivo):
+        """Procesa el archivo de valoración de Siigo declarado en el registro de fuentes."""
+        return self.leer_archivo(archivo, self._registro().de_tipo('siigo')[0])
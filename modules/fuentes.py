@@ -0,0 +1,142 @@
+import hashlib
+import json
+from pathlib import Path
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+RUTA_PREDETERMINADA = Path(__file__).resolve().parent.parent / "fuentes.toml"
+
+TIPOS = ('marca', 'siigo')
+
+# Formatos de los archivos de entrada que se buscan en la carpeta inputs
+EXTENSIONES = (".xlsx", ".csv", ".parquet", ".arrow", ".feather", ".ipc")
+
+# Columnas numéricas de cada tipo cuando el registro no declara 'numericas'
+NUMERICAS = {'marca': ['CANTIDAD'], 'siigo': ['SALDO_CANTIDADES']}
+
+class Fuente:
+    """Una fuente de inventario del registro, con sus alias de columnas ya compilados."""
+
+    def __init__(self, nombre, tipo, patrones, columnas, requeridas, origen=None,
+                 ejemplo=None, encabezado=None, numericas=None):
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de fuente desconocido para {nombre}: {tipo}")
+        self.nombre = nombre
+        self.tipo = tipo
+        self.origen = origen or nombre
+        self.patrones = [patron.upper() for patron in patrones]
+        self.ejemplo = ejemplo or f"{nombre}.xlsx"
+        self.columnas = columnas
+        self.requeridas = list(requeridas)
+        # Columnas que se leen como números; las demás se leen como texto
+        self.numericas = set(NUMERICAS[tipo] if numericas is None else numericas)
+        # Sin grupos de encabezado explícitos, la fila debe contener todas las columnas
+        self.encabezado = [list(alias) for alias in (encabezado or columnas.values())]
+
+        # Índice alias -> columna normalizada; ante alias repetidos gana la primera columna
+        self.indice_columnas = {}
+        for columna, alias in columnas.items():
+            for nombre_alias in alias:
+                self.indice_columnas.setdefault(nombre_alias.upper().strip(), columna)
+
+    def coincide(self, archivo):
+        nombre = Path(archivo).stem.upper()
+        return any(patron in nombre for patron in self.patrones)
+
+    def es_numerica(self, encabezado):
+        """Indica si el encabezado corresponde a una columna numérica de la fuente."""
+        return self.indice_columnas.get(str(encabezado).upper().strip()) in self.numericas
+
+    def huella(self):
+        """Identifica la configuración de lectura; cambia si cambian alias o requisitos."""
+        datos = [self.tipo, self.origen, self.columnas, self.requeridas,
+                 sorted(self.numericas), self.encabezado]
+        return hashlib.sha256(json.dumps(datos, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class RegistroFuentes:
+    """Fuentes de inventario declaradas en fuentes.toml."""
+
+    _predeterminado = None
+
+    def __init__(self, fuentes):
+        if not fuentes:
+            raise ValueError("El registro de fuentes está vacío")
+        nombres = [fuente.nombre for fuente in fuentes]
+        if len(set(nombres)) != len(nombres):
+            raise ValueError("Hay fuentes con nombres repetidos en el registro")
+        self.fuentes = list(fuentes)
+        self._por_nombre = {fuente.nombre: fuente for fuente in self.fuentes}
+
+    @classmethod
+    def cargar(cls, ruta=None):
+        ruta = Path(ruta) if ruta else RUTA_PREDETERMINADA
+        with open(ruta, "rb") as f:
+            config = tomllib.load(f)
+
+        tipos = config.get('tipos', {})
+        fuentes = []
+        for datos in config.get('fuentes', []):
+            tipo = datos['tipo']
+            base = tipos.get(tipo, {})
+            columnas = dict(base.get('columnas', {}))
+            columnas.update(datos.get('columnas', {}))
+            fuentes.append(Fuente(
+                nombre=datos['nombre'],
+                tipo=tipo,
+                patrones=datos.get('patrones', [datos['nombre']]),
+                columnas=columnas,
+                requeridas=datos.get('requeridas', base.get('requeridas', [])),
+                origen=datos.get('origen'),
+                ejemplo=datos.get('ejemplo'),
+                encabezado=datos.get('encabezado', base.get('encabezado')),
+                numericas=datos.get('numericas', base.get('numericas'))
+            ))
+        return cls(fuentes)
+
+    @classmethod
+    def predeterminado(cls):
+        """Registro de fuentes.toml, cargado una sola vez por proceso."""
+        if cls._predeterminado is None:
+            cls._predeterminado = cls.cargar()
+        return cls._predeterminado
+
+    def fuente(self, nombre):
+        return self._por_nombre[nombre]
+
+    def de_tipo(self, tipo):
+        return [fuente for fuente in self.fuentes if fuente.tipo == tipo]
+
+    @property
+    def origenes_marca(self):
+        return sorted({fuente.origen for fuente in self.de_tipo('marca')})
+
+    @property
+    def origenes_siigo(self):
+        return sorted({fuente.origen for fuente in self.de_tipo('siigo')})
+
+    def identificar(self, archivo):
+        """Devuelve la primera fuente cuyo patrón coincide con el archivo, o None."""
+        for fuente in self.fuentes:
+            if fuente.coincide(archivo):
+                return fuente
+        return None
+
+    def buscar_archivos(self, inputs_dir, extensiones=EXTENSIONES):
+        """Asigna a cada fuente su archivo en inputs_dir; falla si falta alguno."""
+        archivos = {fuente.nombre: None for fuente in self.fuentes}
+        for archivo in sorted(Path(inputs_dir).iterdir()):
+            # Omitir otros formatos y los archivos temporales que crea Excel (~$...)
+            if archivo.suffix.lower() not in extensiones or archivo.name.startswith("~$"):
+                continue
+            fuente = self.identificar(archivo)
+            if fuente is not None:
+                archivos[fuente.nombre] = archivo
+
+        for nombre, archivo in archivos.items():
+            if archivo is None:
+                raise FileNotFoundError(f"No se encontró el archivo para {nombre}")
+        return archivos
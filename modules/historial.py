@@ -0,0 +1,228 @@
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Columnas de cada tabla en la base y su columna en los DataFrames (los nombres SQL no llevan espacios)
+COLUMNAS_CONSOLIDADO = {
+    "referencia": "REFERENCIA",
+    "descripcion": "DESCRIPCION",
+    "cantidad": "CANTIDAD",
+    "origen": "ORIGEN",
+    "ubicacion": "UBICACION",
+    "codigo_siigo": "CODIGO_SIIGO"
+}
+COLUMNAS_COMPARATIVO = {
+    "referencia": "REFERENCIA",
+    "descripcion": "DESCRIPCION",
+    "origen": "ORIGEN",
+    "inventario_manual": "INVENTARIO MANUAL",
+    "siigo": "SIIGO",
+    "diferencia": "DIFERENCIA",
+    "ubicacion_marcas": "UBICACION_MARCAS",
+    "ubicacion_siigo": "UBICACION_SIIGO",
+    "codigo_siigo": "CODIGO_SIIGO"
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    entrada TEXT,
+    estado TEXT NOT NULL,
+    filas_consolidado INTEGER NOT NULL DEFAULT 0,
+    filas_comparativo INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS consolidado (
+    ejecucion INTEGER NOT NULL REFERENCES ejecuciones(id) ON DELETE CASCADE,
+    referencia TEXT, descripcion TEXT, cantidad REAL, origen TEXT, ubicacion TEXT, codigo_siigo TEXT
+);
+CREATE TABLE IF NOT EXISTS comparativo (
+    ejecucion INTEGER NOT NULL REFERENCES ejecuciones(id) ON DELETE CASCADE,
+    referencia TEXT, descripcion TEXT, origen TEXT, inventario_manual REAL, siigo REAL, diferencia REAL,
+    ubicacion_marcas TEXT, ubicacion_siigo TEXT, codigo_siigo TEXT
+);
+CREATE INDEX IF NOT EXISTS ejecuciones_fecha ON ejecuciones(fecha);
+CREATE INDEX IF NOT EXISTS consolidado_ejecucion ON consolidado(ejecucion);
+CREATE INDEX IF NOT EXISTS consolidado_referencia ON consolidado(referencia, ejecucion);
+CREATE INDEX IF NOT EXISTS consolidado_codigo ON consolidado(codigo_siigo);
+CREATE INDEX IF NOT EXISTS consolidado_origen ON consolidado(origen);
+-- Cubre las consultas por ejecución y por signo de la diferencia sin leer la tabla
+CREATE INDEX IF NOT EXISTS comparativo_diferencia ON comparativo(ejecucion, diferencia, referencia);
+CREATE INDEX IF NOT EXISTS comparativo_referencia ON comparativo(referencia, ejecucion);
+CREATE INDEX IF NOT EXISTS comparativo_codigo ON comparativo(codigo_siigo);
+CREATE INDEX IF NOT EXISTS comparativo_origen ON comparativo(origen);
+"""
+
+def _filas(df, columnas, ejecucion):
+    """Filas de df para insertar, con la ejecución primero y None en lugar de los valores nulos."""
+    datos = df[list(columnas.values())].astype(object)
+    datos = datos.where(datos.notna(), None)
+    for fila in datos.itertuples(index=False, name=None):
+        yield (ejecucion,) + fila
+
+class EjecucionHistorial:
+    """Una ejecución que se está guardando en el historial.
+
+    Cada agregar_* se guarda en su propia transacción, así la base no queda bloqueada durante
+    toda la ejecución; las consultas solo ven las ejecuciones confirmadas.
+    """
+
+    def __init__(self, conexion, ejecucion):
+        self._conexion = conexion
+        self.ejecucion = ejecucion
+        self.filas_consolidado = 0
+        self.filas_comparativo = 0
+        self._abierta = True
+
+    def _insertar(self, tabla, columnas, df):
+        marcadores = ", ".join("?" * (len(columnas) + 1))
+        with self._conexion:
+            self._conexion.executemany(
+                f"INSERT INTO {tabla} (ejecucion, {', '.join(columnas)}) VALUES ({marcadores})",
+                _filas(df, columnas, self.ejecucion)
+            )
+
+    def agregar_consolidado(self, df):
+        """Guarda filas del consolidado; puede llamarse una vez por bloque."""
+        self._insertar("consolidado", COLUMNAS_CONSOLIDADO, df)
+        self.filas_consolidado += len(df)
+
+    def agregar_comparativo(self, df):
+        """Guarda filas de la tabla comparativa."""
+        self._insertar("comparativo", COLUMNAS_COMPARATIVO, df)
+        self.filas_comparativo += len(df)
+
+    def confirmar(self):
+        """Marca la ejecución como completa y cierra la conexión."""
+        with self._conexion:
+            self._conexion.execute(
+                "UPDATE ejecuciones SET estado = 'completa', filas_consolidado = ?, filas_comparativo = ? WHERE id = ?",
+                (self.filas_consolidado, self.filas_comparativo, self.ejecucion)
+            )
+        self._cerrar()
+
+    def descartar(self):
+        """Elimina lo guardado de una ejecución que no se confirmó; no hace nada si ya se confirmó."""
+        if not self._abierta:
+            return
+        try:
+            with self._conexion:
+                self._conexion.execute("DELETE FROM ejecuciones WHERE id = ?", (self.ejecucion,))
+        finally:
+            self._cerrar()
+
+    def _cerrar(self):
+        self._abierta = False
+        self._conexion.close()
+
+
+class HistorialConteos:
+    """Historial de los consolidados y las tablas comparativas de cada ejecución, en SQLite.
+
+    Permite comparar periodos sin volver a leer los Excel de salida: las filas quedan indexadas
+    por referencia, código de Siigo, origen y ejecución, y las ejecuciones por fecha.
+    """
+
+    def __init__(self, logger, ruta="outputs/historial.sqlite"):
+        self.logger = logger
+        self.ruta = Path(ruta)
+
+    def conectar(self):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Varios trabajos pueden escribir a la vez; esperar a que se libere la base
+        conexion = sqlite3.connect(self.ruta, timeout=60)
+        conexion.execute("PRAGMA foreign_keys = ON")
+        conexion.execute("PRAGMA journal_mode = WAL")
+        conexion.executescript(ESQUEMA)
+        return conexion
+
+    def iniciar(self, entrada=None, fecha=None):
+        """Registra una ejecución nueva y devuelve su EjecucionHistorial para ir guardando las filas.
+
+        fecha es la fecha del conteo (datetime o texto ISO); por defecto, el momento actual.
+        """
+        fecha = fecha or datetime.now()
+        if isinstance(fecha, datetime):
+            fecha = fecha.isoformat(timespec="seconds")
+        conexion = self.conectar()
+        with conexion:
+            cursor = conexion.execute(
+                "INSERT INTO ejecuciones (fecha, entrada, estado) VALUES (?, ?, 'en curso')",
+                (fecha, str(entrada) if entrada is not None else None)
+            )
+        return EjecucionHistorial(conexion, cursor.lastrowid)
+
+    def registrar(self, analisis, consolidado=None, entrada=None, fecha=None):
+        """Guarda de una vez la tabla comparativa y, si se indica, el consolidado; devuelve el id."""
+        ejecucion = self.iniciar(entrada, fecha)
+        try:
+            if consolidado is not None:
+                ejecucion.agregar_consolidado(consolidado)
+            ejecucion.agregar_comparativo(analisis)
+            ejecucion.confirmar()
+        finally:
+            ejecucion.descartar()
+        self.logger.agregar_log(f"Ejecución {ejecucion.ejecucion} guardada en el historial: {self.ruta}", 'exito')
+        return ejecucion.ejecucion
+
+    def consultar(self, sql, parametros=()):
+        """Ejecuta una consulta de lectura y devuelve el resultado como DataFrame."""
+        conexion = self.conectar()
+        try:
+            return pd.read_sql_query(sql, conexion, params=parametros)
+        finally:
+            conexion.close()
+
+    def ejecuciones(self, entrada=None):
+        """Ejecuciones completas, de la más reciente a la más antigua."""
+        filtro, parametros = ("AND entrada = ?", (str(entrada),)) if entrada is not None else ("", ())
+        return self.consultar(
+            f"SELECT * FROM ejecuciones WHERE estado = 'completa' {filtro} ORDER BY fecha DESC, id DESC",
+            parametros
+        )
+
+    def historia_referencia(self, referencia):
+        """Filas de la tabla comparativa de una referencia en cada ejecución, de la más antigua a la más reciente."""
+        tabla = self.consultar(
+            "SELECT e.fecha, e.entrada, c.* FROM comparativo c JOIN ejecuciones e ON e.id = c.ejecucion "
+            "WHERE c.referencia = ? AND e.estado = 'completa' ORDER BY e.fecha, e.id",
+            (referencia,)
+        )
+        return tabla.rename(columns=COLUMNAS_COMPARATIVO)
+
+    def diferencias_persistentes(self, ultimas=6, entrada=None, negativas=True):
+        """Referencias con DIFERENCIA negativa (o positiva) en cada una de las últimas ejecuciones.
+
+        Solo cuenta referencias presentes en todas esas ejecuciones, y no devuelve nada si hay
+        menos de ultimas ejecuciones completas. Devuelve la referencia, su descripción en la
+        ejecución más reciente y la diferencia mínima, máxima y promedio en el periodo.
+        """
+        filtro, parametros = ("AND entrada = ?", (str(entrada),)) if entrada is not None else ("", ())
+        # Solo se leen del índice las filas con el signo buscado; una referencia califica si
+        # aparece con ese signo en ultimas ejecuciones distintas, que solo existen si hay al menos ultimas
+        return self.consultar(
+            f"""
+            WITH ultimas AS (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY fecha DESC, id DESC) AS orden
+                FROM ejecuciones WHERE estado = 'completa' {filtro}
+                ORDER BY orden LIMIT ?
+            )
+            SELECT c.referencia AS REFERENCIA,
+                   (SELECT r.descripcion FROM comparativo r
+                    WHERE r.referencia = c.referencia AND r.ejecucion = (SELECT id FROM ultimas WHERE orden = 1)
+                    LIMIT 1) AS DESCRIPCION,
+                   MIN(c.diferencia) AS DIFERENCIA_MINIMA,
+                   MAX(c.diferencia) AS DIFERENCIA_MAXIMA,
+                   AVG(c.diferencia) AS DIFERENCIA_PROMEDIO,
+                   COUNT(DISTINCT c.ejecucion) AS EJECUCIONES
+            FROM comparativo c
+            WHERE c.ejecucion IN (SELECT id FROM ultimas) AND c.diferencia {'<' if negativas else '>'} 0
+              AND c.referencia <> ''
+            GROUP BY c.referencia
+            HAVING COUNT(DISTINCT c.ejecucion) = ?
+            ORDER BY DIFERENCIA_PROMEDIO {'ASC' if negativas else 'DESC'}, REFERENCIA
+            """,
+            parametros + (ultimas, ultimas)
+        )
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+class AnalisisIncremental:
+    """Reutiliza el análisis de la ejecución anterior y recalcula solo las referencias que cambiaron.
+
+    Guarda en directorio, por cada REFERENCIA, una firma de sus filas del consolidado y su
+    fila de la tabla comparativa. En la siguiente ejecución compara las firmas, vuelve a
+    agregar solo las referencias nuevas o modificadas y elimina las que ya no existen.
+    Las filas sin referencia no tienen clave, así que se recalculan siempre.
+    """
+
+    # Cambiarla descarta las instantáneas guardadas con una versión anterior
+    VERSION = 3
+    ARCHIVO = "analisis_anterior.pkl"
+
+    def __init__(self, logger, analyzer, directorio="cache/incremental"):
+        self.logger = logger
+        self.analyzer = analyzer
+        self.directorio = Path(directorio)
+
+    def _huella(self):
+        """Identifica la configuración que afecta la agregación."""
+        datos = [self.VERSION, self.analyzer.registro.origenes_marca, self.analyzer.registro.origenes_siigo]
+        return hashlib.sha256(json.dumps(datos).encode("utf-8")).hexdigest()
+
+    def _firmas(self, df_con_ref):
+        """Firma de las filas de cada referencia; depende del contenido y del orden de las filas."""
+        columnas = ["DESCRIPCION", "CANTIDAD", "ORIGEN", "UBICACION", "CODIGO_SIIGO"]
+        hashes = pd.util.hash_pandas_object(df_con_ref[columnas], index=False).to_numpy()
+        posicion = df_con_ref.groupby("REFERENCIA", sort=False).cumcount().to_numpy().astype(np.uint64)
+        with np.errstate(over="ignore"):
+            ponderados = hashes * (posicion + np.uint64(1)) + posicion
+        return pd.Series(ponderados, index=df_con_ref["REFERENCIA"].to_numpy()).groupby(level=0).sum()
+
+    def _cargar(self):
+        try:
+            anterior = pd.read_pickle(self.directorio / self.ARCHIVO)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Instantánea truncada o dañada: se recalcula todo y se reemplaza al guardar
+            self.logger.agregar_log(f"No se pudo leer el análisis anterior ({type(e).__name__}): se descarta", 'advertencia')
+            return None
+        if not isinstance(anterior, dict) or anterior.get('huella') != self._huella():
+            return None
+        return anterior
+
+    def _guardar(self, firmas, tabla_con_ref):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self.directorio / self.ARCHIVO
+        temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+        pd.to_pickle({'huella': self._huella(), 'firmas': firmas, 'tabla': tabla_con_ref}, temporal)
+        os.replace(temporal, ruta)
+
+    def analizar(self, consolidado):
+        """Devuelve (tabla comparativa, referencias cambiadas).
+
+        Las referencias cambiadas incluyen las nuevas, las modificadas y las eliminadas;
+        es None si no había un análisis anterior utilizable y se recalculó todo.
+        """
+        try:
+            self.logger.agregar_log("Generando análisis comparativo incremental...")
+            df_con_ref, df_sin_ref = self.analyzer.separar_referencias(consolidado)
+            firmas = self._firmas(df_con_ref)
+            anterior = self._cargar()
+
+            if anterior is None:
+                self.logger.agregar_log("Sin análisis anterior: se recalculan todas las referencias")
+                tabla_con_ref = self.analyzer.agregar_por_referencia(df_con_ref)
+                cambiadas = None
+            else:
+                firmas_anteriores = anterior['firmas']
+                comunes = firmas.index.intersection(firmas_anteriores.index)
+                modificadas = comunes[firmas[comunes].to_numpy() != firmas_anteriores[comunes].to_numpy()]
+                nuevas = firmas.index.difference(firmas_anteriores.index)
+                eliminadas = firmas_anteriores.index.difference(firmas.index)
+                recalcular = modificadas.append(nuevas)
+
+                # Conservar las filas anteriores que no cambiaron y agregar las recalculadas
+                tabla_anterior = anterior['tabla']
+                conservadas = tabla_anterior[~tabla_anterior["REFERENCIA"].isin(recalcular.append(eliminadas))]
+                recalculadas = self.analyzer.agregar_por_referencia(
+                    df_con_ref[df_con_ref["REFERENCIA"].isin(recalcular)]
+                )
+                partes = [parte for parte in (conservadas, recalculadas) if not parte.empty]
+                if partes:
+                    tabla_con_ref = pd.concat(partes, ignore_index=True)
+                    tabla_con_ref = tabla_con_ref.sort_values("REFERENCIA", kind="stable", ignore_index=True)
+                else:
+                    tabla_con_ref = tabla_anterior.iloc[0:0]
+
+                cambiadas = sorted(recalcular.append(eliminadas))
+                self.logger.agregar_log(
+                    f"Referencias recalculadas: {len(recalcular)} "
+                    f"({len(nuevas)} nuevas, {len(modificadas)} modificadas), eliminadas: {len(eliminadas)}"
+                )
+                if cambiadas:
+                    muestra = ", ".join(cambiadas[:10]) + (" ..." if len(cambiadas) > 10 else "")
+                    self.logger.agregar_log(f"Referencias con cambios: {muestra}")
+
+            self._guardar(firmas, tabla_con_ref)
+            return self.analyzer.unir_tabla(tabla_con_ref, df_sin_ref), cambiadas
+
+        except Exception as e:
+            self.logger.agregar_log(f"Error durante el análisis incremental: {str(e)}", 'error')
+            raise
+
+    def limpiar(self):
+        """Descarta el análisis guardado; la siguiente ejecución recalcula todo."""
+        try:
+            (self.directorio / self.ARCHIVO).unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,215 @@
+"""Medición por etapa de una ejecución: tiempo real, tiempo de CPU, filas y memoria.
+
+Pipeline activa una Instrumentacion por ejecución; los módulos marcan sus pasos con
+medir(), que no hace nada si no hay una instrumentación activa:
+
+    with medir("normalizacion", filas_entrada=len(df)) as medicion:
+        df = normalizar(df)
+        medicion.filas_salida = len(df)
+
+Las etapas abiertas dentro de otra quedan como subetapas suyas (p. ej.
+"consolidacion/lectura STIHL/encabezados").
+"""
+import contextlib
+import cProfile
+import contextvars
+import json
+import os
+import platform
+import threading
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: el pico se lee con GetProcessMemoryInfo
+    resource = None
+
+_ACTIVA = contextvars.ContextVar("instrumentacion", default=None)
+
+def _pico_windows():
+    """PeakWorkingSetSize del proceso en bytes, con la API de Windows y sin paquetes adicionales."""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t)
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32")
+    psapi = ctypes.WinDLL("psapi")
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [
+        wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD
+    ]
+    psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+    contadores = PROCESS_MEMORY_COUNTERS()
+    contadores.cb = ctypes.sizeof(contadores)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(contadores), contadores.cb):
+        return None
+    return contadores.PeakWorkingSetSize
+
+def memoria_pico_mb():
+    """Pico de memoria residente del proceso hasta ahora, en MB; None si no se puede medir."""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KB y macOS bytes
+        return pico / 1024 / 1024 if platform.system() == "Darwin" else pico / 1024
+    if os.name != "nt":
+        return None
+    try:
+        pico = _pico_windows()
+    except (AttributeError, OSError):
+        return None
+    return pico / 1024 / 1024 if pico is not None else None
+
+def etapas_principales(informe):
+    """Etapas sin padre de un informe (Instrumentacion.informe), en el orden en que empezaron."""
+    return [registro for registro in informe['etapas'] if registro['padre'] is None]
+
+class Medicion:
+    """Datos de una etapa en curso que la etapa puede completar (filas de salida, detalles)."""
+
+    def __init__(self, filas_entrada=None, detalles=None):
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+        self.detalles = detalles or {}
+
+class Instrumentacion:
+    """Registra las etapas de una ejecución y arma el informe en JSON.
+
+    La memoria es el pico de memoria residente del proceso al terminar cada etapa: como es
+    un máximo acumulado, la etapa en la que sube es la que lo produjo.
+    """
+
+    ARCHIVO = "informe_ejecucion.json"
+
+    def __init__(self):
+        self.etapas = []
+        self._inicio = time.time()
+        self._lock = threading.Lock()
+        self._pilas = threading.local()
+
+    def _pila(self):
+        if not hasattr(self._pilas, "nombres"):
+            self._pilas.nombres = []
+        return self._pilas.nombres
+
+    @contextlib.contextmanager
+    def activar(self):
+        """Hace que medir() registre en esta instrumentación dentro del bloque."""
+        token = _ACTIVA.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVA.reset(token)
+
+    @contextlib.contextmanager
+    def etapa(self, nombre, filas_entrada=None, **detalles):
+        pila = self._pila()
+        medicion = Medicion(filas_entrada, detalles)
+        padre = "/".join(pila) or None
+        pila.append(nombre)
+        inicio, inicio_cpu = time.time(), time.thread_time()
+        error = None
+        try:
+            yield medicion
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            pila.pop()
+            registro = {
+                'etapa': nombre,
+                'padre': padre,
+                'inicio': inicio,
+                'duracion_s': time.time() - inicio,
+                'cpu_s': time.thread_time() - inicio_cpu,
+                'filas_entrada': medicion.filas_entrada,
+                'filas_salida': medicion.filas_salida,
+                'memoria_pico_mb': memoria_pico_mb(),
+                'hilo': threading.current_thread().name,
+                'proceso': os.getpid()
+            }
+            if medicion.detalles:
+                registro['detalles'] = medicion.detalles
+            if error is not None:
+                registro['error'] = error
+            with self._lock:
+                self.etapas.append(registro)
+
+    def agregar(self, etapas):
+        """Agrega etapas medidas en otro proceso, como subetapas de la etapa en curso."""
+        actual = "/".join(self._pila()) or None
+        with self._lock:
+            for registro in etapas:
+                registro = dict(registro)
+                if actual is not None:
+                    registro['padre'] = f"{actual}/{registro['padre']}" if registro['padre'] else actual
+                self.etapas.append(registro)
+
+    def informe(self):
+        etapas = sorted(self.etapas, key=lambda registro: registro['inicio'])
+        etapas = [dict(registro, inicio=round(registro['inicio'] - self._inicio, 4)) for registro in etapas]
+        return {
+            'inicio': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._inicio)),
+            'duracion_s': round(time.time() - self._inicio, 4),
+            'memoria_pico_mb': memoria_pico_mb(),
+            'entorno': {'python': platform.python_version(), 'plataforma': platform.platform()},
+            'etapas': etapas
+        }
+
+    def escribir_informe(self, output_dir="outputs"):
+        """Guarda el informe en output_dir y devuelve la ruta del archivo."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(exist_ok=True)
+        ruta = output_dir / self.ARCHIVO
+        ruta.write_text(json.dumps(self.informe(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return ruta
+
+def medir(nombre, filas_entrada=None, **detalles):
+    """Mide una etapa en la instrumentación activa; sin instrumentación activa no registra nada."""
+    activa = _ACTIVA.get()
+    if activa is None:
+        return contextlib.nullcontext(Medicion(filas_entrada, detalles))
+    return activa.etapa(nombre, filas_entrada, **detalles)
+
+def registrar(etapas):
+    """Agrega a la instrumentación activa las etapas medidas en otro proceso."""
+    activa = _ACTIVA.get()
+    if activa is not None:
+        activa.agregar(etapas)
+
+def copiar_contexto(funcion):
+    """Envuelve funcion para ejecutarla en otro hilo con la instrumentación activa de este."""
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(funcion, *args, **kwargs)
+
+@contextlib.contextmanager
+def perfilar(ruta=None):
+    """Perfila con cProfile el hilo actual dentro del bloque y guarda las estadísticas en ruta.
+
+    El archivo se lee con pstats (python -m pstats ruta) o con visores como snakeviz. Sin ruta
+    no se perfila. Solo se perfila el hilo que entra al bloque, no los hilos ni procesos que lance.
+    """
+    if ruta is None:
+        yield
+        return
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        perfil.dump_stats(str(ruta))
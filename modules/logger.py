@@ -1,9 +1,48 @@
-import tkinter as tk
-from tkinter import ttk
+import logging
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+# Nivel de logging correspondiente a cada tipo de mensaje
+NIVELES = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'exito': logging.INFO,
+    'advertencia': logging.WARNING,
+    'error': logging.ERROR
+}
 
 class Logger:
-    def __init__(self, ventana):
+    """Registro de la aplicación.
+
+    Todos los mensajes se escriben en un archivo rotativo. Si se indica una ventana,
+    los mensajes se acumulan y se vuelcan al widget por lotes cada intervalo_ms,
+    conservando solo las últimas max_lineas. agregar_log puede llamarse desde cualquier hilo.
+    """
+
+    def __init__(self, ventana=None, archivo="outputs/registro.log", nivel='info',
+                 max_lineas=2000, intervalo_ms=200, max_bytes=1024 * 1024, respaldos=3):
         self.ventana = ventana
+        self.nivel = NIVELES[nivel]
+        self.max_lineas = max_lineas
+        self.intervalo_ms = intervalo_ms
+        self._pendientes = deque()
+
+        self._archivo = logging.Logger("profibra")
+        if archivo is not None:
+            Path(archivo).parent.mkdir(parents=True, exist_ok=True)
+            manejador = RotatingFileHandler(archivo, maxBytes=max_bytes, backupCount=respaldos, encoding="utf-8")
+            manejador.setFormatter(logging.Formatter("%(asctime)s [%(tipo)s] %(message)s"))
+            self._archivo.addHandler(manejador)
+
+        if ventana is not None:
+            self._crear_widget(ventana)
+            self.ventana.after(self.intervalo_ms, self._vaciar)
+
+    def _crear_widget(self, ventana):
+        import tkinter as tk
+        from tkinter import ttk
+
         self.estado = ttk.Label(ventana, text="", font=("Segoe UI", 10))
         self.estado.pack(pady=10, padx=20, fill=tk.X)
         
@@ -20,12 +59,64 @@ class Logger:
         self.scrollbar.config(command=self.registro.yview)
         
         # Configurar colores para diferentes tipos de mensajes
+        self.registro.tag_config('debug', foreground='gray')
         self.registro.tag_config('info', foreground='blue')
         self.registro.tag_config('exito', foreground='green')
         self.registro.tag_config('error', foreground='red')
         self.registro.tag_config('advertencia', foreground='orange')
 
     def agregar_log(self, mensaje, tipo='info'):
-        self.registro.insert(tk.END, f"{mensaje}\n", tipo)
-        self.registro.see(tk.END)  # Auto-scroll al final
-        self.ventana.update()
+        nivel = NIVELES.get(tipo, logging.INFO)
+        self._archivo.log(nivel, mensaje, extra={'tipo': tipo})
+        if self.ventana is not None and nivel >= self.nivel:
+            self._pendientes.append((mensaje, tipo))
+
+    def cerrar(self):
+        """Cierra el archivo de registro."""
+        for manejador in list(self._archivo.handlers):
+            manejador.close()
+            self._archivo.removeHandler(manejador)
+
+    def _vaciar(self):
+        """Vuelca al widget los mensajes acumulados y se reprograma."""
+        if self._pendientes:
+            lote = []
+            while self._pendientes:
+                lote.append(self._pendientes.popleft())
+
+            # Un solo insert por cada tramo consecutivo del mismo tipo
+            argumentos = []
+            for mensaje, tipo in lote:
+                if argumentos and argumentos[-1] == tipo:
+                    argumentos[-2] += f"{mensaje}\n"
+                else:
+                    argumentos.extend([f"{mensaje}\n", tipo])
+            self.registro.insert("end", *argumentos)
+
+            # Conservar solo las últimas max_lineas
+            lineas = int(self.registro.index("end-1c").split(".")[0])
+            if lineas > self.max_lineas:
+                self.registro.delete("1.0", f"{lineas - self.max_lineas}.0")
+            self.registro.see("end")  # Auto-scroll al final
+
+        self.ventana.after(self.intervalo_ms, self._vaciar)
+
+
+class RegistroMemoria:
+    """Registro sin interfaz que guarda los mensajes como (mensaje, tipo)."""
+
+    def __init__(self):
+        self.mensajes = []
+
+    def agregar_log(self, mensaje, tipo='info'):
+        self.mensajes.append((mensaje, tipo))
+
+
+class RegistroCola:
+    """Registro para hilos de trabajo: publica ('log', mensaje, tipo) en una cola."""
+
+    def __init__(self, cola):
+        self.cola = cola
+
+    def agregar_log(self, mensaje, tipo='info'):
+        self.cola.put(('log', mensaje, tipo))
@@ -1,71 +1,98 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from .excel_writer import escribir_excel
+from .file_processor import motor_excel
 
 class PhysicalCountImporter:
-    def __init__(self, logger):
+    # Bodegas en las que se registra cada producto; las existencias contadas van a la primera
+    # y las demás quedan en 0
+    BODEGAS = ["3-Almacén", "1-E-COMMERCE", ""]
+
+    def __init__(self, logger, bodegas=None):
         self.logger = logger
+        self.bodegas = list(bodegas) if bodegas is not None else list(self.BODEGAS)
+        if not self.bodegas:
+            raise ValueError("Se requiere al menos una bodega para la importación")
+
+    def _texto(self, serie):
+        """Texto sin espacios a los lados; los vacíos y 'nan' quedan como ''."""
+        texto = serie.fillna("").astype(str).str.strip()
+        return texto.where(texto.str.lower() != "nan", "")
+
+    def construir_nombres(self, df):
+        """Nombre del producto: la descripción y, si la hay, la ubicación entre paréntesis.
+
+        Se usa la ubicación de las marcas y, si no hay, la de Siigo.
+        """
+        descripcion = self._texto(df["DESCRIPCION"])
+        ubicacion = self._texto(df["UBICACION_MARCAS"])
+        ubicacion = ubicacion.where(ubicacion != "", self._texto(df["UBICACION_SIIGO"]))
+        return descripcion.where(ubicacion == "", descripcion + " (" + ubicacion + ")")
 
-    def generar_importacion_conteo(self, ruta_analisis):
+    def generar_importacion(self, analisis):
+        """Construye las filas del archivo de importación a partir de la tabla comparativa.
+
+        Cada producto con un solo código de Siigo se repite una vez por bodega, en el orden
+        de self.bodegas, y los productos quedan ordenados por código.
+        """
         try:
-            self.logger.agregar_log(f"Generando archivo de importación desde: {ruta_analisis}")
-            
-            df = pd.read_excel(ruta_analisis, sheet_name="Comparativo")
+            self.logger.agregar_log("Generando importación de conteo físico...")
+            df = analisis
 
             # Filtrar filas con un solo código no vacío
-            df = df[df["CODIGO_SIIGO"].notna()]
-            df = df[df["CODIGO_SIIGO"].astype(str).str.strip() != ""]
-            df = df[~df["CODIGO_SIIGO"].astype(str).str.contains(",")]
-
-            def construir_nombre(row):
-                descripcion = str(row["DESCRIPCION"]).strip()
-                ubicacion = ""
-                if str(row["UBICACION_MARCAS"]).strip().lower() not in ["", "nan"]:
-                    ubicacion = str(row["UBICACION_MARCAS"]).strip()
-                elif str(row["UBICACION_SIIGO"]).strip().lower() not in ["", "nan"]:
-                    ubicacion = str(row["UBICACION_SIIGO"]).strip()
-                return f"{descripcion} ({ubicacion})" if ubicacion else descripcion
-
-            # Create the base dataframe
-            df_import = pd.DataFrame({
-                "Código del producto \n(obligatorio) ": df["CODIGO_SIIGO"],
-                "Nombre del producto / Servicio": df.apply(construir_nombre, axis=1),
-                "Referencia de fábrica": df["REFERENCIA"],
-                "Código de Bodega": "3-Almacén",
-                "Existencias contadas \n(obligatorio)": df["INVENTARIO MANUAL"]
-            })
+            codigos = df["CODIGO_SIIGO"].astype(str).str.strip()
+            df = df[df["CODIGO_SIIGO"].notna() & (codigos != "") & ~codigos.str.contains(",")]
 
-            # Create additional rows for each item
-            df_ecommerce = pd.DataFrame({
-                "Código del producto \n(obligatorio) ": df["CODIGO_SIIGO"],
-                "Nombre del producto / Servicio": df.apply(construir_nombre, axis=1),
-                "Referencia de fábrica": df["REFERENCIA"],
-                "Código de Bodega": "1-E-COMMERCE",
-                "Existencias contadas \n(obligatorio)": 0
-            })
+            # Ordenar los productos una sola vez; al repetirlos por bodega quedan agrupados por código
+            df = df.sort_values(by="CODIGO_SIIGO", kind="stable")
 
-            df_empty_warehouse = pd.DataFrame({
+            base = pd.DataFrame({
                 "Código del producto \n(obligatorio) ": df["CODIGO_SIIGO"],
-                "Nombre del producto / Servicio": df.apply(construir_nombre, axis=1),
-                "Referencia de fábrica": df["REFERENCIA"],
-                "Código de Bodega": "",
-                "Existencias contadas \n(obligatorio)": 0
+                "Nombre del producto / Servicio": self.construir_nombres(df),
+                "Referencia de fábrica": df["REFERENCIA"]
             })
 
-            # Concatenate all dataframes
-            df_final = pd.concat([df_import, df_ecommerce, df_empty_warehouse], ignore_index=True)
+            bodegas = len(self.bodegas)
+            df_final = base.iloc[np.repeat(np.arange(len(base)), bodegas)].reset_index(drop=True)
+            df_final["Código de Bodega"] = np.tile(np.array(self.bodegas, dtype=object), len(base))
+            conteo = np.tile(np.arange(bodegas) == 0, len(base))
+            df_final["Existencias contadas \n(obligatorio)"] = np.where(
+                conteo, np.repeat(df["INVENTARIO MANUAL"].to_numpy(), bodegas), 0
+            )
 
-            # Sort by product code to keep related items together
-            df_final.sort_values(by="Código del producto \n(obligatorio) ", inplace=True)
+            return df_final
 
-            output_path = Path("outputs") / "Importacion_conteo_fisico.xlsx"
-            
-            # Write to Excel with sheet name "Datos"
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                df_final.to_excel(writer, sheet_name="Datos", index=False)
+        except Exception as e:
+            self.logger.agregar_log(f"Error generando importación: {str(e)}", "error")
+            raise
 
-            self.logger.agregar_log(f"Archivo de importación generado: {output_path}", "exito")
-            return output_path
+    def escribir_importacion(self, df_final, output_dir="outputs"):
+        """Guarda el archivo de importación en Excel y devuelve su ruta."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(exist_ok=True)
+
+        output_path = output_dir / "Importacion_conteo_fisico.xlsx"
         
+        # Write to Excel with sheet name "Datos"
+        escribir_excel(output_path, df_final, "Datos")
+        return output_path
+
+    def generar_importacion_conteo(self, ruta_analisis, output_dir="outputs"):
+        try:
+            self.logger.agregar_log(f"Generando archivo de importación desde: {ruta_analisis}")
+            
+            df = pd.read_excel(ruta_analisis, sheet_name="Comparativo", engine=motor_excel())
         except Exception as e:
             self.logger.agregar_log(f"Error generando importación: {str(e)}", "error")
             raise
+
+        df_final = self.generar_importacion(df)
+        try:
+            output_path = self.escribir_importacion(df_final, output_dir)
+        except Exception as e:
+            self.logger.agregar_log(f"Error generando importación: {str(e)}", "error")
+            raise
+
+        self.logger.agregar_log(f"Archivo de importación generado: {output_path}", "exito")
+        return output_path
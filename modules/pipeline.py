@@ -0,0 +1,270 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .consolidator import Consolidator
+from .comparative_analyzer import ComparativeAnalyzer
+from .physical_count_importer import PhysicalCountImporter
+from .instrumentacion import Instrumentacion, copiar_contexto, medir, perfilar
+from .logger import RegistroCola
+from .utils import ProcesoCancelado
+
+class EscritorSegundoPlano:
+    """Escribe los archivos de salida en un hilo aparte, en el orden en que se programan."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="escritor-excel")
+        self._pendientes = {}
+
+    def programar(self, nombre, funcion, *args):
+        # La escritura se mide en la instrumentación activa de quien la programa
+        self._pendientes[nombre] = self._executor.submit(copiar_contexto(funcion), *args)
+
+    def esperar(self):
+        """Espera a que terminen las escrituras y devuelve {nombre: ruta}; relanza el primer error."""
+        try:
+            return {nombre: futuro.result() for nombre, futuro in self._pendientes.items()}
+        finally:
+            self._pendientes = {}
+
+    def cerrar(self):
+        self._executor.shutdown(wait=True)
+
+
+class Pipeline:
+    """Ejecuta consolidación, análisis e importación pasando los DataFrames en memoria.
+
+    Los archivos de Excel son salidas opcionales que se escriben en segundo plano,
+    de modo que ninguna etapa espera a que termine la escritura de la anterior.
+    """
+
+    def __init__(self, logger, consolidator=None, analyzer=None, importador=None, incremental=None,
+                 historial=None):
+        self.logger = logger
+        self.consolidator = consolidator or Consolidator(logger)
+        self.analyzer = analyzer or ComparativeAnalyzer(logger)
+        self.importador = importador or PhysicalCountImporter(logger)
+        # AnalisisIncremental opcional para recalcular solo las referencias que cambiaron
+        self.incremental = incremental
+        # HistorialConteos opcional donde se guardan el consolidado y la tabla comparativa de cada ejecución
+        self.historial = historial
+
+    def _consolidar_y_analizar_por_bloques(self, inputs_dir, output_dir, escribir_salidas,
+                                           filas_por_bloque, avanzar, revisar_cancelacion, historial=None):
+        """Consolida y analiza por bloques; cada bloque se escribe en el consolidado y se resume.
+
+        historial, si se indica, es la EjecucionHistorial donde se guarda cada bloque.
+
+        Devuelve (tabla comparativa, filas del consolidado, ruta del consolidado o None).
+        """
+        libro = self.consolidator.abrir_consolidado(output_dir) if escribir_salidas else None
+        filas = 0
+
+        def bloques():
+            nonlocal filas
+            for bloque in self.consolidator.consolidar_por_bloques(
+                inputs_dir, filas_por_bloque,
+                progreso=lambda fraccion, mensaje: avanzar(10 + int(30 * fraccion), mensaje)
+            ):
+                revisar_cancelacion()
+                if libro is not None:
+                    with medir(f"escritura {libro.ruta.name}", filas_entrada=len(bloque)):
+                        libro.agregar(bloque)
+                if historial is not None:
+                    with medir("historial", filas_entrada=len(bloque)):
+                        historial.agregar_consolidado(bloque)
+                filas += len(bloque)
+                yield bloque
+
+        try:
+            analisis = self.analyzer.analizar_por_bloques(bloques())
+        finally:
+            if libro is not None:
+                libro.cerrar()
+        return analisis, filas, libro.ruta if libro is not None else None
+
+    def ejecutar(self, inputs_dir="inputs", output_dir="outputs", escribir_salidas=True,
+                 progreso=None, cancelacion=None, filas_por_bloque=None, perfil=None):
+        """Ejecuta todas las etapas y devuelve los DataFrames y las rutas de los archivos escritos.
+
+        Con historial, el consolidado y la tabla comparativa se guardan en la base del historial
+        y 'ejecucion_historial' es el id de la ejecución guardada.
+
+        Con análisis incremental, 'referencias_cambiadas' lista las referencias recalculadas
+        o eliminadas respecto de la ejecución anterior (None si se recalculó todo).
+        'sugerencias' propone pares de referencias que están solo en las marcas y solo en Siigo
+        (ComparativeAnalyzer.sugerir_coincidencias); se escriben en la hoja 'Sugerencias' del análisis.
+
+        Con filas_por_bloque los archivos se leen y se analizan por bloques de ese tamaño,
+        sin reunir el consolidado en memoria: la memoria depende del tamaño del bloque y de
+        la cantidad de referencias, no del total de filas. En ese modo 'consolidado' es None,
+        el consolidado se escribe a medida que se lee y no se usan la caché, la lectura en
+        paralelo ni el análisis incremental.
+
+        'informe' tiene el tiempo real, el tiempo de CPU, las filas y el pico de memoria de cada
+        etapa y subetapa (ver modules.instrumentacion); con escribir_salidas se guarda además en
+        output_dir/informe_ejecucion.json. Con perfil se guarda en esa ruta un perfil de cProfile
+        del hilo que ejecuta las etapas.
+
+        progreso, si se indica, se llama con (porcentaje, mensaje) a medida que avanzan las etapas.
+        cancelacion es un threading.Event opcional; si se activa, la ejecución se detiene en el
+        siguiente punto de avance con ProcesoCancelado.
+        """
+        def revisar_cancelacion():
+            if cancelacion is not None and cancelacion.is_set():
+                raise ProcesoCancelado("Proceso cancelado por el usuario")
+
+        def avanzar(valor, mensaje):
+            revisar_cancelacion()
+            if progreso is not None:
+                progreso(valor, mensaje)
+
+        output_dir = Path(output_dir)
+        instrumentacion = Instrumentacion()
+        with instrumentacion.activar(), perfilar(perfil):
+            resultado = self._ejecutar_etapas(
+                inputs_dir, output_dir, escribir_salidas, filas_por_bloque, avanzar, revisar_cancelacion
+            )
+        if perfil is not None:
+            self.logger.agregar_log(f"Perfil de ejecución guardado en: {perfil}")
+
+        resultado['informe'] = instrumentacion.informe()
+        if escribir_salidas:
+            resultado['archivos']['informe'] = instrumentacion.escribir_informe(output_dir)
+            self.logger.agregar_log(f"Informe de ejecución creado: {resultado['archivos']['informe']}", 'exito')
+
+        avanzar(100, "Proceso completado con éxito")
+        return resultado
+
+    def _ejecutar_etapas(self, inputs_dir, output_dir, escribir_salidas, filas_por_bloque,
+                         avanzar, revisar_cancelacion):
+        escritor = EscritorSegundoPlano() if escribir_salidas else None
+        archivos = {}
+        cambiadas = None
+        historial = None
+        try:
+            if self.historial is not None:
+                historial = self.historial.iniciar(entrada=Path(inputs_dir).resolve())
+            avanzar(10, "Iniciando proceso de consolidación...")
+            if filas_por_bloque:
+                if self.incremental is not None:
+                    self.logger.agregar_log(
+                        "El análisis incremental no está disponible por bloques; se recalculan todas las referencias",
+                        'advertencia'
+                    )
+                consolidado = None
+                with medir("consolidacion y analisis por bloques") as medicion:
+                    analisis, filas, archivo_consolidado = self._consolidar_y_analizar_por_bloques(
+                        inputs_dir, output_dir, escribir_salidas, filas_por_bloque, avanzar, revisar_cancelacion,
+                        historial
+                    )
+                    medicion.filas_entrada = filas
+                    medicion.filas_salida = len(analisis)
+                if archivo_consolidado is not None:
+                    archivos['consolidado'] = archivo_consolidado
+                avanzar(40, f"Consolidado creado: {filas} filas")
+            else:
+                with medir("consolidacion") as medicion:
+                    consolidado = self.consolidator.consolidar(
+                        inputs_dir, progreso=lambda fraccion, mensaje: avanzar(10 + int(30 * fraccion), mensaje)
+                    )
+                    medicion.filas_salida = len(consolidado)
+                if escritor:
+                    escritor.programar('consolidado', self.consolidator.escribir_consolidado, consolidado, output_dir)
+                avanzar(40, f"Consolidado creado: {len(consolidado)} filas")
+
+                with medir("analisis", filas_entrada=len(consolidado)) as medicion:
+                    if self.incremental is not None:
+                        analisis, cambiadas = self.incremental.analizar(consolidado)
+                    else:
+                        analisis = self.analyzer.analizar(consolidado)
+                    medicion.filas_salida = len(analisis)
+            with medir("sugerencias de coincidencia", filas_entrada=len(analisis)) as medicion:
+                sugerencias = self.analyzer.sugerir_coincidencias(analisis)
+                medicion.filas_salida = len(sugerencias)
+            if escritor:
+                escritor.programar('analisis', self.analyzer.escribir_analisis, analisis, output_dir, sugerencias)
+            avanzar(60, f"Análisis comparativo creado: {len(analisis)} filas")
+
+            if historial is not None:
+                with medir("historial", filas_entrada=len(analisis)):
+                    if consolidado is not None:
+                        historial.agregar_consolidado(consolidado)
+                    historial.agregar_comparativo(analisis)
+                    historial.confirmar()
+                self.logger.agregar_log(
+                    f"Ejecución {historial.ejecucion} guardada en el historial: {self.historial.ruta}", 'exito'
+                )
+
+            with medir("importacion", filas_entrada=len(analisis)) as medicion:
+                importacion = self.importador.generar_importacion(analisis)
+                medicion.filas_salida = len(importacion)
+            if escritor:
+                escritor.programar('importacion', self.importador.escribir_importacion, importacion, output_dir)
+            avanzar(80, "Escribiendo archivos de salida...")
+
+            if escritor:
+                try:
+                    # Lo que tarda la escritura después de terminar las demás etapas
+                    with medir("espera de escritura"):
+                        archivos.update(escritor.esperar())
+                except Exception as e:
+                    self.logger.agregar_log(f"Error escribiendo archivos de salida: {str(e)}", 'error')
+                    raise
+                for archivo in archivos.values():
+                    self.logger.agregar_log(f"Archivo creado: {archivo}", 'exito')
+        finally:
+            if escritor:
+                escritor.cerrar()
+            # Si la ejecución no terminó, no dejar en el historial una ejecución incompleta
+            if historial is not None:
+                historial.descartar()
+
+        return {
+            'consolidado': consolidado,
+            'analisis': analisis,
+            'sugerencias': sugerencias,
+            'importacion': importacion,
+            'archivos': archivos,
+            'referencias_cambiadas': cambiadas,
+            'ejecucion_historial': historial.ejecucion if historial is not None else None
+        }
+
+
+class EjecucionSegundoPlano:
+    """Ejecuta el pipeline en un hilo de trabajo y publica sus eventos en una cola.
+
+    La interfaz consulta la cola periódicamente; los eventos son ('log', mensaje, tipo),
+    ('progreso', valor, mensaje), ('fin', resultado), ('cancelado',) y ('error', excepcion).
+    crear_pipeline recibe el registro del hilo y devuelve el Pipeline a ejecutar.
+    """
+
+    def __init__(self, crear_pipeline, **opciones):
+        self.cola = queue.Queue()
+        self.cancelacion = threading.Event()
+        self._crear_pipeline = crear_pipeline
+        self._opciones = opciones
+        self._hilo = threading.Thread(target=self._ejecutar, name="pipeline", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def cancelar(self):
+        self.cancelacion.set()
+
+    def en_curso(self):
+        return self._hilo.is_alive()
+
+    def _ejecutar(self):
+        registro = RegistroCola(self.cola)
+        try:
+            resultado = self._crear_pipeline(registro).ejecutar(
+                progreso=lambda valor, mensaje: self.cola.put(('progreso', valor, mensaje)),
+                cancelacion=self.cancelacion,
+                **self._opciones
+            )
+            self.cola.put(('fin', resultado))
+        except ProcesoCancelado:
+            self.cola.put(('cancelado',))
+        except Exception as e:
+            self.cola.put(('error', e))
@@ -0,0 +1,62 @@
+import importlib
+import threading
+import time
+
+# Módulos que cargan pandas, numpy, openpyxl y pyarrow; los relativos son de este paquete
+MODULOS = (
+    "pandas",
+    "numpy",
+    "openpyxl",
+    ".esquema",
+    ".file_processor",
+    ".consolidator",
+    ".comparative_analyzer",
+    ".physical_count_importer",
+    ".pipeline",
+    ".cache",
+    ".incremental",
+    ".historial",
+    ".explorador",
+)
+
+class Precarga:
+    """Importa en un hilo aparte los módulos de datos, para que la ventana aparezca sin esperarlos.
+
+    Importar un módulo que se está precargando espera a que termine su carga, así que el código
+    que los usa puede importarlos normalmente; terminada() permite no bloquear la interfaz
+    mientras tanto. Un error de importación no se relanza aquí: vuelve a aparecer, con su
+    mensaje, donde se importe el módulo.
+    """
+
+    def __init__(self, logger, modulos=MODULOS):
+        self.logger = logger
+        self.modulos = modulos
+        self.duracion_s = None
+        self.error = None
+        self._terminada = threading.Event()
+        self._hilo = threading.Thread(target=self._cargar, name="precarga", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def _cargar(self):
+        inicio = time.perf_counter()
+        try:
+            for modulo in self.modulos:
+                importlib.import_module(modulo, __package__)
+        except Exception as e:
+            self.error = e
+            self.logger.agregar_log(f"No se pudieron precargar los módulos de datos: {str(e)}", 'advertencia')
+        finally:
+            self.duracion_s = time.perf_counter() - inicio
+            self._terminada.set()
+        if self.error is None:
+            self.logger.agregar_log(f"Módulos de datos cargados en {self.duracion_s:.1f} s", 'debug')
+
+    def terminada(self):
+        return self._terminada.is_set()
+
+    def esperar(self, timeout=None):
+        """Espera a que termine la precarga; devuelve False si se agotó timeout."""
+        return self._terminada.wait(timeout)
@@ -0,0 +1,101 @@
+import tkinter as tk
+from tkinter import ttk
+
+class TablaVirtual:
+    """Treeview que solo crea los ítems de las filas visibles.
+
+    La tabla tiene siempre alto ítems; al desplazarse se reemplazan por las filas de la nueva
+    posición, que se piden a obtener_filas(inicio, fin) como tuplas de valores ya formateados.
+    Así mostrar cien mil filas cuesta lo mismo que mostrar alto. al_seleccionar, si se indica,
+    se llama con la posición de la fila elegida.
+    """
+
+    def __init__(self, contenedor, columnas, alto=12, al_seleccionar=None):
+        self.alto = alto
+        self.al_seleccionar = al_seleccionar
+        self.total = 0
+        self.inicio = 0
+        self.seleccionada = None
+        self.obtener_filas = lambda inicio, fin: []
+
+        self.frame = ttk.Frame(contenedor)
+        self.barra = ttk.Scrollbar(self.frame, orient="vertical", command=self._desplazar)
+        self.barra.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tabla = ttk.Treeview(
+            self.frame, columns=[columna for columna, _, _ in columnas], show="headings",
+            height=alto, selectmode="browse"
+        )
+        for columna, titulo, ancho in columnas:
+            self.tabla.heading(columna, text=titulo)
+            self.tabla.column(columna, width=ancho, anchor="w", stretch=True)
+        self.tabla.pack(fill=tk.X, expand=True)
+
+        self.tabla.bind("<MouseWheel>", lambda e: self._rueda(-1 if e.delta > 0 else 1))
+        self.tabla.bind("<Button-4>", lambda e: self._rueda(-1))
+        self.tabla.bind("<Button-5>", lambda e: self._rueda(1))
+        self.tabla.bind("<Up>", lambda e: self._mover_seleccion(-1))
+        self.tabla.bind("<Down>", lambda e: self._mover_seleccion(1))
+        self.tabla.bind("<Prior>", lambda e: self._mover_seleccion(-self.alto))
+        self.tabla.bind("<Next>", lambda e: self._mover_seleccion(self.alto))
+        self.tabla.bind("<<TreeviewSelect>>", self._al_seleccionar)
+
+    def pack(self, **opciones):
+        self.frame.pack(**opciones)
+
+    def mostrar(self, total, obtener_filas):
+        """Muestra total filas desde el principio, sin selección."""
+        self.total = total
+        self.obtener_filas = obtener_filas
+        self.seleccionada = None
+        self.ir_a(0)
+
+    def ir_a(self, inicio):
+        self.inicio = max(0, min(inicio, self.total - self.alto))
+        self._dibujar()
+
+    def _dibujar(self):
+        self.tabla.delete(*self.tabla.get_children())
+        fin = min(self.inicio + self.alto, self.total)
+        for posicion, valores in enumerate(self.obtener_filas(self.inicio, fin), self.inicio):
+            self.tabla.insert("", "end", iid=str(posicion), values=valores)
+        if self.seleccionada is not None and self.tabla.exists(str(self.seleccionada)):
+            # Volver a marcar la fila elegida sin avisar otra vez a al_seleccionar
+            self.tabla.selection_set(str(self.seleccionada))
+            self.tabla.focus(str(self.seleccionada))
+        if self.total:
+            self.barra.set(self.inicio / self.total, fin / self.total)
+        else:
+            self.barra.set(0, 1)
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self.ir_a(int(float(cantidad) * self.total))
+        elif unidad == "pages":
+            self.ir_a(self.inicio + int(cantidad) * self.alto)
+        else:
+            self.ir_a(self.inicio + int(cantidad))
+
+    def _rueda(self, pasos):
+        self.ir_a(self.inicio + 3 * pasos)
+        return "break"
+
+    def _mover_seleccion(self, pasos):
+        if not self.total:
+            return "break"
+        actual = self.seleccionada if self.seleccionada is not None else self.inicio - 1
+        posicion = max(0, min(actual + pasos, self.total - 1))
+        if posicion < self.inicio:
+            self.ir_a(posicion)
+        elif posicion >= self.inicio + self.alto:
+            self.ir_a(posicion - self.alto + 1)
+        self.tabla.selection_set(str(posicion))
+        self.tabla.focus(str(posicion))
+        return "break"
+
+    def _al_seleccionar(self, evento):
+        elegidas = self.tabla.selection()
+        if not elegidas or int(elegidas[0]) == self.seleccionada:
+            return
+        self.seleccionada = int(elegidas[0])
+        if self.al_seleccionar is not None:
+            self.al_seleccionar(self.seleccionada)
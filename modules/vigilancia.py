@@ -0,0 +1,118 @@
+import threading
+import time
+from pathlib import Path
+from .fuentes import EXTENSIONES
+from .utils import ProcesoCancelado
+
+class VigilanteEntradas:
+    """Vigila la carpeta de entrada y vuelve a ejecutar el pipeline cuando cambian sus archivos.
+
+    Cada intervalo segundos compara la fecha de modificación y el tamaño de los archivos de las
+    fuentes. Tras un cambio espera a que la carpeta pase espera segundos sin cambios, porque un
+    archivo se copia o se guarda en varios pasos, y solo entonces ejecuta. El proceso queda
+    abierto entre ejecuciones; con una CacheMemoria en el Consolidator del pipeline solo se
+    vuelven a leer los archivos que cambiaron.
+
+    opciones se pasan a Pipeline.ejecutar (por ejemplo, filas_por_bloque).
+    """
+
+    def __init__(self, logger, pipeline, inputs_dir="inputs", output_dir="outputs",
+                 espera=1.0, intervalo=0.5, **opciones):
+        self.logger = logger
+        self.pipeline = pipeline
+        self.inputs_dir = Path(inputs_dir)
+        self.output_dir = Path(output_dir)
+        self.espera = espera
+        self.intervalo = intervalo
+        self.opciones = opciones
+        self.detener = threading.Event()
+
+    def instantanea(self):
+        """Devuelve {nombre de archivo: (fecha de modificación, tamaño)} de los archivos de las fuentes."""
+        registro = self.pipeline.consolidator.registro
+        archivos = {}
+        try:
+            entradas = list(self.inputs_dir.iterdir())
+        except FileNotFoundError:
+            return archivos
+        for archivo in entradas:
+            if archivo.suffix.lower() not in EXTENSIONES or archivo.name.startswith("~$"):
+                continue
+            if registro.identificar(archivo) is None:
+                continue
+            try:
+                estado = archivo.stat()
+            except FileNotFoundError:
+                continue
+            archivos[archivo.name] = (estado.st_mtime_ns, estado.st_size)
+        return archivos
+
+    def _cambios(self, anterior, actual):
+        return sorted(nombre for nombre in anterior.keys() | actual.keys() if anterior.get(nombre) != actual.get(nombre))
+
+    def esperar_cambios(self, anterior):
+        """Espera a que la carpeta cambie respecto de anterior y se estabilice.
+
+        Devuelve (instantánea nueva, archivos cambiados), o None si se pidió detener.
+        """
+        actual = anterior
+        while actual == anterior:
+            if self.detener.wait(self.intervalo):
+                return None
+            actual = self.instantanea()
+
+        ultimo_cambio = time.monotonic()
+        while time.monotonic() - ultimo_cambio < self.espera:
+            if self.detener.wait(self.intervalo):
+                return None
+            nueva = self.instantanea()
+            if nueva != actual:
+                actual = nueva
+                ultimo_cambio = time.monotonic()
+        return actual, self._cambios(anterior, actual)
+
+    def ejecutar_una_vez(self):
+        """Ejecuta el pipeline; devuelve (resultado, segundos), con None si falló (el error queda en el registro)."""
+        inicio = time.perf_counter()
+        try:
+            resultado = self.pipeline.ejecutar(
+                inputs_dir=self.inputs_dir, output_dir=self.output_dir, cancelacion=self.detener, **self.opciones
+            )
+        except ProcesoCancelado:
+            resultado = None
+        except Exception as e:
+            # Un archivo a medio copiar o abierto en Excel no detiene la vigilancia
+            self.logger.agregar_log(f"Error: {str(e)}. Se espera el próximo cambio en {self.inputs_dir}", 'error')
+            resultado = None
+        duracion = time.perf_counter() - inicio
+        if resultado is not None:
+            self.logger.agregar_log(f"Salidas actualizadas en {duracion:.1f} s", 'exito')
+        return resultado, duracion
+
+    def vigilar(self, al_ejecutar=None, ejecutar_al_iniciar=True):
+        """Vigila la carpeta hasta que se llame a detenerse.
+
+        al_ejecutar, si se indica, se llama tras cada ejecución con (archivos cambiados,
+        resultado o None si falló, segundos); en la ejecución inicial los archivos cambiados son [].
+        """
+        self.detener.clear()
+        self.logger.agregar_log(f"Vigilando {self.inputs_dir}; las salidas se actualizan en {self.output_dir}")
+        instantanea = self.instantanea()
+        if ejecutar_al_iniciar:
+            resultado, duracion = self.ejecutar_una_vez()
+            if al_ejecutar is not None and not self.detener.is_set():
+                al_ejecutar([], resultado, duracion)
+        while not self.detener.is_set():
+            cambio = self.esperar_cambios(instantanea)
+            if cambio is None:
+                break
+            instantanea, cambiados = cambio
+            self.logger.agregar_log(f"Cambios en {self.inputs_dir}: {', '.join(cambiados)}")
+            resultado, duracion = self.ejecutar_una_vez()
+            if al_ejecutar is not None and not self.detener.is_set():
+                al_ejecutar(cambiados, resultado, duracion)
+        self.logger.agregar_log("Vigilancia detenida")
+
+    def detenerse(self):
+        """Detiene la vigilancia; una ejecución en curso se cancela en su siguiente punto de avance."""
+        self.detener.set()
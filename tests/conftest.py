@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Permite importar modules/ al correr pytest desde cualquier carpeta
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
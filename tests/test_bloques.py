@@ -0,0 +1,53 @@
+"""El modo por bloques (--filas-por-bloque) debe dar la misma tabla que la lectura completa."""
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from modules.comparative_analyzer import ComparativeAnalyzer
+from modules.file_processor import FileProcessor
+from modules.fuentes import RegistroFuentes
+from modules.logger import RegistroMemoria
+
+FILAS = 1500
+
+@pytest.fixture(scope="module")
+def conteo_numerico(tmp_path_factory):
+    """Conteo de marca con referencias numéricas, celdas vacías y cantidades con decimales."""
+    rng = np.random.default_rng(7)
+    ruta = tmp_path_factory.mktemp("entradas") / "STIHL.xlsx"
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(["Reporte de inventario STIHL"])
+    hoja.append([])
+    hoja.append(["REFERENCIA", "DESCRIPCION", "CANTIDAD", "UBICACION"])
+    for i in range(FILAS):
+        referencia = int(rng.integers(1000, 1300)) if rng.random() > 0.05 else None
+        cantidad = round(float(rng.random() * 10), 2) if rng.random() < 0.5 else int(rng.integers(0, 40))
+        hoja.append([
+            referencia,
+            f"Producto {referencia}" if rng.random() > 0.1 else None,
+            cantidad if rng.random() > 0.02 else None,
+            str(rng.choice(["A1", "B2", "C3"])) if rng.random() > 0.3 else None,
+        ])
+    libro.save(ruta)
+    return ruta
+
+@pytest.fixture(scope="module")
+def lectores():
+    registro = RegistroFuentes.predeterminado()
+    logger = RegistroMemoria()
+    return registro.fuente("STIHL"), FileProcessor(logger, registro), ComparativeAnalyzer(logger, registro)
+
+@pytest.mark.parametrize("filas_por_bloque", [7, 100, 1000])
+def test_bloques_igual_a_completo(conteo_numerico, lectores, filas_por_bloque):
+    fuente, procesador, analyzer = lectores
+    completo = analyzer.analizar(procesador.leer_archivo(conteo_numerico, fuente))
+    por_bloques = analyzer.analizar_por_bloques(
+        procesador.leer_archivo_por_bloques(conteo_numerico, fuente, filas_por_bloque)
+    )
+    pd.testing.assert_frame_equal(por_bloques, completo, check_exact=True)
+
+def test_referencias_numericas_como_texto(conteo_numerico, lectores):
+    fuente, procesador, _ = lectores
+    referencias = procesador.leer_archivo(conteo_numerico, fuente)["REFERENCIA"].dropna()
+    assert referencias.str.fullmatch(r"\d+").all()
@@ -0,0 +1,19 @@
+"""Opciones de mantenimiento de la línea de comandos (cli.py)."""
+import pandas as pd
+from cli import main
+from modules.cache import CacheEntradas
+
+def test_limpiar_cache(tmp_path, capsys):
+    cache = CacheEntradas(tmp_path / "cache")
+    archivo = tmp_path / "STIHL.csv"
+    archivo.write_text("REFERENCIA,DESCRIPCION,CANTIDAD\nR1,Filtro,1\n", encoding="utf-8")
+    clave = cache.clave(archivo, "STIHL")
+    cache.guardar(clave, pd.DataFrame({"REFERENCIA": ["R1"]}))
+    assert cache.obtener(clave) is not None
+
+    assert main(["--limpiar-cache", "--cache", str(tmp_path / "cache")]) == 0
+    assert cache.obtener(clave) is None
+    assert not (tmp_path / "cache").exists()
+    assert "eliminada" in capsys.readouterr().out
+    # Sin caché no hay nada que eliminar y no es un error
+    assert main(["--limpiar-cache", "--cache", str(tmp_path / "cache")]) == 0
@@ -0,0 +1,50 @@
+"""Sugerencias de coincidencia de referencias (modules.coincidencias)."""
+import pandas as pd
+from modules.coincidencias import METODO_CLAVE, METODO_GRAMAS, IndiceReferencias, normalizar_claves, sugerir_pares
+
+def test_claves_sin_ceros_por_numero():
+    assert normalizar_claves(["11-23-456", "a-0012", "11-023", "REF-000100", "0", "10-0"]).tolist() == [
+        "1123456", "A12", "1123", "REF100", "0", "100"
+    ]
+
+def test_misma_clave_con_otra_escritura():
+    indice = IndiceReferencias(["1123456", "A12", "1123"])
+    assert indice.buscar("11-23-456") == [(0, 1.0, METODO_CLAVE)]
+    assert indice.buscar("a-0012") == [(1, 1.0, METODO_CLAVE)]
+    assert indice.buscar("11-023") == [(2, 1.0, METODO_CLAVE)]
+
+def test_cifras_distintas_no_son_sugerencia():
+    # Casi todos los trigramas coinciden, pero son otras piezas
+    indice = IndiceReferencias(["REF-001000", "REF-001002", "REF-000101", "REF-0010"])
+    assert indice.buscar("REF-000100") == []
+
+def test_mismas_cifras_con_letras_distintas():
+    indice = IndiceReferencias(["REF-000123X", "XYZ-123"])
+    resultado = indice.buscar("REF-000123")
+    assert [(i, metodo) for i, _, metodo in resultado] == [(0, METODO_GRAMAS)]
+    assert resultado[0][1] >= 0.75
+
+def test_grupo_grande_sin_leer_trigramas_comunes():
+    referencias = [f"FILTRO-{a}{b}{c}" for a in "ABCDEFGHIJ" for b in "KLMNOPQRST" for c in "UVWXYZ"]
+    indice = IndiceReferencias(referencias, max_candidatos=50)
+    # Los trigramas del prefijo compartido están en todo el grupo y no se indexan
+    assert "FIL" not in indice._por_grama[""] and "^FI" not in indice._por_grama[""]
+    assert indice.buscar("FILTRO-AKUQ") == [(0, 0.842, METODO_GRAMAS)]
+
+def test_sugerir_pares():
+    marcas = pd.DataFrame({
+        "REFERENCIA": ["11-23-456", "REF-000100"],
+        "DESCRIPCION": ["Cadena", "Filtro"],
+        "ORIGEN": ["STIHL", "YAMAHA"],
+        "INVENTARIO MANUAL": [2.0, 1.0]
+    })
+    siigo = pd.DataFrame({
+        "REFERENCIA": ["REF-001000", "1123456"],
+        "DESCRIPCION": ["Otro", "Cadena"],
+        "CODIGO_SIIGO": ["0001", "0002"],
+        "SIIGO": [5.0, 3.0]
+    })
+    sugerencias = sugerir_pares(marcas, siigo)
+    assert sugerencias[["REFERENCIA_MARCA", "REFERENCIA_SIIGO", "CONFIANZA"]].values.tolist() == [
+        ["11-23-456", "1123456", 1.0]
+    ]
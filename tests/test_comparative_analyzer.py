@@ -0,0 +1,157 @@
+"""La agregación vectorizada de ComparativeAnalyzer.analizar debe dar la misma tabla que el
+recorrido por grupos que reemplazó (analizar_con_bucle, copiado de la versión anterior)."""
+import numpy as np
+import pandas as pd
+import pytest
+from modules import esquema
+from modules.comparative_analyzer import ComparativeAnalyzer
+from modules.fuentes import RegistroFuentes
+from modules.logger import RegistroMemoria
+
+MARCAS = ["STIHL", "SUZUKI", "YAMAHA"]
+TEXTOS = ["REFERENCIA", "DESCRIPCION", "ORIGEN", "UBICACION_MARCAS", "UBICACION_SIIGO", "CODIGO_SIIGO"]
+
+def analizar_con_bucle(df):
+    """Implementación anterior: un recorrido de Python por cada REFERENCIA."""
+    df = df.copy()
+    df["REFERENCIA"] = df["REFERENCIA"].fillna("").astype(str).str.strip().replace("nan", "")
+    df["CODIGO_SIIGO"] = df["CODIGO_SIIGO"].fillna("").astype(str).str.strip().replace("nan", "")
+    df_con_ref = df[df["REFERENCIA"] != ""].copy()
+    df_sin_ref = df[df["REFERENCIA"] == ""].copy()
+
+    if not df_con_ref.empty:
+        registros = []
+        for ref, grupo in df_con_ref.groupby("REFERENCIA"):
+            descripcion = grupo['DESCRIPCION'][
+                grupo['DESCRIPCION'].notna() & (grupo['DESCRIPCION'].astype(str).str.strip() != "")
+            ].astype(str)
+            descripcion = descripcion.iloc[0] if not descripcion.empty else ""
+            marcas = grupo[grupo["ORIGEN"].isin(MARCAS)]
+            siigo = grupo[grupo["ORIGEN"] == "SIIGO"]
+
+            def ubicaciones(filas):
+                return ", ".join(sorted(set(filas["UBICACION"].dropna().astype(str).str.strip().replace("nan", ""))))
+
+            codigos = []
+            for codigo in grupo["CODIGO_SIIGO"]:
+                codigo = str(codigo).strip()
+                if codigo and codigo.lower() != "nan":
+                    codigos.append(codigo)
+            registros.append({
+                "REFERENCIA": ref,
+                "DESCRIPCION": descripcion,
+                "ORIGEN": ", ".join(sorted(grupo['ORIGEN'].dropna().unique())),
+                "INVENTARIO MANUAL": marcas["CANTIDAD"].sum(),
+                "SIIGO": siigo["CANTIDAD"].sum(),
+                "DIFERENCIA": marcas["CANTIDAD"].sum() - siigo["CANTIDAD"].sum(),
+                "UBICACION_MARCAS": ubicaciones(marcas),
+                "UBICACION_SIIGO": ubicaciones(siigo),
+                "CODIGO_SIIGO": ", ".join(sorted(set(codigos)))
+            })
+        tabla = pd.DataFrame(registros)
+    else:
+        tabla = pd.DataFrame(columns=ComparativeAnalyzer.COLUMNAS_FINALES)
+
+    if not df_sin_ref.empty:
+        sin_ref = df_sin_ref.copy()
+        sin_ref['INVENTARIO MANUAL'] = 0
+        sin_ref['SIIGO'] = sin_ref['CANTIDAD']
+        sin_ref['DIFERENCIA'] = sin_ref['CANTIDAD']
+        sin_ref['UBICACION_MARCAS'] = sin_ref['UBICACION'].apply(
+            lambda x: str(x).strip() if str(x).strip().lower() not in ["", "nan"] else ""
+        )
+        sin_ref['UBICACION_SIIGO'] = ""
+        sin_ref['CODIGO_SIIGO'] = sin_ref['CODIGO_SIIGO'].fillna('').astype(str)
+        sin_ref = sin_ref[ComparativeAnalyzer.COLUMNAS_FINALES]
+        tabla = pd.concat([tabla, sin_ref], ignore_index=True) if not tabla.empty else sin_ref
+    return tabla
+
+def comparable(tabla):
+    """Textos con "" en lugar de nulos y cantidades como float, como quedan al escribir el Excel."""
+    tabla = tabla.reset_index(drop=True).copy()
+    for columna in TEXTOS:
+        tabla[columna] = tabla[columna].astype(object).where(tabla[columna].notna(), "").astype(str)
+    for columna in ["INVENTARIO MANUAL", "SIIGO", "DIFERENCIA"]:
+        tabla[columna] = tabla[columna].astype(float)
+    return tabla
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return ComparativeAnalyzer(RegistroMemoria(), RegistroFuentes.predeterminado())
+
+def verificar(analyzer, consolidado):
+    esperado = comparable(analizar_con_bucle(consolidado))
+    obtenido = comparable(analyzer.analizar(esquema.normalizar(consolidado)))
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+def consolidado_aleatorio(semilla, filas):
+    """Consolidado como lo leía la versión anterior: celdas vacías como NaN y textos con espacios."""
+    rng = np.random.default_rng(semilla)
+    referencias = np.array(
+        [f"R{i:03d}" for i in range(40)] + [" R001 ", "R002  ", "1001", "01001", "   "], dtype=object
+    )
+    referencias = referencias[rng.integers(0, len(referencias), filas)]
+    referencias[rng.random(filas) < 0.1] = np.nan
+    origenes = np.array(MARCAS + ["SIIGO"], dtype=object)[rng.integers(0, 4, filas)]
+    descripciones = np.array([f"Producto {i}" for i in rng.integers(0, 60, filas)], dtype=object)
+    descripciones[rng.random(filas) < 0.3] = np.nan
+    ubicaciones = np.array(["A1", "B2", " C3 ", "BODEGA"], dtype=object)[rng.integers(0, 4, filas)]
+    ubicaciones[rng.random(filas) < 0.4] = np.nan
+    # Pocos códigos distintos: se repiten dentro de una referencia y entre referencias
+    codigos = np.array(["0001", "0002", "0102918", " 0003 "], dtype=object)[rng.integers(0, 4, filas)]
+    codigos[(origenes != "SIIGO") | (rng.random(filas) < 0.2)] = np.nan
+    return pd.DataFrame({
+        "REFERENCIA": referencias,
+        "DESCRIPCION": descripciones,
+        "CANTIDAD": np.round(rng.normal(10, 20, filas), 2),
+        "ORIGEN": origenes,
+        "UBICACION": ubicaciones,
+        "CODIGO_SIIGO": codigos
+    })
+
+@pytest.mark.parametrize("semilla", range(8))
+def test_igual_al_bucle_en_datos_aleatorios(analyzer, semilla):
+    verificar(analyzer, consolidado_aleatorio(semilla, filas=400))
+
+def test_ubicaciones_vacias_y_codigos_repetidos(analyzer):
+    verificar(analyzer, pd.DataFrame({
+        "REFERENCIA": ["A", "A", "A", "B", "B", "C"],
+        "DESCRIPCION": [np.nan, "Filtro", "Otro", "Bujía", np.nan, np.nan],
+        "CANTIDAD": [1.0, 2.5, 3.0, 4.0, 5.0, 6.0],
+        "ORIGEN": ["STIHL", "SIIGO", "SIIGO", "YAMAHA", "SIIGO", "SIIGO"],
+        "UBICACION": [np.nan, np.nan, "B2", "A1", np.nan, np.nan],
+        "CODIGO_SIIGO": [np.nan, "0001", "0001", np.nan, "0001", "0002"]
+    }))
+
+def test_filas_sin_referencia(analyzer):
+    verificar(analyzer, pd.DataFrame({
+        "REFERENCIA": [np.nan, "R1", "  ", np.nan],
+        "DESCRIPCION": ["TOTAL", "Cadena", "Sin código", np.nan],
+        "CANTIDAD": [10.0, 2.0, 3.0, 4.0],
+        "ORIGEN": ["SIIGO", "STIHL", "SUZUKI", "SIIGO"],
+        "UBICACION": [np.nan, "A1", " B2 ", np.nan],
+        "CODIGO_SIIGO": ["0009", np.nan, np.nan, np.nan]
+    }))
+
+def test_todas_las_filas_sin_referencia(analyzer):
+    verificar(analyzer, pd.DataFrame({
+        "REFERENCIA": [np.nan, np.nan],
+        "DESCRIPCION": ["Uno", "Dos"],
+        "CANTIDAD": [1.0, 2.0],
+        "ORIGEN": ["STIHL", "SIIGO"],
+        "UBICACION": ["A1", np.nan],
+        "CODIGO_SIIGO": [np.nan, "0001"]
+    }))
+
+def test_ubicacion_en_blanco_no_se_lista(analyzer):
+    # El bucle anterior listaba una ubicación de solo espacios como vacía (", A1");
+    # con el esquema del consolidado es un valor ausente y no aparece
+    tabla = analyzer.analizar(esquema.normalizar(pd.DataFrame({
+        "REFERENCIA": ["A", "A", "A"],
+        "DESCRIPCION": ["Filtro", np.nan, np.nan],
+        "CANTIDAD": [1.0, 1.0, 1.0],
+        "ORIGEN": ["STIHL", "STIHL", "SUZUKI"],
+        "UBICACION": ["A1", "  ", ""],
+        "CODIGO_SIIGO": [np.nan, np.nan, np.nan]
+    })))
+    assert tabla["UBICACION_MARCAS"].tolist() == ["A1"]
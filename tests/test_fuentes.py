@@ -0,0 +1,35 @@
+"""Las columnas numéricas de cada fuente salen del registro (clave 'numericas' de fuentes.toml)."""
+from modules.fuentes import RegistroFuentes
+
+def test_numericas_del_registro_predeterminado():
+    registro = RegistroFuentes.cargar()
+    stihl, valoracion = registro.fuente("STIHL"), registro.de_tipo("siigo")[0]
+    assert stihl.numericas == {"CANTIDAD"} and valoracion.numericas == {"SALDO_CANTIDADES"}
+    assert stihl.es_numerica(" qty ") and not stihl.es_numerica("REFERENCIA")
+    assert valoracion.es_numerica("Saldo cantidades") and not valoracion.es_numerica("Código producto")
+
+def test_numericas_por_fuente_y_por_defecto(tmp_path):
+    ruta = tmp_path / "fuentes.toml"
+    ruta.write_text("""
+[[fuentes]]
+nombre = "STIHL"
+tipo = "marca"
+numericas = ["CANTIDAD", "UBICACION"]
+
+[[fuentes]]
+nombre = "VALORACION"
+tipo = "siigo"
+
+[tipos.marca.columnas]
+REFERENCIA = ["REFERENCIA"]
+CANTIDAD = ["CANTIDAD"]
+UBICACION = ["UBICACION"]
+
+[tipos.siigo.columnas]
+SALDO_CANTIDADES = ["SALDO"]
+""", encoding="utf-8")
+    registro = RegistroFuentes.cargar(ruta)
+    assert registro.fuente("STIHL").es_numerica("UBICACION")
+    # Sin 'numericas' en el registro se usan las cantidades del tipo
+    assert registro.fuente("VALORACION").numericas == {"SALDO_CANTIDADES"}
+    assert registro.fuente("STIHL").huella() != RegistroFuentes.cargar().fuente("STIHL").huella()
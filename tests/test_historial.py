@@ -0,0 +1,60 @@
+"""Consultas del historial de ejecuciones (modules.historial)."""
+import pandas as pd
+import pytest
+from modules.comparative_analyzer import ComparativeAnalyzer
+from modules.historial import HistorialConteos
+from modules.logger import RegistroMemoria
+
+def comparativo(diferencias, descripcion="Filtro"):
+    """Tabla comparativa con una fila por referencia y la diferencia indicada."""
+    tabla = pd.DataFrame({
+        "REFERENCIA": list(diferencias),
+        "DESCRIPCION": [f"{descripcion} {referencia}" for referencia in diferencias],
+        "ORIGEN": "STIHL, SIIGO",
+        "INVENTARIO MANUAL": 0.0,
+        "SIIGO": [-diferencia for diferencia in diferencias.values()],
+        "DIFERENCIA": list(diferencias.values()),
+        "UBICACION_MARCAS": "A1",
+        "UBICACION_SIIGO": "",
+        "CODIGO_SIIGO": "0001"
+    })
+    return tabla[ComparativeAnalyzer.COLUMNAS_FINALES]
+
+@pytest.fixture
+def historial(tmp_path):
+    return HistorialConteos(RegistroMemoria(), tmp_path / "historial.sqlite")
+
+def registrar(historial, ejecuciones, entrada="tienda"):
+    for dia, (diferencias, descripcion) in enumerate(ejecuciones, 1):
+        historial.registrar(comparativo(diferencias, descripcion), entrada=entrada, fecha=f"2026-01-{dia:02d}T08:00:00")
+
+def test_sin_suficientes_ejecuciones_no_hay_persistentes(historial):
+    registrar(historial, [({"R1": -2.0, "R2": 1.0}, "Filtro")])
+    assert historial.diferencias_persistentes(ultimas=6).empty
+    assert historial.diferencias_persistentes(ultimas=1)["REFERENCIA"].tolist() == ["R1"]
+
+def test_persistentes_con_la_ultima_descripcion(historial):
+    registrar(historial, [
+        ({"R1": -1.0, "R2": -5.0, "R3": -1.0}, "Viejo"),
+        ({"R1": -3.0, "R2": 2.0, "R3": -1.0}, "Filtro"),
+        ({"R1": -2.0, "R2": -1.0, "R3": -4.0}, "Nuevo"),
+    ])
+    historial.registrar(comparativo({"R3": 5.0}), entrada="otra tienda", fecha="2026-01-10T08:00:00")
+    tabla = historial.diferencias_persistentes(ultimas=3, entrada="tienda")
+    assert tabla.to_dict("records") == [
+        {"REFERENCIA": "R1", "DESCRIPCION": "Nuevo R1", "DIFERENCIA_MINIMA": -3.0,
+         "DIFERENCIA_MAXIMA": -1.0, "DIFERENCIA_PROMEDIO": -2.0, "EJECUCIONES": 3},
+        {"REFERENCIA": "R3", "DESCRIPCION": "Nuevo R3", "DIFERENCIA_MINIMA": -4.0,
+         "DIFERENCIA_MAXIMA": -1.0, "DIFERENCIA_PROMEDIO": -2.0, "EJECUCIONES": 3},
+    ]
+    # Sin filtrar por entrada la última ejecución es la de la otra tienda, donde R3 es positiva
+    assert historial.diferencias_persistentes(ultimas=3).empty
+    assert historial.diferencias_persistentes(ultimas=1, negativas=False)["REFERENCIA"].tolist() == ["R3"]
+
+def test_historia_referencia(historial):
+    registrar(historial, [({"R1": -1.0, "R2": 4.0}, "Viejo"), ({"R1": 2.0}, "Nuevo")])
+    historia = historial.historia_referencia("R1")
+    assert historia["fecha"].tolist() == ["2026-01-01T08:00:00", "2026-01-02T08:00:00"]
+    assert historia["DIFERENCIA"].tolist() == [-1.0, 2.0]
+    assert historia["DESCRIPCION"].tolist() == ["Viejo R1", "Nuevo R1"]
+    assert historial.historia_referencia("R9").empty
@@ -0,0 +1,44 @@
+"""AnalisisIncremental debe dar la misma tabla que el análisis completo, aun con la instantánea dañada."""
+import pickle
+
+import pandas as pd
+import pytest
+from modules import esquema
+from modules.comparative_analyzer import ComparativeAnalyzer
+from modules.fuentes import RegistroFuentes
+from modules.incremental import AnalisisIncremental
+from modules.logger import RegistroMemoria
+
+def consolidado(cantidad_r2=2.0):
+    return esquema.normalizar(pd.DataFrame({
+        "REFERENCIA": ["R1", "R2", "R2", "R3", None],
+        "DESCRIPCION": ["Filtro", "Cadena", None, "Bujía", "TOTAL"],
+        "CANTIDAD": [1.0, cantidad_r2, 3.0, 4.0, 10.0],
+        "ORIGEN": ["STIHL", "SIIGO", "YAMAHA", "SIIGO", "SIIGO"],
+        "UBICACION": ["A1", None, "B2", None, None],
+        "CODIGO_SIIGO": [None, "0001", None, "0002", None]
+    }))
+
+@pytest.fixture
+def incremental(tmp_path):
+    registro = RegistroMemoria()
+    return AnalisisIncremental(registro, ComparativeAnalyzer(registro, RegistroFuentes.predeterminado()), tmp_path)
+
+@pytest.mark.parametrize("contenido", [
+    b"",
+    b"no es un pickle",
+    pickle.dumps({"huella": "x"})[:-5],
+    pickle.dumps(["una", "lista"]),
+], ids=["vacia", "basura", "truncada", "otro_tipo"])
+def test_instantanea_danada_recalcula_todo(incremental, contenido):
+    incremental.directorio.mkdir(parents=True, exist_ok=True)
+    (incremental.directorio / incremental.ARCHIVO).write_bytes(contenido)
+
+    tabla, cambiadas = incremental.analizar(consolidado())
+    assert cambiadas is None
+    pd.testing.assert_frame_equal(tabla, incremental.analyzer.analizar(consolidado()))
+
+    # La instantánea se reemplazó y la ejecución siguiente vuelve a ser incremental
+    tabla, cambiadas = incremental.analizar(consolidado(cantidad_r2=5.0))
+    assert cambiadas == ["R2"]
+    pd.testing.assert_frame_equal(tabla, incremental.analyzer.analizar(consolidado(cantidad_r2=5.0)))
@@ -0,0 +1,30 @@
+"""Memoria pico e informe de etapas (modules.instrumentacion)."""
+from types import SimpleNamespace
+
+from modules import instrumentacion
+from modules.instrumentacion import Instrumentacion, etapas_principales, memoria_pico_mb
+
+def test_memoria_pico_en_esta_plataforma():
+    assert memoria_pico_mb() > 0
+
+def test_memoria_pico_en_windows(monkeypatch):
+    # Sin resource y en Windows se usa PeakWorkingSetSize de GetProcessMemoryInfo, sin psutil
+    monkeypatch.setattr(instrumentacion, "resource", None)
+    monkeypatch.setattr(instrumentacion, "os", SimpleNamespace(name="nt"))
+    monkeypatch.setattr(instrumentacion, "_pico_windows", lambda: 300 * 1024 * 1024)
+    assert memoria_pico_mb() == 300
+
+    def sin_api():
+        raise OSError("psapi no disponible")
+    monkeypatch.setattr(instrumentacion, "_pico_windows", sin_api)
+    assert memoria_pico_mb() is None
+
+def test_etapas_principales():
+    medicion = Instrumentacion()
+    with medicion.activar():
+        with instrumentacion.medir("consolidacion"):
+            with instrumentacion.medir("lectura"):
+                pass
+        with instrumentacion.medir("analisis"):
+            pass
+    assert [etapa['etapa'] for etapa in etapas_principales(medicion.informe())] == ["consolidacion", "analisis"]
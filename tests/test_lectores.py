@@ -0,0 +1,99 @@
+"""calamine debe leer los Excel igual que openpyxl; se usa solo si se pide con PROFIBRA_LECTOR_EXCEL."""
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from modules import file_processor
+from modules.file_processor import FileProcessor, lector_disponible, motor_excel
+from modules.fuentes import RegistroFuentes
+from modules.logger import RegistroMemoria
+
+ENTRADAS = Path(__file__).resolve().parent.parent / "inputs"
+
+def escribir(ruta, filas, fila_inicial=1, columna_inicial=1):
+    """Guarda las filas en un libro nuevo a partir de la celda indicada (None = celda vacía)."""
+    libro = Workbook()
+    hoja = libro.active
+    for i, fila in enumerate(filas):
+        for j, valor in enumerate(fila):
+            if valor is not None:
+                hoja.cell(row=fila_inicial + i, column=columna_inicial + j, value=valor)
+    libro.save(ruta)
+    return ruta
+
+@pytest.fixture(scope="module")
+def registro():
+    return RegistroFuentes.predeterminado()
+
+@pytest.fixture(scope="module")
+def procesadores(registro):
+    pytest.importorskip("python_calamine")
+    return {lector: FileProcessor(RegistroMemoria(), registro, lector) for lector in ("openpyxl", "calamine")}
+
+def verificar(procesadores, archivo, fuente):
+    esperado = procesadores["openpyxl"].leer_archivo(archivo, fuente)
+    pd.testing.assert_frame_equal(procesadores["calamine"].leer_archivo(archivo, fuente), esperado)
+    return esperado
+
+@pytest.mark.parametrize("fila_inicial,columna_inicial", [(1, 1), (4, 3)])
+def test_valoracion_con_ceros_y_celdas_vacias(tmp_path, procesadores, registro, fila_inicial, columna_inicial):
+    # La hoja no empieza en A1 en el segundo caso: calamine la entrega desde la primera celda usada
+    archivo = escribir(tmp_path / "Valoracion.xlsx", [
+        ["Valoración de inventarios"],
+        [],
+        ["Código producto", "Nombre producto", "Referencia fábrica", "Saldo cantidades"],
+        ["0001", "Filtro", "11-23-456", 3],
+        ["0102918", None, 1001, 2.5],
+        [None, "Sin código", None, None],
+        [],
+        ["0003", "Bujía", "A-0012", 0],
+        [12, "Cadena", 1001.0, -1],
+    ], fila_inicial, columna_inicial)
+    df = verificar(procesadores, archivo, registro.de_tipo("siigo")[0])
+    assert df["CODIGO_SIIGO"].iloc[:2].tolist() == ["0001", "0102918"]
+
+def test_conteo_de_marca(tmp_path, procesadores, registro):
+    archivo = escribir(tmp_path / "STIHL.xlsx", [
+        ["REFERENCIA", "DESCRIPCION", "CANTIDAD", "UBICACION"],
+        ["00123", "Espada", 4, "A1"],
+        [123, None, 1.25, None],
+        [None, None, None, None],
+        ["R-9", "Cadena", None, "B2"],
+    ])
+    verificar(procesadores, archivo, registro.fuente("STIHL"))
+
+@pytest.mark.parametrize("archivo", sorted(ENTRADAS.glob("*.xlsx")) if ENTRADAS.is_dir() else [], ids=lambda a: a.name)
+def test_entradas_del_repositorio(procesadores, registro, archivo):
+    fuente = registro.identificar(archivo)
+    if fuente is None or archivo.name.startswith("~$"):
+        pytest.skip("no corresponde a ninguna fuente")
+    verificar(procesadores, archivo, fuente)
+
+def test_read_excel_con_ambos_motores(tmp_path):
+    # Las hojas de análisis se vuelven a abrir con pd.read_excel (motor_excel)
+    pytest.importorskip("python_calamine")
+    if tuple(int(parte) for parte in pd.__version__.split(".")[:2]) < (2, 2):
+        pytest.skip("pd.read_excel admite calamine desde pandas 2.2")
+    archivo = escribir(tmp_path / "Consolidado.xlsx", [
+        ["REFERENCIA", "DESCRIPCION", "CANTIDAD", "ORIGEN", "UBICACION", "CODIGO_SIIGO"],
+        ["1001", "Filtro", 2.5, "SIIGO", None, "0001"],
+        ["A-0012", None, 3, "STIHL", "A1", None],
+        [None, "TOTAL", -1, "SIIGO", None, "0102918"],
+    ])
+    leidos = [pd.read_excel(archivo, engine=motor, dtype={'CODIGO_SIIGO': str}) for motor in ("openpyxl", "calamine")]
+    pd.testing.assert_frame_equal(leidos[1], leidos[0])
+
+def test_openpyxl_salvo_que_se_pida_calamine(monkeypatch):
+    monkeypatch.setattr(file_processor, "CalamineWorkbook", object())
+    monkeypatch.delenv(file_processor.VARIABLE_LECTOR, raising=False)
+    assert lector_disponible() == "openpyxl"
+    monkeypatch.setenv(file_processor.VARIABLE_LECTOR, "calamine")
+    assert lector_disponible() == "calamine"
+    monkeypatch.setattr(file_processor.pd, "__version__", "2.1.4")
+    assert motor_excel() == "openpyxl"
+
+def test_calamine_pedido_sin_instalar(monkeypatch):
+    monkeypatch.setattr(file_processor, "CalamineWorkbook", None)
+    monkeypatch.setenv(file_processor.VARIABLE_LECTOR, "calamine")
+    assert lector_disponible() == motor_excel() == "openpyxl"